@@ -0,0 +1,361 @@
+"""Admission control for upstream model calls: bounded concurrency, a prioritized wait queue and load shedding."""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Deque, Dict, List, Mapping, Optional, get_args
+
+from app import metrics
+from nanocode.schema import Priority
+
+PRIORITY_CLASSES = get_args(Priority)
+DEFAULT_PRIORITY = "default"
+DEFAULT_TENANT = "default"
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, retry_after: int, reason: str) -> None:
+        """
+        Signal that a request was shed instead of being sent upstream.
+
+        Parameters:
+            status_code (int): 429 when the wait queue is full (or the request was displaced by a higher priority), 503 when the wait exceeded the queue timeout, 504 when the request's own deadline passed.
+            retry_after (int): Suggested `Retry-After` in whole seconds.
+            reason (str): `queue_full`, `preempted`, `queue_timeout` or `deadline_exceeded`.
+        """
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+@dataclass
+class AdmissionStats:
+    admitted: int = 0
+    queued: int = 0
+    rejected_queue_full: int = 0
+    rejected_timeout: int = 0
+    rejected_deadline: int = 0
+    preempted: int = 0
+    limit_increases: int = 0
+    limit_decreases: int = 0
+
+
+@dataclass
+class _ClassStats:
+    admitted: int = 0
+    rejected: int = 0
+    wait_seconds: float = 0.0
+
+
+class _Waiter:
+    __slots__ = ("future", "rank", "tenant", "deadline", "enqueued_at")
+
+    def __init__(self, future: "asyncio.Future[None]", rank: int, tenant: str, deadline: Optional[float]) -> None:
+        self.future = future
+        self.rank = rank
+        self.tenant = tenant
+        self.deadline = deadline
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrency: int = 64,
+        max_queue: int = 256,
+        queue_timeout_seconds: float = 5.0,
+        adaptive: bool = False,
+        min_concurrency: int = 4,
+        max_concurrency_limit: int = 256,
+        latency_target_seconds: float = 2.0,
+        backoff_ratio: float = 0.9,
+        tenant_weights: Optional[Mapping[str, float]] = None,
+    ) -> None:
+        """
+        Initialize a concurrency limiter for upstream calls.
+
+        Up to `max_concurrency` calls run at once; further callers wait in a queue of at
+        most `max_queue` entries, each for at most `queue_timeout_seconds` or until its
+        own deadline. Callers arriving at a full queue are rejected immediately, so a slow
+        provider costs a bounded number of pending coroutines instead of one per request.
+
+        Freed slots go to the highest priority class with waiters (see `PRIORITY_CLASSES`,
+        highest first). Within a class, tenants get weighted fair shares: each has a
+        virtual clock advanced by `1 / weight` per admitted call, and the tenant with the
+        earliest clock goes next, so a tenant with weight 2 is admitted twice as often as
+        one with weight 1 while both have waiters. A full queue makes room for a higher
+        priority caller by rejecting the newest waiter of the lowest waiting class. Waiters
+        whose deadline has passed are dropped rather than admitted.
+
+        In adaptive mode the limit follows AIMD: every call that completes within
+        `latency_target_seconds` raises it by `1 / limit` (about one per round of calls),
+        and a slow or failed call multiplies it by `backoff_ratio`, at most once per
+        observed latency so one burst of slow calls counts as one congestion signal.
+
+        Parameters:
+            max_concurrency (int): Concurrent upstream calls; the starting limit in adaptive mode.
+            max_queue (int): Callers allowed to wait for a slot.
+            queue_timeout_seconds (float): Longest a caller waits for a slot.
+            adaptive (bool): Adjust the limit from observed latency and errors.
+            min_concurrency (int): Lower bound for the adaptive limit.
+            max_concurrency_limit (int): Upper bound for the adaptive limit.
+            latency_target_seconds (float): Latency above which a call counts as congestion.
+            backoff_ratio (float): Multiplicative decrease applied on congestion.
+            tenant_weights (Optional[Mapping[str, float]]): Fair-share weight per tenant; unlisted tenants weigh 1.
+        """
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout_seconds
+        self.adaptive = adaptive
+        self.min_limit = max(1, min_concurrency)
+        self.max_limit = max(self.min_limit, max_concurrency_limit)
+        self.latency_target = latency_target_seconds
+        self.backoff_ratio = backoff_ratio
+        self.tenant_weights = {tenant: weight for tenant, weight in (tenant_weights or {}).items() if weight > 0}
+        self.stats = AdmissionStats()
+        self.class_stats = {name: _ClassStats() for name in PRIORITY_CLASSES}
+        self.in_flight = 0
+        self._limit = float(max(1, max_concurrency))
+        if adaptive:
+            self._limit = float(min(self.max_limit, max(self.min_limit, self._limit)))
+        # Per priority class: waiters by tenant, and each waiting tenant's virtual clock.
+        self._queues: List[Dict[str, Deque[_Waiter]]] = [{} for _ in PRIORITY_CLASSES]
+        self._vtime: List[Dict[str, float]] = [{} for _ in PRIORITY_CLASSES]
+        self._clock = [0.0] * len(PRIORITY_CLASSES)
+        self._queued = 0
+        self._mean_latency = 0.0
+        self._last_decrease = 0.0
+
+    @property
+    def limit(self) -> int:
+        """Current concurrency limit."""
+        return int(self._limit)
+
+    @property
+    def queued(self) -> int:
+        """Callers currently waiting for a slot."""
+        return self._queued
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: Optional[str] = None,
+        tenant: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[None]:
+        """
+        Hold one upstream slot for the duration of the block.
+
+        The block's wall-clock time and outcome feed the adaptive limit; an exception
+        raised inside it counts as a failed call, except for cancellation.
+
+        Parameters:
+            priority, tenant, deadline: As for `acquire`.
+
+        Raises:
+            AdmissionRejected: When no slot becomes available (see `acquire`).
+        """
+        await self.acquire(priority, tenant, deadline)
+        started = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except asyncio.CancelledError:
+            raise
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.release(time.perf_counter() - started, ok)
+
+    async def acquire(
+        self,
+        priority: Optional[str] = None,
+        tenant: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> None:
+        """
+        Take a slot, waiting in the queue when all are in use.
+
+        Parameters:
+            priority (Optional[str]): One of `PRIORITY_CLASSES`; defaults to "default".
+            tenant (Optional[str]): Fair-share identity of the caller; defaults to "default".
+            deadline (Optional[float]): `time.monotonic()` after which the caller no longer wants the result.
+
+        Raises:
+            AdmissionRejected: 504 when the deadline has passed or passes while waiting, 429 when the queue is full or a higher priority caller displaced this one, 503 when the wait exceeded `queue_timeout_seconds`.
+        """
+        name = priority or DEFAULT_PRIORITY
+        rank = PRIORITY_CLASSES.index(name)
+        tenant = tenant or DEFAULT_TENANT
+        now = time.monotonic()
+        if deadline is not None and deadline <= now:
+            raise self._reject(name, "deadline_exceeded")
+        if self.in_flight < self.limit and not self._queued:
+            self.in_flight += 1
+            self._admitted(name, 0.0)
+            return
+        if self._queued >= self.max_queue and not self._preempt(rank):
+            raise self._reject(name, "queue_full")
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), rank, tenant, deadline)
+        self._queues[rank].setdefault(tenant, deque()).append(waiter)
+        self._queued += 1
+        self.stats.queued += 1
+        metrics.ADMISSION_QUEUE_DEPTH.labels(name).inc()
+        timeout = self.queue_timeout if deadline is None else min(self.queue_timeout, deadline - now)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            rejection = None
+            if not waiter.future.done():
+                waiter.future.cancel()
+                self._unlink(waiter)
+            elif waiter.future.exception() is None:
+                # The slot was handed over just as the wait ended; pass it on.
+                self.in_flight -= 1
+                self._wake()
+            else:
+                rejection = waiter.future.exception()
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            if rejection is not None:
+                raise rejection from None
+            expired = deadline is not None and deadline <= time.monotonic()
+            raise self._reject(name, "deadline_exceeded" if expired else "queue_timeout") from None
+        self._admitted(name, time.monotonic() - waiter.enqueued_at)
+
+    def release(self, latency: float, ok: bool = True) -> None:
+        """
+        Return a slot taken with `acquire` and hand it to the next waiter.
+
+        Parameters:
+            latency (float): Seconds the upstream call took.
+            ok (bool): Whether the call succeeded.
+        """
+        self.in_flight -= 1
+        self._mean_latency = latency if not self._mean_latency else 0.8 * self._mean_latency + 0.2 * latency
+        if self.adaptive:
+            self._adapt(latency, ok)
+        self._wake()
+
+    def retry_after(self) -> int:
+        """
+        Estimate when a rejected caller could be admitted.
+
+        Returns:
+            int: Seconds for the current queue to drain at the current limit and mean latency, at least 1.
+        """
+        drain = (self._queued + 1) * self._mean_latency / max(1, self.limit)
+        return max(1, math.ceil(drain))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report the current limit, occupancy and admission counters.
+
+        Returns:
+            dict: Counters plus `limit`, `in_flight`, `queued`, `max_queue`, `adaptive`, `mean_latency_seconds` and, per priority class, queue depth, admitted and rejected counts and mean queue wait in milliseconds.
+        """
+        classes = {}
+        for name, queues, stats in zip(PRIORITY_CLASSES, self._queues, self.class_stats.values()):
+            classes[name] = {
+                "queued": sum(len(waiters) for waiters in queues.values()),
+                "admitted": stats.admitted,
+                "rejected": stats.rejected,
+                "mean_wait_ms": round(stats.wait_seconds * 1000.0 / stats.admitted, 2) if stats.admitted else 0.0,
+            }
+        return {
+            **asdict(self.stats),
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self._queued,
+            "max_queue": self.max_queue,
+            "adaptive": self.adaptive,
+            "mean_latency_seconds": round(self._mean_latency, 4),
+            "classes": classes,
+        }
+
+    def _admitted(self, name: str, waited: float) -> None:
+        self.stats.admitted += 1
+        stats = self.class_stats[name]
+        stats.admitted += 1
+        stats.wait_seconds += waited
+        metrics.ADMISSION_QUEUE_WAIT.labels(name).observe(waited)
+
+    def _reject(self, name: str, reason: str) -> AdmissionRejected:
+        self.class_stats[name].rejected += 1
+        if reason == "deadline_exceeded":
+            self.stats.rejected_deadline += 1
+            return AdmissionRejected(504, self.retry_after(), reason)
+        if reason == "queue_timeout":
+            self.stats.rejected_timeout += 1
+            return AdmissionRejected(503, self.retry_after(), reason)
+        if reason == "preempted":
+            self.stats.preempted += 1
+        else:
+            self.stats.rejected_queue_full += 1
+        return AdmissionRejected(429, self.retry_after(), reason)
+
+    def _preempt(self, rank: int) -> bool:
+        for lower in range(len(PRIORITY_CLASSES) - 1, rank, -1):
+            queues = self._queues[lower]
+            if queues:
+                # Displace the newest waiter of the tenant furthest past its fair share.
+                tenant = max(queues, key=lambda name: self._vtime[lower].get(name, 0.0))
+                waiter = queues[tenant][-1]
+                self._unlink(waiter)
+                waiter.future.set_exception(self._reject(PRIORITY_CLASSES[lower], "preempted"))
+                return True
+        return False
+
+    def _unlink(self, waiter: _Waiter) -> None:
+        queues = self._queues[waiter.rank]
+        waiters = queues[waiter.tenant]
+        waiters.remove(waiter)
+        if not waiters:
+            del queues[waiter.tenant]
+            self._vtime[waiter.rank].pop(waiter.tenant, None)
+        self._queued -= 1
+        metrics.ADMISSION_QUEUE_DEPTH.labels(PRIORITY_CLASSES[waiter.rank]).dec()
+
+    def _next(self) -> Optional[_Waiter]:
+        for rank, queues in enumerate(self._queues):
+            if not queues:
+                continue
+            clock = self._clock[rank]
+            vtime = self._vtime[rank]
+            # Start-time fair queueing: serve the tenant whose next call starts earliest in virtual time.
+            tenant = min(queues, key=lambda name: max(vtime.get(name, 0.0), clock))
+            start = max(vtime.get(tenant, 0.0), clock)
+            self._clock[rank] = start
+            vtime[tenant] = start + 1.0 / self.tenant_weights.get(tenant, 1.0)
+            waiter = queues[tenant][0]
+            self._unlink(waiter)
+            return waiter
+        return None
+
+    def _adapt(self, latency: float, ok: bool) -> None:
+        now = time.monotonic()
+        if ok and latency <= self.latency_target:
+            if self._limit < self.max_limit:
+                self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+                self.stats.limit_increases += 1
+        elif now - self._last_decrease >= latency and self._limit > self.min_limit:
+            self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+            self._last_decrease = now
+            self.stats.limit_decreases += 1
+
+    def _wake(self) -> None:
+        now = time.monotonic()
+        while self._queued and self.in_flight < self.limit:
+            waiter = self._next()
+            if waiter is None:
+                break
+            if waiter.deadline is not None and waiter.deadline <= now:
+                # Its caller no longer wants the result; do not spend a model call on it.
+                waiter.future.set_exception(self._reject(PRIORITY_CLASSES[waiter.rank], "deadline_exceeded"))
+                continue
+            self.in_flight += 1
+            waiter.future.set_result(None)
@@ -1,5 +1,7 @@
 """Application configuration loaded from environment variables with defaults."""
 from functools import lru_cache
+from typing import Dict, List, Literal, Optional
+
 from pydantic import AnyHttpUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -10,7 +12,114 @@ class Settings(BaseSettings):
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     model_server_url: AnyHttpUrl = "http://localhost:9000"
+    # Model server replicas to balance across (JSON list); when set, calls go to these
+    # instead of model_server_url (see app/endpoint_pool.py).
+    model_server_urls: List[AnyHttpUrl] = []
+    # "least_outstanding" or "p2c" (power of two choices).
+    model_server_balancing: str = "least_outstanding"
     log_level: str = "INFO"
+    # "text" or "json" (one object per line, including `extra` fields).
+    log_format: str = "text"
+    # Write logs from a background thread through a bounded queue; records that do not fit
+    # are dropped and counted instead of blocking the event loop (see app/logging_config.py).
+    log_async: bool = False
+    log_queue_size: int = 10000
+
+    # Shared HTTP connection pool used by ModelClient (see app/http_pool.py).
+    model_client_timeout: float = 30.0
+    model_client_connect_timeout: float = 5.0
+    model_client_pool_timeout: float = 5.0
+    model_client_max_connections: int = 100
+    model_client_max_keepalive_connections: int = 20
+    model_client_keepalive_expiry: float = 30.0
+    model_client_http2: bool = False
+    # Connections per model server opened at startup (see warm_up in app/http_pool.py); 0 disables.
+    model_client_warmup_connections: int = 2
+    model_client_warmup_timeout: float = 2.0
+
+    # Retries, hedging and circuit breaking for model server calls (see app/resilience.py).
+    model_client_max_attempts: int = 3
+    model_client_retry_base_delay: float = 0.05
+    model_client_retry_max_delay: float = 1.0
+    model_client_retry_statuses: List[int] = [502, 503, 504]
+    model_client_hedge_enabled: bool = False
+    model_client_hedge_percentile: float = 95.0
+    model_client_hedge_min_delay: float = 0.05
+    model_client_hedge_min_samples: int = 20
+    # Upper bound on the share of calls that send a hedge.
+    model_client_hedge_max_ratio: float = 0.1
+    circuit_breaker_enabled: bool = True
+    circuit_breaker_failure_threshold: int = 5
+    circuit_breaker_reset_seconds: float = 10.0
+
+    # Response cache in front of the model call (see app/response_cache.py). Off by
+    # default: a cached generation is returned instead of a fresh one.
+    response_cache_enabled: bool = False
+    response_cache_backend: str = "memory"
+    response_cache_ttl_seconds: float = 300.0
+    response_cache_max_entries: int = 1024
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    response_cache_sqlite_path: str = "nanocode_cache.sqlite3"
+    # Bump to invalidate cached responses when the model behind model_server_url changes.
+    response_cache_namespace: str = "default"
+
+    # Share one upstream call between concurrent identical prompts (see app/singleflight.py).
+    singleflight_enabled: bool = True
+
+    # Serve near-identical requests from earlier responses (see app/semantic_cache.py).
+    semantic_cache_enabled: bool = False
+    semantic_cache_threshold: float = 0.92
+    semantic_cache_max_entries: int = 4096
+    semantic_cache_ttl_seconds: float = 300.0
+    embedding_dim: int = 256
+    embedding_cache_size: int = 10000
+
+    # Live health scoring (see nanocode/health.py and app/health.py).
+    health_window_seconds: float = 60.0
+    health_max_samples: int = 1024
+    health_latency_target_seconds: float = 2.0
+    health_probe_interval_seconds: float = 5.0
+    health_probe_timeout_seconds: float = 1.0
+    # /health/ready returns 503 below this score.
+    health_ready_min_score: float = 0.2
+    # Upstream calls in flight at which the instance counts as saturated.
+    upstream_max_concurrency: int = 64
+
+    # Admission control for upstream calls (see app/admission.py). Uses
+    # upstream_max_concurrency as the limit (the starting limit when adaptive).
+    admission_enabled: bool = True
+    admission_max_queue: int = 256
+    admission_queue_timeout_seconds: float = 5.0
+    admission_adaptive: bool = False
+    admission_min_concurrency: int = 4
+    admission_max_concurrency: int = 256
+    admission_latency_target_seconds: float = 2.0
+    # Fair-share weight per tenant (X-Nanocode-Tenant header); unlisted tenants weigh 1.
+    # Set as JSON, e.g. ADMISSION_TENANT_WEIGHTS='{"playground": 4, "nightly": 1}'.
+    admission_tenant_weights: Dict[str, float] = {}
+
+    # Token budget for assembled prompts, checked before any upstream call (see
+    # nanocode/prompts.py). tokenizer_path is a tiktoken-format vocabulary; without one,
+    # counts are estimated. prompt_overflow is "reject" (413) or "truncate" (the input).
+    tokenizer_path: Optional[str] = None
+    token_cache_size: int = 10000
+    prompt_max_tokens: int = 0
+    prompt_overflow: Literal["reject", "truncate"] = "reject"
+
+    # Per-request traces of stages, constraints and outcome (see app/traces.py), written
+    # in the background as gzip JSONL segments under trace_dir and queried at /admin/traces.
+    trace_enabled: bool = False
+    trace_dir: str = "nanocode_traces"
+    trace_buffer_size: int = 10000
+    trace_flush_interval_seconds: float = 1.0
+    trace_flush_batch: int = 1000
+    trace_segment_bytes: int = 64 * 1024 * 1024
+    trace_max_segments: int = 64
+
+    # Bulk generation via POST /nanocode/batch.
+    batch_concurrency: int = 8
+    batch_max_concurrency: int = 64
+    batch_max_items: int = 100_000
 
 
 @lru_cache
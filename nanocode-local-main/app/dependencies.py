@@ -1,18 +1,273 @@
 """Dependency wiring for the FastAPI app."""
-from fastapi import Depends
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
 
+import httpx
+from fastapi import Depends, Request
+
+from app.admission import AdmissionController
 from app.config import get_settings
+from app.endpoint_pool import EndpointPool
+from app.http_pool import build_timeout
 from app.model_client import ModelClient
+from app.resilience import HedgePolicy, Resilience, RetryPolicy
+from app.response_cache import ResponseCache, create_response_cache
+from app.semantic_cache import SemanticCache
+from app.singleflight import SingleFlight
+from app.traces import TraceStore
+from nanocode.health import HealthTracker
+from nanocode.prompts import PromptBudget
+from nanocode.tokenizer import get_tokenizer
+
+if TYPE_CHECKING:
+    from nanocode.embeddings.service import EmbeddingService
 
 
-def get_model_client(settings=Depends(get_settings)) -> ModelClient:
+def get_http_client(request: Request) -> Optional[httpx.AsyncClient]:
+    """
+    Return the process-wide pooled AsyncClient created by the app lifespan.
+    
+    Parameters:
+        request (Request): Incoming request, used to reach `app.state`.
+    
+    Returns:
+        Optional[httpx.AsyncClient]: The shared client, or `None` when the lifespan has not run (e.g. a TestClient used without a context manager).
+    """
+    return getattr(request.app.state, "http_client", None)
+
+
+def get_trace_store(request: Request) -> Optional[TraceStore]:
+    """
+    Return the trace store opened by the app lifespan.
+    
+    Parameters:
+        request (Request): Incoming request, used to reach `app.state`.
+    
+    Returns:
+        Optional[TraceStore]: The store, or `None` when `trace_enabled` is false or the lifespan has not run.
+    """
+    return getattr(request.app.state, "trace_store", None)
+
+
+@lru_cache
+def get_resilience() -> Resilience:
+    """
+    Provide the process-wide retry, hedging and circuit breaker state for model server calls.
+    
+    Returns:
+        Resilience: Policies configured from the `model_client_*` and `circuit_breaker_*` settings.
+    """
+    settings = get_settings()
+    hedge = None
+    if settings.model_client_hedge_enabled:
+        hedge = HedgePolicy(
+            percentile=settings.model_client_hedge_percentile,
+            min_delay=settings.model_client_hedge_min_delay,
+            min_samples=settings.model_client_hedge_min_samples,
+            max_ratio=settings.model_client_hedge_max_ratio,
+        )
+    return Resilience(
+        retry=RetryPolicy(
+            max_attempts=max(1, settings.model_client_max_attempts),
+            base_delay=settings.model_client_retry_base_delay,
+            max_delay=settings.model_client_retry_max_delay,
+            retry_statuses=frozenset(settings.model_client_retry_statuses),
+        ),
+        hedge=hedge,
+        breaker_failure_threshold=(
+            settings.circuit_breaker_failure_threshold if settings.circuit_breaker_enabled else None
+        ),
+        breaker_reset_seconds=settings.circuit_breaker_reset_seconds,
+    )
+
+
+@lru_cache
+def get_endpoint_pool() -> Optional[EndpointPool]:
+    """
+    Provide the process-wide pool of model server replicas.
+    
+    Returns:
+        Optional[EndpointPool]: Pool over `model_server_urls` using `model_server_balancing`, or `None` when no replicas are configured.
+    """
+    settings = get_settings()
+    if not settings.model_server_urls:
+        return None
+    return EndpointPool(
+        [str(url) for url in settings.model_server_urls],
+        strategy=settings.model_server_balancing,
+        resilience=get_resilience(),
+    )
+
+
+def get_model_client(
+    settings=Depends(get_settings),
+    http_client: Optional[httpx.AsyncClient] = Depends(get_http_client),
+    resilience: Resilience = Depends(get_resilience),
+    pool: Optional[EndpointPool] = Depends(get_endpoint_pool),
+) -> ModelClient:
     """
     Provide a configured ModelClient for FastAPI dependency injection.
     
     Parameters:
         settings (Settings): Application settings provided via Depends(get_settings). The client's base URL is taken from settings.model_server_url.
+        http_client (Optional[httpx.AsyncClient]): Shared pooled client provided via Depends(get_http_client).
+        resilience (Resilience): Process-wide retry, hedging and circuit breaker state provided via Depends(get_resilience).
+        pool (Optional[EndpointPool]): Process-wide replica pool provided via Depends(get_endpoint_pool).
+    
+    Returns:
+        ModelClient: A lightweight ModelClient bound to the shared connection pool and configured with the application's model server URL, timeouts and resilience policies.
+    """
+    return ModelClient(
+        base_url=str(settings.model_server_url),
+        client=http_client,
+        timeout=build_timeout(settings),
+        resilience=resilience,
+        pool=pool,
+    )
+
+
+@lru_cache
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Provide the process-wide response cache, built once from settings.
+    
+    Returns:
+        Optional[ResponseCache]: The configured cache, or `None` when `response_cache_enabled` is false.
+    """
+    settings = get_settings()
+    if not settings.response_cache_enabled:
+        return None
+    return create_response_cache(
+        backend=settings.response_cache_backend,
+        ttl_seconds=settings.response_cache_ttl_seconds,
+        max_entries=settings.response_cache_max_entries,
+        max_bytes=settings.response_cache_max_bytes,
+        sqlite_path=settings.response_cache_sqlite_path,
+    )
+
+
+@lru_cache
+def get_singleflight() -> Optional[SingleFlight]:
+    """
+    Provide the process-wide registry of in-flight upstream calls.
+    
+    Returns:
+        Optional[SingleFlight]: The shared registry, or `None` when `singleflight_enabled` is false.
+    """
+    if not get_settings().singleflight_enabled:
+        return None
+    return SingleFlight()
+
+
+@lru_cache
+def get_embedding_service() -> "EmbeddingService":
+    """
+    Provide the process-wide embedding service, built once from settings.
+    
+    The embeddings package (and numpy) is imported on first use rather than with the app.
+    
+    Returns:
+        EmbeddingService: Hashing embedder with a content-hash cache and batched async calls.
+    """
+    from nanocode.embeddings.service import EmbeddingService, HashingEmbedder
+
+    settings = get_settings()
+    return EmbeddingService(
+        HashingEmbedder(dim=settings.embedding_dim),
+        cache_size=settings.embedding_cache_size,
+    )
+
+
+@lru_cache
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Provide the process-wide semantic response cache.
+    
+    Returns:
+        Optional[SemanticCache]: The shared cache, or `None` when `semantic_cache_enabled` is false.
+    """
+    settings = get_settings()
+    if not settings.semantic_cache_enabled:
+        return None
+    return SemanticCache(
+        get_embedding_service(),
+        threshold=settings.semantic_cache_threshold,
+        max_entries=settings.semantic_cache_max_entries,
+        ttl_seconds=settings.semantic_cache_ttl_seconds,
+    )
+
+
+@lru_cache
+def get_health_tracker() -> HealthTracker:
+    """
+    Provide the process-wide window of recent upstream outcomes behind `/health`.
+    
+    Returns:
+        HealthTracker: Tracker configured from the `health_*` and `upstream_max_concurrency` settings.
+    """
+    settings = get_settings()
+    return HealthTracker(
+        window_seconds=settings.health_window_seconds,
+        max_samples=settings.health_max_samples,
+        latency_target_seconds=settings.health_latency_target_seconds,
+        concurrency_limit=settings.upstream_max_concurrency,
+    )
+
+
+@lru_cache
+def get_admission_controller() -> Optional[AdmissionController]:
+    """
+    Provide the process-wide limiter for concurrent upstream calls.
+    
+    Returns:
+        Optional[AdmissionController]: Controller configured from `upstream_max_concurrency` and the `admission_*` settings, or `None` when `admission_enabled` is false.
+    """
+    settings = get_settings()
+    if not settings.admission_enabled:
+        return None
+    return AdmissionController(
+        max_concurrency=settings.upstream_max_concurrency,
+        max_queue=settings.admission_max_queue,
+        queue_timeout_seconds=settings.admission_queue_timeout_seconds,
+        adaptive=settings.admission_adaptive,
+        min_concurrency=settings.admission_min_concurrency,
+        max_concurrency_limit=settings.admission_max_concurrency,
+        latency_target_seconds=settings.admission_latency_target_seconds,
+        tenant_weights=settings.admission_tenant_weights,
+    )
+
+
+@lru_cache
+def get_prompt_budget() -> Optional[PromptBudget]:
+    """
+    Provide the token budget that assembled prompts must fit.
+    
+    Returns:
+        Optional[PromptBudget]: Budget of `prompt_max_tokens` counted with the tokenizer at `tokenizer_path`, or `None` when `prompt_max_tokens` is 0.
+    """
+    settings = get_settings()
+    if settings.prompt_max_tokens <= 0:
+        return None
+    return PromptBudget(
+        get_tokenizer(settings.tokenizer_path, settings.token_cache_size),
+        max_tokens=settings.prompt_max_tokens,
+        overflow=settings.prompt_overflow,
+    )
+
+
+def get_model_identity(settings=Depends(get_settings)) -> str:
+    """
+    Identify the upstream model for cache keying.
+    
+    Parameters:
+        settings (Settings): Application settings provided via Depends(get_settings).
     
     Returns:
-        ModelClient: A ModelClient instance configured with the application's model server URL.
+        str: The model server URL, or the sorted set of `model_server_urls` when replicas are configured, combined with the configured cache namespace.
     """
-    return ModelClient(base_url=str(settings.model_server_url))
\ No newline at end of file
+    if settings.model_server_urls:
+        # Replicas serve the same model; their order in the setting does not matter.
+        endpoints = ",".join(sorted({str(url).rstrip("/") for url in settings.model_server_urls}))
+    else:
+        endpoints = str(settings.model_server_url)
+    return f"{endpoints}#{settings.response_cache_namespace}"
@@ -0,0 +1,134 @@
+"""Client-side load balancing across model server replicas."""
+import random
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.resilience import Resilience
+
+STRATEGIES = ("least_outstanding", "p2c")
+
+
+class Endpoint:
+    __slots__ = ("url", "outstanding", "requests", "failures", "ewma_latency")
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.ewma_latency = 0.0
+
+    def load(self) -> float:
+        # Outstanding work weighted by how slow the endpoint has recently been; endpoints
+        # with no latency history yet are judged by outstanding requests alone.
+        return (self.outstanding + 1) * (self.ewma_latency or 1.0)
+
+
+class EndpointPool:
+    def __init__(
+        self,
+        urls: Sequence[str],
+        strategy: str = "least_outstanding",
+        resilience: Optional[Resilience] = None,
+        ewma_alpha: float = 0.2,
+    ) -> None:
+        """
+        Initialize a pool of interchangeable model server endpoints.
+
+        Each call is routed to one endpoint: with "least_outstanding" the one with the
+        fewest calls in flight (ties go to the lower latency EWMA); with "p2c" the less
+        loaded of two endpoints picked at random, which avoids every API process
+        stampeding the same replica. Health is tracked passively through the per-endpoint
+        circuit breakers of `resilience`: an endpoint whose circuit is open is skipped
+        until its reset interval passes, after which one call re-probes it.
+
+        Parameters:
+            urls (Sequence[str]): Endpoint base URLs; trailing slashes are removed and duplicates dropped.
+            strategy (str): "least_outstanding" or "p2c".
+            resilience (Optional[Resilience]): Source of the circuit breakers used for ejection.
+            ewma_alpha (float): Weight of the newest sample in each endpoint's latency EWMA.
+
+        Raises:
+            ValueError: If `urls` is empty or `strategy` is unknown.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown balancing strategy {strategy!r}; expected one of {STRATEGIES}")
+        unique = list(dict.fromkeys(url.rstrip("/") for url in urls))
+        if not unique:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        self.strategy = strategy
+        self.resilience = resilience
+        self.ewma_alpha = ewma_alpha
+        self.endpoints: List[Endpoint] = [Endpoint(url) for url in unique]
+        self._by_url = {endpoint.url: endpoint for endpoint in self.endpoints}
+
+    def pick(self, exclude: Sequence[str] = ()) -> str:
+        """
+        Choose the endpoint for the next call.
+
+        Parameters:
+            exclude (Sequence[str]): URLs already tried for this call (e.g. before a retry or hedge); used only if another endpoint is available.
+
+        Returns:
+            str: Base URL of the chosen endpoint. When every circuit is open one is still returned so the call fails fast there.
+        """
+        candidates = [e for e in self.endpoints if e.url not in exclude and self._available(e.url)]
+        if not candidates:
+            candidates = [e for e in self.endpoints if self._available(e.url)] or self.endpoints
+        if len(candidates) == 1:
+            return candidates[0].url
+        if self.strategy == "p2c":
+            first, second = random.sample(candidates, 2)
+            return (first if first.load() <= second.load() else second).url
+        return min(candidates, key=lambda e: (e.outstanding, e.ewma_latency)).url
+
+    def started(self, url: str) -> None:
+        """Count a call to `url` as outstanding."""
+        endpoint = self._by_url[url]
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+
+    def finished(self, url: str, latency: Optional[float], failed: bool = False) -> None:
+        """
+        Record the end of a call started with `started`.
+
+        Parameters:
+            url (str): Endpoint the call went to.
+            latency (Optional[float]): Seconds the call took, folded into the latency EWMA; `None` when there is no meaningful latency (e.g. it failed).
+            failed (bool): Whether the call failed.
+        """
+        endpoint = self._by_url[url]
+        endpoint.outstanding -= 1
+        if failed:
+            endpoint.failures += 1
+        if latency is not None:
+            if endpoint.ewma_latency:
+                endpoint.ewma_latency += self.ewma_alpha * (latency - endpoint.ewma_latency)
+            else:
+                endpoint.ewma_latency = latency
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report the routing strategy and the state of every endpoint.
+
+        Returns:
+            dict: `strategy` and `endpoints`, a list with each endpoint's URL, outstanding calls, request and failure counts, latency EWMA in milliseconds and circuit state.
+        """
+        endpoints = []
+        for endpoint in self.endpoints:
+            breaker = self.resilience.breaker(endpoint.url) if self.resilience is not None else None
+            endpoints.append({
+                "url": endpoint.url,
+                "outstanding": endpoint.outstanding,
+                "requests": endpoint.requests,
+                "failures": endpoint.failures,
+                "ewma_latency_ms": round(endpoint.ewma_latency * 1000.0, 2),
+                "circuit": breaker.snapshot()["state"] if breaker is not None else "disabled",
+                "available": self._available(endpoint.url),
+            })
+        return {"strategy": self.strategy, "endpoints": endpoints}
+
+    def _available(self, url: str) -> bool:
+        if self.resilience is None:
+            return True
+        breaker = self.resilience.breaker(url)
+        return breaker is None or breaker.available()
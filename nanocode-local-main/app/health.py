@@ -1,19 +1,106 @@
 """Health check helpers for the API service."""
-from fastapi import APIRouter
-from nanocode.health import compute_health_score
+import asyncio
+import time
+from typing import Optional
+
+import httpx
+from fastapi import APIRouter, Depends, Response, status
+
+from app.config import Settings, get_settings
+from app.dependencies import get_endpoint_pool, get_health_tracker, get_http_client
+from app.endpoint_pool import EndpointPool
+from nanocode.health import HealthTracker, compute_health_score
 from nanocode.schema import HealthResponse
 
 router = APIRouter()
 
 
+def _status_for(score: float) -> str:
+    if score >= 0.8:
+        return "ok"
+    if score > 0.0:
+        return "degraded"
+    return "unhealthy"
+
+
+async def _probe(http_client: httpx.AsyncClient, url: str, timeout: float) -> bool:
+    try:
+        response = await http_client.get(f"{url.rstrip('/')}/health", timeout=timeout)
+    except httpx.HTTPError:
+        return False
+    return response.status_code < 500
+
+
+async def _probe_model_server(
+    tracker: HealthTracker,
+    http_client: Optional[httpx.AsyncClient],
+    settings: Settings,
+    pool: Optional[EndpointPool] = None,
+) -> None:
+    """
+    Refresh model server reachability when the last observation is stale.
+
+    Upstream calls already report reachability; the probe only runs when there has been
+    no such observation for `health_probe_interval_seconds`, so idle replicas are checked
+    without adding a request per health check. With a replica pool every endpoint is
+    probed at once, and the model server counts as reachable if any of them answers.
+
+    Parameters:
+        tracker (HealthTracker): Tracker whose reachability is updated.
+        http_client (Optional[httpx.AsyncClient]): Shared pooled client; the probe is skipped without one.
+        settings (Settings): Provides the model server URL, probe interval and timeout.
+        pool (Optional[EndpointPool]): Replica pool whose endpoints are probed instead of `model_server_url`.
+    """
+    if http_client is None:
+        return
+    if time.monotonic() - tracker.reachability_checked_at < settings.health_probe_interval_seconds:
+        return
+    urls = [endpoint.url for endpoint in pool.endpoints] if pool is not None else [str(settings.model_server_url)]
+    results = await asyncio.gather(
+        *(_probe(http_client, url, settings.health_probe_timeout_seconds) for url in urls)
+    )
+    tracker.mark_reachable(any(results))
+
+
 @router.get("/health", response_model=HealthResponse)
-async def healthcheck() -> HealthResponse:
+async def healthcheck(
+    tracker: HealthTracker = Depends(get_health_tracker),
+    http_client: Optional[httpx.AsyncClient] = Depends(get_http_client),
+    pool: Optional[EndpointPool] = Depends(get_endpoint_pool),
+    settings: Settings = Depends(get_settings),
+) -> HealthResponse:
     """
     Provide the service health status and current health score.
-    
-    The returned HealthResponse has its `status` set to "ok" and `score` set to the current service health score.
-    
+
+    The score is derived from a sliding window of recent upstream latencies and errors,
+    upstream calls in flight against `upstream_max_concurrency`, and model server
+    reachability. `status` is "ok" at 0.8 and above, "unhealthy" at 0, and "degraded" in
+    between.
+
+    Returns:
+        HealthResponse: The health response with `status`, the numeric `score` and the window `details`.
+    """
+    await _probe_model_server(tracker, http_client, settings, pool)
+    score = compute_health_score(tracker)
+    return HealthResponse(status=_status_for(score), score=score, details=tracker.snapshot())
+
+
+@router.get("/health/ready")
+async def readiness(
+    response: Response,
+    tracker: HealthTracker = Depends(get_health_tracker),
+    settings: Settings = Depends(get_settings),
+) -> dict:
+    """
+    Tell a load balancer whether to keep sending traffic to this replica.
+
+    Uses only in-process state (no upstream probe), so it is cheap enough to poll often.
+
     Returns:
-        HealthResponse: The health response with `status` "ok" and the current numeric `score`.
+        dict: {"status": "ready", "score": float} with 200, or {"status": "overloaded", ...} with 503 when upstream calls in flight have reached `upstream_max_concurrency` or the score is below `health_ready_min_score`.
     """
-    return HealthResponse(status="ok", score=compute_health_score())
\ No newline at end of file
+    score = tracker.score()
+    if tracker.in_flight >= tracker.concurrency_limit or score < settings.health_ready_min_score:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "overloaded", "score": score, "in_flight": tracker.in_flight}
+    return {"status": "ready", "score": score}
@@ -0,0 +1,114 @@
+"""Process-wide pooled HTTP client used to talk to the model server."""
+import asyncio
+from typing import Any, Dict, Sequence
+
+import httpx
+
+from app.config import Settings
+
+
+def build_timeout(settings: Settings) -> httpx.Timeout:
+    """
+    Build the httpx timeout configuration for model server calls.
+    
+    Parameters:
+        settings (Settings): Application settings providing the overall, connect and pool timeouts.
+    
+    Returns:
+        httpx.Timeout: Timeout using `model_client_timeout` for reads/writes and the dedicated connect and pool-acquire limits.
+    """
+    return httpx.Timeout(
+        settings.model_client_timeout,
+        connect=settings.model_client_connect_timeout,
+        pool=settings.model_client_pool_timeout,
+    )
+
+
+def create_http_client(settings: Settings) -> httpx.AsyncClient:
+    """
+    Create the shared AsyncClient whose connection pool is reused by every ModelClient.
+    
+    Parameters:
+        settings (Settings): Application settings providing pool limits, timeouts and the HTTP/2 toggle.
+    
+    Returns:
+        httpx.AsyncClient: A keep-alive client bound to `settings.model_server_url`. The caller owns it and must `aclose()` it on shutdown.
+    
+    Raises:
+        ImportError: If `model_client_http2` is enabled but the optional `h2` package is not installed.
+    """
+    limits = httpx.Limits(
+        max_connections=settings.model_client_max_connections,
+        max_keepalive_connections=settings.model_client_max_keepalive_connections,
+        keepalive_expiry=settings.model_client_keepalive_expiry,
+    )
+    return httpx.AsyncClient(
+        base_url=str(settings.model_server_url),
+        limits=limits,
+        timeout=build_timeout(settings),
+        http2=settings.model_client_http2,
+    )
+
+
+async def warm_up(
+    client: httpx.AsyncClient, urls: Sequence[str], connections: int = 1, timeout: float = 2.0
+) -> Dict[str, int]:
+    """
+    Open keep-alive connections to the model server ahead of the first request.
+    
+    Sends `connections` concurrent `GET /health` requests to each URL so the pool holds
+    that many established connections per endpoint. Failures are tolerated: a model server
+    that is not up yet is simply connected to on first use.
+    
+    Parameters:
+        client (httpx.AsyncClient): The shared client whose pool is warmed.
+        urls (Sequence[str]): Model server base URLs.
+        connections (int): Connections to open per URL.
+        timeout (float): Seconds each warm-up request may take.
+    
+    Returns:
+        dict: Number of successful warm-up requests per URL.
+    """
+
+    async def probe(url: str) -> bool:
+        try:
+            response = await client.get(f"{url.rstrip('/')}/health", timeout=timeout)
+        except httpx.HTTPError:
+            return False
+        return response.is_success
+
+    results = await asyncio.gather(*(probe(url) for url in urls for _ in range(connections)))
+    opened: Dict[str, int] = {url: 0 for url in urls}
+    for index, ok in enumerate(results):
+        opened[urls[index // connections]] += ok
+    return opened
+
+
+def get_pool_stats(client: httpx.AsyncClient) -> Dict[str, Any]:
+    """
+    Summarize the connection pool state of an AsyncClient.
+    
+    httpx does not expose pool statistics publicly, so this inspects the underlying
+    httpcore pool defensively; unknown transports (e.g. MockTransport) report zeros.
+    
+    Parameters:
+        client (httpx.AsyncClient): The client whose default transport pool is inspected.
+    
+    Returns:
+        dict: Mapping with `active`, `idle`, `waiting` and `total` connection counts,
+        plus `http2` connection count and `closed` flag for the client.
+    """
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    waiting = [r for r in getattr(pool, "_requests", []) or [] if getattr(r, "is_queued", lambda: False)()]
+
+    idle = sum(1 for conn in connections if conn.is_idle())
+    http2 = sum(1 for conn in connections if conn.info().startswith("HTTP/2"))
+    return {
+        "active": len(connections) - idle,
+        "idle": idle,
+        "waiting": len(waiting),
+        "total": len(connections),
+        "http2": http2,
+        "closed": client.is_closed,
+    }
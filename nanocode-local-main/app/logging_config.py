@@ -1,6 +1,13 @@
 """Structured logging configuration for the FastAPI app."""
+import json
 import logging
+import queue
+from datetime import datetime, timezone
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from app import metrics
 
 
 LOGGING_CONFIG = {
@@ -9,7 +16,10 @@ LOGGING_CONFIG = {
     "formatters": {
         "default": {
             "format": "%(asctime)s %(levelname)s [%(name)s] %(message)s",
-        }
+        },
+        "json": {
+            "()": "app.logging_config.JsonFormatter",
+        },
     },
     "handlers": {
         "console": {
@@ -23,14 +33,109 @@ LOGGING_CONFIG = {
     },
 }
 
+# Attributes every LogRecord has; anything else on a record came from `extra=`.
+_RECORD_ATTRIBUTES = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+# Listener draining the queue in async mode; replaced on every `configure_logging` call.
+_listener: Optional[QueueListener] = None
 
-def configure_logging(level: str = "INFO") -> None:
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one JSON object per line, including the fields passed via `extra=`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hand records to a bounded queue without ever blocking the caller.
+
+    `prepare` (inherited) formats the record in the calling thread, so the listener
+    thread only writes finished lines and no mutable arguments cross threads. When the
+    queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.LOG_RECORDS_DROPPED.inc()
+
+
+def configure_logging(
+    level: str = "INFO",
+    fmt: str = "text",
+    async_queue_size: int = 0,
+) -> None:
     """
     Configure the module-wide logging using the provided root logger level.
-    
+
+    With `async_queue_size > 0`, the root logger only enqueues records; a background
+    `QueueListener` thread writes them, so a slow stdout consumer cannot stall the event
+    loop. Records arriving while the queue is full are dropped and counted in
+    `nanocode_log_records_dropped_total`. Records below `level` are discarded by the
+    logger before any formatting happens, in either mode.
+
     Parameters:
         level (str): Logging level name for the root logger (e.g., "DEBUG", "INFO", "WARNING").
+        fmt (str): "text" for the human-readable format, "json" for one JSON object per line including `extra` fields.
+        async_queue_size (int): Capacity of the queue in front of the writer thread; 0 writes synchronously.
+
+    Raises:
+        ValueError: If `fmt` is not "text" or "json".
     """
+    if fmt not in ("text", "json"):
+        raise ValueError(f"Unknown log format {fmt!r}; expected 'text' or 'json'")
+    shutdown_logging()
     LOGGING_CONFIG["root"]["level"] = level
+    LOGGING_CONFIG["handlers"]["console"]["formatter"] = "json" if fmt == "json" else "default"
     dictConfig(LOGGING_CONFIG)
-    logging.getLogger(__name__).debug("Logging configured", extra={"level": level})
\ No newline at end of file
+
+    if async_queue_size > 0:
+        global _listener
+        root = logging.getLogger()
+        writers = list(root.handlers)
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=async_queue_size)
+        handler = DroppingQueueHandler(log_queue)
+        # Serialize in the caller (see DroppingQueueHandler); the writers emit the finished line as is.
+        handler.setFormatter(writers[0].formatter)
+        for writer in writers:
+            writer.setFormatter(logging.Formatter("%(message)s"))
+        root.handlers = [handler]
+        _listener = QueueListener(log_queue, *writers, respect_handler_level=True)
+        _listener.start()
+    logging.getLogger(__name__).debug("Logging configured", extra={"level": level})
+
+
+def shutdown_logging() -> None:
+    """Stop the background writer, if any, after it has written every queued record."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    # Log synchronously from here on rather than into a queue nobody drains.
+    root = logging.getLogger()
+    formatter = root.handlers[0].formatter if root.handlers else None
+    for writer in _listener.handlers:
+        writer.setFormatter(formatter)
+    root.handlers = list(_listener.handlers)
+    _listener = None
@@ -1,17 +1,94 @@
 """FastAPI application entrypoint."""
+import time
+
+# Measured by the module itself so /admin/startup can report it; keep this first.
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import get_settings
 from app.health import router as health_router
-from app.logging_config import configure_logging
+from app.http_pool import create_http_client, warm_up
+from app.logging_config import configure_logging, shutdown_logging
+from app.metrics import IN_FLIGHT, REQUEST_DURATION, RESPONSES
 from app.routers.admin_router import router as admin_router
 from app.routers.nanocode_router import router as nanocode_router
+from app.traces import TraceStore
+from nanocode.metrics import RequestMetricsMiddleware
+from nanocode.startup import StartupReport
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
+logger = logging.getLogger(__name__)
+
 
-settings = get_settings()
-configure_logging(settings.log_level)
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Own process-wide resources for the lifetime of the application.
+    
+    Settings are read and logging configured here rather than at import time, so
+    importing the app has no side effects. Startup opens the pooled model server HTTP
+    client and warms it with `model_client_warmup_connections` connections per model
+    server, and opens the trace store when `trace_enabled` is set; shutdown writes the
+    remaining traces, closes the client and drains the log queue. The timings are kept in
+    `app.state.startup`.
+    
+    Parameters:
+        app (FastAPI): The application whose `state` receives the shared resources.
+    """
+    report = StartupReport(IMPORT_SECONDS)
+    app.state.startup = report
+    settings = get_settings()
+    configure_logging(
+        settings.log_level,
+        settings.log_format,
+        async_queue_size=settings.log_queue_size if settings.log_async else 0,
+    )
+    with report.phase("http_client"):
+        app.state.http_client = create_http_client(settings)
+    if settings.model_client_warmup_connections > 0:
+        urls = [str(url) for url in settings.model_server_urls or [settings.model_server_url]]
+        with report.phase("warmup"):
+            await warm_up(
+                app.state.http_client,
+                urls,
+                settings.model_client_warmup_connections,
+                settings.model_client_warmup_timeout,
+            )
+    if settings.trace_enabled:
+        with report.phase("traces"):
+            app.state.trace_store = TraceStore(
+                settings.trace_dir,
+                buffer_size=settings.trace_buffer_size,
+                flush_interval=settings.trace_flush_interval_seconds,
+                flush_batch=settings.trace_flush_batch,
+                segment_bytes=settings.trace_segment_bytes,
+                max_segments=settings.trace_max_segments,
+            )
+    report.ready()
+    logger.info(
+        "Startup complete in %.1f ms (imports %.1f ms)", report.ready_seconds * 1000.0, IMPORT_SECONDS * 1000.0
+    )
+    try:
+        yield
+    finally:
+        trace_store = getattr(app.state, "trace_store", None)
+        if trace_store is not None:
+            # Joins the writer thread, which may still be writing its last block.
+            await asyncio.to_thread(trace_store.close)
+            del app.state.trace_store
+        await app.state.http_client.aclose()
+        del app.state.http_client
+        shutdown_logging()
 
-app = FastAPI(title="Nanocode API", version="0.1.0")
+
+app = FastAPI(title="Nanocode API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,6 +103,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    RequestMetricsMiddleware,
+    duration=REQUEST_DURATION,
+    responses=RESPONSES,
+    in_flight=IN_FLIGHT,
+    skip_paths=("/admin/metrics",),
+)
+
 app.include_router(health_router)
 app.include_router(nanocode_router)
 app.include_router(admin_router)
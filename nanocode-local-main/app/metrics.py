@@ -0,0 +1,93 @@
+"""Process-wide metrics for the Nanocode API, exposed at `/admin/metrics`."""
+from nanocode.metrics import Registry
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.histogram(
+    "nanocode_request_duration_seconds",
+    "Total time spent handling an HTTP request, until the last response byte.",
+    ("route",),
+)
+RESPONSES = REGISTRY.counter(
+    "nanocode_responses_total",
+    "HTTP responses by route and status code.",
+    ("route", "status"),
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "nanocode_requests_in_flight",
+    "HTTP requests currently being handled.",
+)
+STAGE_DURATION = REGISTRY.histogram(
+    "nanocode_stage_duration_seconds",
+    "Time spent in each stage of a generation request.",
+    ("stage",),
+)
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "nanocode_upstream_errors_total",
+    "Failed model server calls by kind (status, timeout, connect or circuit_open).",
+    ("kind",),
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "nanocode_admission_rejected_total",
+    "Requests shed by admission control by reason (queue_full, preempted, queue_timeout or deadline_exceeded).",
+    ("reason",),
+)
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    "nanocode_admission_queue_depth",
+    "Requests waiting for an upstream slot by priority class.",
+    ("priority",),
+)
+ADMISSION_QUEUE_WAIT = REGISTRY.histogram(
+    "nanocode_admission_queue_wait_seconds",
+    "Time admitted requests waited for an upstream slot by priority class.",
+    ("priority",),
+)
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "nanocode_upstream_retries_total",
+    "Model server calls retried after a retryable failure, by kind (status or connect).",
+    ("kind",),
+)
+UPSTREAM_HEDGES = REGISTRY.counter(
+    "nanocode_upstream_hedges_total",
+    "Hedged model server calls by outcome (fired, or won when the hedge finished first).",
+    ("outcome",),
+)
+CIRCUIT_STATE = REGISTRY.gauge(
+    "nanocode_circuit_state",
+    "Circuit breaker state per model server endpoint (0 closed, 1 half-open, 2 open).",
+    ("endpoint",),
+)
+CIRCUIT_REJECTED = REGISTRY.counter(
+    "nanocode_circuit_rejected_total",
+    "Model server calls failed fast by an open circuit, per endpoint.",
+    ("endpoint",),
+)
+BATCH_ITEMS = REGISTRY.counter(
+    "nanocode_batch_items_total",
+    "Items processed by /nanocode/batch by outcome (ok or error).",
+    ("outcome",),
+)
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    "nanocode_log_records_dropped_total",
+    "Log records dropped because the async logging queue was full.",
+)
+PROMPTS_OVER_BUDGET = REGISTRY.counter(
+    "nanocode_prompts_over_budget_total",
+    "Prompts over the token budget by action (truncated or rejected).",
+    ("action",),
+)
+PROMPT_TOKENS = REGISTRY.histogram(
+    "nanocode_prompt_tokens",
+    "Tokens per assembled prompt, counted when a token budget is configured.",
+    buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072),
+)
+TRACES_DROPPED = REGISTRY.counter(
+    "nanocode_traces_dropped_total",
+    "Traces dropped unwritten because the trace buffer was full.",
+)
+
+# Stage children are resolved once so the request path only pays for `observe`.
+VALIDATE = STAGE_DURATION.labels("validate")
+PREPROCESS = STAGE_DURATION.labels("preprocess")
+UPSTREAM = STAGE_DURATION.labels("upstream")
+POSTPROCESS = STAGE_DURATION.labels("postprocess")
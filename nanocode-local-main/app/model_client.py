@@ -1,24 +1,49 @@
 """Client for communicating with the local model server."""
-from typing import Any, Dict, Optional
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 import httpx
 
+from app import metrics
+from app.endpoint_pool import EndpointPool
+from app.resilience import CircuitBreaker, Resilience, counts_as_failure
+from nanocode.serialization import loads
+
 
 class ModelClient:
-    def __init__(self, base_url: str, client: Optional[httpx.AsyncClient] = None) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        client: Optional[httpx.AsyncClient] = None,
+        timeout: Union[float, httpx.Timeout] = 30.0,
+        resilience: Optional[Resilience] = None,
+        pool: Optional[EndpointPool] = None,
+    ) -> None:
         """
         Initialize the ModelClient with the server base URL and an optional HTTP client.
         
         Parameters:
             base_url (str): Base URL of the model server; any trailing slashes are removed.
-            client (Optional[httpx.AsyncClient]): External AsyncClient to use for requests. If omitted, a temporary AsyncClient will be created per request.
+            client (Optional[httpx.AsyncClient]): External AsyncClient to use for requests, normally the process-wide pooled client created in the app lifespan. If omitted, a temporary AsyncClient will be created per request.
+            timeout (float | httpx.Timeout): Timeout applied to each call to the model server.
+            resilience (Optional[Resilience]): Retry, hedging and circuit breaker policies shared across clients. Without it each call makes a single attempt.
+            pool (Optional[EndpointPool]): Replicas to balance calls across, in which case `base_url` is not used for calls. Retries and hedges prefer an endpoint not yet tried.
         """
         self.base_url = base_url.rstrip("/")
         self._client = client
+        self.timeout = timeout
+        self.resilience = resilience
+        self.pool = pool
 
     async def generate(self, prompt: str, **kwargs: Any) -> Dict[str, Any]:
         """
         Send the prompt to the model server's /generate endpoint and return the parsed JSON response.
         
+        With a `resilience` policy, retryable failures are retried with jittered
+        exponential backoff, a slow attempt may be hedged by a second one (the first to
+        succeed wins), and calls fail fast with `CircuitOpenError` while the endpoint's
+        circuit is open.
+        
         Parameters:
             prompt (str): Text prompt to send to the model.
             **kwargs: Additional key/value pairs to include in the request JSON body.
@@ -28,19 +53,211 @@ class ModelClient:
         
         Raises:
             httpx.HTTPStatusError: If the server responds with an HTTP error status.
+            CircuitOpenError: If the endpoint's circuit is open (an `httpx.TransportError`).
+        """
+        payload = {"prompt": prompt, **kwargs}
+        if self.resilience is None and self.pool is None:
+            return await self._post(payload, self.base_url)
+
+        retry = self.resilience.retry if self.resilience is not None else None
+        if self.resilience is not None:
+            self.resilience.calls += 1
+        tried: List[str] = []
+        attempt = 1
+        while True:
+            try:
+                return await self._hedged(payload, tried)
+            except Exception as exc:
+                if retry is None or attempt >= retry.max_attempts or not retry.retryable(exc):
+                    raise
+                kind = "status" if isinstance(exc, httpx.HTTPStatusError) else "connect"
+                metrics.UPSTREAM_RETRIES.labels(kind).inc()
+                await asyncio.sleep(retry.delay(attempt))
+                attempt += 1
+
+    async def generate_stream(self, prompt: str, **kwargs: Any) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a generation from the model server's /generate/stream endpoint.
+        
+        With a `resilience` policy, the circuit breaker applies and opening the stream is
+        retried like `generate`; once the first event has arrived nothing is retried.
+        Streams are never hedged.
+        
+        Parameters:
+            prompt (str): Text prompt to send to the model.
+            **kwargs: Additional key/value pairs to include in the request JSON body.
+        
+        Yields:
+            dict: Decoded Server-Sent-Event payloads in arrival order: `{"type": "delta", "delta": str}` frames followed by a final `{"type": "done", "metadata": dict}` (or `{"type": "error", "detail": str}`).
+        
+        Raises:
+            httpx.HTTPStatusError: If the server responds with an HTTP error status before streaming starts.
         """
         payload = {"prompt": prompt, **kwargs}
+        if self.resilience is None and self.pool is None:
+            async for event in self._stream(payload, self.base_url):
+                yield event
+            return
+
+        retry = self.resilience.retry if self.resilience is not None else None
+        tried: List[str] = []
+        attempt = 1
+        while True:
+            url = self._pick(tried)
+            breaker = self._breaker(url)
+            if breaker is not None:
+                breaker.before_call(self._request(url, "/generate/stream"))
+            if self.pool is not None:
+                self.pool.started(url)
+            started_at = time.perf_counter()
+            first_event_latency: Optional[float] = None
+            failed = False
+            try:
+                async for event in self._stream(payload, url):
+                    if first_event_latency is None:
+                        first_event_latency = time.perf_counter() - started_at
+                        if breaker is not None:
+                            breaker.record_success()
+                    yield event
+                if first_event_latency is None and breaker is not None:
+                    breaker.record_success()
+                return
+            except Exception as exc:
+                failed = True
+                if first_event_latency is not None:
+                    raise
+                if breaker is not None:
+                    _record(breaker, exc)
+                if retry is None or attempt >= retry.max_attempts or not retry.retryable(exc):
+                    raise
+                kind = "status" if isinstance(exc, httpx.HTTPStatusError) else "connect"
+                metrics.UPSTREAM_RETRIES.labels(kind).inc()
+            except BaseException:
+                if first_event_latency is None and breaker is not None:
+                    breaker.abandon()
+                raise
+            finally:
+                if self.pool is not None:
+                    # Streams are balanced on time to first event, not on their full length.
+                    self.pool.finished(url, None if failed else first_event_latency, failed)
+            await asyncio.sleep(retry.delay(attempt))
+            attempt += 1
+
+    async def _hedged(self, payload: Dict[str, Any], tried: List[str]) -> Dict[str, Any]:
+        url = self._pick(tried)
+        delay = self.resilience.hedge_delay(url) if self.resilience is not None else None
+        if delay is None:
+            return await self._attempt(payload, url)
+
+        primary = asyncio.ensure_future(self._attempt(payload, url))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.resilience.hedges += 1
+                metrics.UPSTREAM_HEDGES.labels("fired").inc()
+                # With several endpoints the hedge goes to a different one.
+                tasks.add(asyncio.ensure_future(self._attempt(payload, self._pick(tried))))
+            pending = tasks
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Retrieve every outcome so a failed loser is not reported as unhandled.
+                outcomes = {task: task.exception() for task in done}
+                for task, exc in outcomes.items():
+                    if exc is None:
+                        if task is not primary:
+                            metrics.UPSTREAM_HEDGES.labels("won").inc()
+                        return task.result()
+                    if error is None or task is primary:
+                        error = exc
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _attempt(self, payload: Dict[str, Any], url: str) -> Dict[str, Any]:
+        breaker = self._breaker(url)
+        if breaker is not None:
+            breaker.before_call(self._request(url, "/generate"))
+        if self.pool is not None:
+            self.pool.started(url)
+        started = time.perf_counter()
+        try:
+            result = await self._post(payload, url)
+        except Exception as exc:
+            if self.pool is not None:
+                self.pool.finished(url, None, failed=True)
+            if breaker is not None:
+                _record(breaker, exc)
+            raise
+        except BaseException:
+            # Cancelled, e.g. a losing hedge: it took at least this long.
+            if self.pool is not None:
+                self.pool.finished(url, time.perf_counter() - started)
+            if breaker is not None:
+                breaker.abandon()
+            raise
+        latency = time.perf_counter() - started
+        if self.pool is not None:
+            self.pool.finished(url, latency)
+        if self.resilience is not None:
+            self.resilience.latencies(url).observe(latency)
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+    def _pick(self, tried: List[str]) -> str:
+        url = self.pool.pick(tried) if self.pool is not None else self.base_url
+        tried.append(url)
+        return url
+
+    def _breaker(self, url: str) -> Optional[CircuitBreaker]:
+        return self.resilience.breaker(url) if self.resilience is not None else None
 
-        # When no client is injected we create a short-lived AsyncClient. This keeps
-        # current behavior while leaving room to share a client at app startup later.
+    def _request(self, url: str, path: str) -> httpx.Request:
+        return httpx.Request("POST", f"{url}{path}")
+
+    async def _post(self, payload: Dict[str, Any], url: str) -> Dict[str, Any]:
+        # Without a shared client (e.g. the app lifespan has not run) fall back to a
+        # short-lived AsyncClient; this pays a fresh connection on every call.
         if self._client is None:
-            async with httpx.AsyncClient(base_url=self.base_url) as client:
-                response = await client.post("/generate", json=payload, timeout=30.0)
+            async with httpx.AsyncClient(base_url=url) as client:
+                response = await client.post("/generate", json=payload, timeout=self.timeout)
                 response.raise_for_status()
-                return response.json()
+                return loads(response.content)
 
-        # If a client is provided (e.g., in tests with MockTransport), use it and
-        # send an absolute URL to avoid relying on its base_url configuration.
-        response = await self._client.post(f"{self.base_url}/generate", json=payload, timeout=30.0)
+        # The shared client keeps connections alive across calls. Send an absolute URL
+        # so it does not matter which base_url (if any) the client was configured with.
+        response = await self._client.post(f"{url}/generate", json=payload, timeout=self.timeout)
         response.raise_for_status()
-        return response.json()
+        return loads(response.content)
+
+    async def _stream(self, payload: Dict[str, Any], url: str) -> AsyncIterator[Dict[str, Any]]:
+        if self._client is None:
+            async with httpx.AsyncClient(base_url=url) as client:
+                async for event in self._iter_events(client, "/generate/stream", payload):
+                    yield event
+            return
+
+        async for event in self._iter_events(self._client, f"{url}/generate/stream", payload):
+            yield event
+
+    async def _iter_events(
+        self, client: httpx.AsyncClient, url: str, payload: Dict[str, Any]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        async with client.stream("POST", url, json=payload, timeout=self.timeout) as response:
+            if response.is_error:
+                await response.aread()
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    yield loads(line[5:])
+
+
+def _record(breaker: CircuitBreaker, exc: BaseException) -> None:
+    # Client errors (4xx) say nothing about the endpoint's health.
+    if counts_as_failure(exc):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
@@ -0,0 +1,275 @@
+"""Retry, hedging and circuit breaking policies for model server calls."""
+import random
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, FrozenSet, List, Optional
+
+import httpx
+
+from app import metrics
+
+# Circuit states, also the values of the `nanocode_circuit_state` gauge.
+CLOSED = 0
+HALF_OPEN = 1
+OPEN = 2
+_STATE_NAMES = {CLOSED: "closed", HALF_OPEN: "half_open", OPEN: "open"}
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of calling an endpoint whose circuit is open."""
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Bounded retries with jittered exponential backoff.
+
+    Only failures where a repeat is safe and likely to help are retried: the request
+    never reached the server (connect errors, pool and connect timeouts), or the server
+    answered with one of `retry_statuses` (overload or gateway errors). Read timeouts are
+    not retried; a slow attempt is what hedging is for.
+    """
+
+    max_attempts: int = 3
+    base_delay: float = 0.05
+    max_delay: float = 1.0
+    retry_statuses: FrozenSet[int] = frozenset({502, 503, 504})
+
+    def retryable(self, exc: BaseException) -> bool:
+        if isinstance(exc, CircuitOpenError):
+            return False
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code in self.retry_statuses
+        return isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+    def delay(self, attempt: int) -> float:
+        """Full-jitter backoff before retry number `attempt` (1-based)."""
+        return random.uniform(0.0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class LatencyWindow:
+    def __init__(self, size: int = 256) -> None:
+        """
+        Initialize a window of the most recent successful call latencies.
+
+        Percentiles are computed from a sorted copy that is rebuilt lazily, at most once
+        per 16 new samples, so asking for the hedge delay on every call stays cheap.
+        """
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._sorted: List[float] = []
+        self._stale = 0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, latency: float) -> None:
+        self._samples.append(latency)
+        self._stale += 1
+
+    def percentile(self, q: float) -> float:
+        """Return the `q`-th percentile (0-100) of the window, or 0.0 when it is empty."""
+        if self._stale >= 16 or len(self._sorted) != len(self._samples):
+            self._sorted = sorted(self._samples)
+            self._stale = 0
+        if not self._sorted:
+            return 0.0
+        index = min(len(self._sorted) - 1, int(len(self._sorted) * q / 100.0))
+        return self._sorted[index]
+
+
+@dataclass
+class HedgePolicy:
+    """
+    Fire a second attempt when the first is slower than recent calls usually are.
+
+    The delay is the `percentile` of recent latencies for the endpoint, but never below
+    `min_delay`, and no hedge is sent before `min_samples` latencies are known. At most
+    `max_ratio` of calls are hedged, which bounds the extra upstream load.
+    """
+
+    percentile: float = 95.0
+    min_delay: float = 0.05
+    min_samples: int = 20
+    max_ratio: float = 0.1
+
+
+@dataclass
+class CircuitStats:
+    opened: int = 0
+    rejected: int = 0
+    failures: int = 0
+    successes: int = 0
+
+
+class CircuitBreaker:
+    def __init__(self, endpoint: str, failure_threshold: int = 5, reset_seconds: float = 10.0) -> None:
+        """
+        Initialize a closed circuit for one upstream endpoint.
+
+        After `failure_threshold` consecutive failures the circuit opens and calls fail
+        immediately with `CircuitOpenError`. Once `reset_seconds` have passed a single
+        trial call is let through (half-open): its success closes the circuit, its failure
+        opens it again for another `reset_seconds`.
+
+        Parameters:
+            endpoint (str): Base URL the breaker protects; used as the metric label.
+            failure_threshold (int): Consecutive failures that open the circuit.
+            reset_seconds (float): Time the circuit stays open before a trial call.
+        """
+        self.endpoint = endpoint
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.stats = CircuitStats()
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._gauge = metrics.CIRCUIT_STATE.labels(endpoint)
+
+    def before_call(self, request: Optional[httpx.Request] = None) -> None:
+        """
+        Admit a call or fail fast.
+
+        Parameters:
+            request (Optional[httpx.Request]): The request about to be sent, attached to the error.
+
+        Raises:
+            CircuitOpenError: While the circuit is open, or half-open with a trial call already in flight.
+        """
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self._set_state(HALF_OPEN)
+        if self.state == CLOSED:
+            return
+        if self.state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        self.stats.rejected += 1
+        metrics.CIRCUIT_REJECTED.labels(self.endpoint).inc()
+        raise CircuitOpenError(f"Circuit open for {self.endpoint}", request=request)
+
+    def available(self) -> bool:
+        """Whether `before_call` would admit a call now."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return time.monotonic() - self._opened_at >= self.reset_seconds
+        return not self._trial_in_flight
+
+    def record_success(self) -> None:
+        self.stats.successes += 1
+        self._consecutive_failures = 0
+        self._trial_in_flight = False
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        self.stats.failures += 1
+        self._consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.stats.opened += 1
+            self._opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def abandon(self) -> None:
+        """Forget a call that was cancelled before it had an outcome (e.g. a losing hedge)."""
+        self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **asdict(self.stats),
+            "state": _STATE_NAMES[self.state],
+            "consecutive_failures": self._consecutive_failures,
+        }
+
+    def _set_state(self, state: int) -> None:
+        self.state = state
+        self._gauge.set(state)
+
+
+def counts_as_failure(exc: BaseException) -> bool:
+    """Whether an error says the endpoint is unhealthy (as opposed to a bad request)."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError) and not isinstance(exc, CircuitOpenError)
+
+
+class Resilience:
+    def __init__(
+        self,
+        retry: Optional[RetryPolicy] = None,
+        hedge: Optional[HedgePolicy] = None,
+        breaker_failure_threshold: Optional[int] = 5,
+        breaker_reset_seconds: float = 10.0,
+    ) -> None:
+        """
+        Hold the process-wide resilience policies and per-endpoint state for ModelClient.
+
+        ModelClient instances are cheap and created per request, so circuit breakers and
+        latency windows live here, keyed by endpoint base URL.
+
+        Parameters:
+            retry (Optional[RetryPolicy]): Retry policy; `None` makes one attempt per call.
+            hedge (Optional[HedgePolicy]): Hedging policy for non-streaming calls; `None` disables hedging.
+            breaker_failure_threshold (Optional[int]): Consecutive failures that open an endpoint's circuit; `None` disables circuit breaking.
+            breaker_reset_seconds (float): Time an open circuit waits before a trial call.
+        """
+        self.retry = retry
+        self.hedge = hedge
+        self.breaker_failure_threshold = breaker_failure_threshold
+        self.breaker_reset_seconds = breaker_reset_seconds
+        self.calls = 0
+        self.hedges = 0
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyWindow] = {}
+
+    @property
+    def max_attempts(self) -> int:
+        return self.retry.max_attempts if self.retry is not None else 1
+
+    def breaker(self, endpoint: str) -> Optional[CircuitBreaker]:
+        if self.breaker_failure_threshold is None:
+            return None
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = self._breakers[endpoint] = CircuitBreaker(
+                endpoint, self.breaker_failure_threshold, self.breaker_reset_seconds
+            )
+        return breaker
+
+    def latencies(self, endpoint: str) -> LatencyWindow:
+        window = self._latencies.get(endpoint)
+        if window is None:
+            window = self._latencies[endpoint] = LatencyWindow()
+        return window
+
+    def hedge_delay(self, endpoint: str) -> Optional[float]:
+        """
+        Decide whether the next call to `endpoint` may be hedged, and after how long.
+
+        Returns:
+            Optional[float]: Seconds to wait before the hedge, or `None` when hedging is disabled, there are too few samples, or the hedge budget is spent.
+        """
+        if self.hedge is None:
+            return None
+        window = self.latencies(endpoint)
+        if len(window) < self.hedge.min_samples or self.hedges >= self.hedge.max_ratio * self.calls:
+            return None
+        return max(self.hedge.min_delay, window.percentile(self.hedge.percentile))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report retry and hedge settings, hedge usage and each endpoint's circuit.
+
+        Returns:
+            dict: `max_attempts`, `hedging`, `calls`, `hedges` and `circuits` keyed by endpoint.
+        """
+        return {
+            "max_attempts": self.max_attempts,
+            "hedging": self.hedge is not None,
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "circuits": {endpoint: breaker.snapshot() for endpoint, breaker in self._breakers.items()},
+        }
@@ -0,0 +1,306 @@
+"""Bounded cache of upstream model responses keyed on the final prompt."""
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Protocol, Tuple
+
+from nanocode.serialization import dumps, loads
+
+
+def make_cache_key(prompt: str, model_identity: str) -> str:
+    """
+    Derive the cache key for a prompt sent to a particular model.
+
+    Parameters:
+        prompt (str): The fully built prompt string sent upstream.
+        model_identity (str): Identifies the model the prompt is sent to (e.g. server URL plus namespace).
+
+    Returns:
+        str: Hex SHA-256 digest over the model identity and prompt.
+    """
+    digest = hashlib.sha256()
+    digest.update(model_identity.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+class CacheBackend(Protocol):
+    """Storage for serialized cache entries with LRU eviction."""
+
+    def get(self, key: str, now: float) -> Optional[bytes]:
+        ...
+
+    def set(self, key: str, value: bytes, expires_at: float) -> None:
+        ...
+
+    def purge(self) -> int:
+        ...
+
+    def usage(self) -> Tuple[int, int]:
+        ...
+
+
+class MemoryCacheBackend:
+    def __init__(self, max_entries: int, max_bytes: int, stats: CacheStats) -> None:
+        """
+        Initialize an in-process LRU backend.
+
+        Parameters:
+            max_entries (int): Maximum number of entries kept before the least recently used is evicted.
+            max_bytes (int): Maximum total size of stored values in bytes.
+            stats (CacheStats): Counters updated on eviction and expiry.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = stats
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: str, now: float) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= now:
+            self._remove(key)
+            self.stats.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes, expires_at: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expires_at, value)
+        self._bytes += len(value)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def purge(self) -> int:
+        count = len(self._entries)
+        self._entries.clear()
+        self._bytes = 0
+        return count
+
+    def usage(self) -> Tuple[int, int]:
+        return len(self._entries), self._bytes
+
+    def _remove(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+
+class SQLiteCacheBackend:
+    def __init__(self, path: str, max_entries: int, max_bytes: int, stats: CacheStats) -> None:
+        """
+        Initialize an on-disk LRU backend that survives process restarts.
+
+        Parameters:
+            path (str): SQLite database file; created if missing.
+            max_entries (int): Maximum number of entries kept before the least recently used is evicted.
+            max_bytes (int): Maximum total size of stored values in bytes.
+            stats (CacheStats): Counters updated on eviction and expiry.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = stats
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS response_cache_lru ON response_cache (last_access)"
+        )
+
+    def get(self, key: str, now: float) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self.stats.expirations += 1
+                return None
+            self._conn.execute(
+                "UPDATE response_cache SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            return bytes(value)
+
+    def set(self, key: str, value: bytes, expires_at: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, size, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), expires_at, time.time()),
+            )
+            self._evict()
+
+    def purge(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM response_cache").rowcount
+
+    def usage(self) -> Tuple[int, int]:
+        with self._lock:
+            return self._usage()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _usage(self) -> Tuple[int, int]:
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache"
+        ).fetchone()
+        return count, total
+
+    def _evict(self) -> None:
+        count, total = self._usage()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Walk entries oldest-first and drop until both limits are satisfied.
+        doomed = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM response_cache ORDER BY last_access ASC"
+        ):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM response_cache WHERE key = ?", doomed)
+        self.stats.evictions += len(doomed)
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend, ttl_seconds: float, stats: CacheStats) -> None:
+        """
+        Initialize the response cache.
+
+        Parameters:
+            backend (CacheBackend): Storage backend holding serialized responses.
+            ttl_seconds (float): Lifetime of each entry from the moment it is stored.
+            stats (CacheStats): Hit/miss/eviction counters shared with the backend.
+        """
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.stats = stats
+        self._blocking = isinstance(backend, SQLiteCacheBackend)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached upstream response.
+
+        Parameters:
+            key (str): Cache key from `make_cache_key`.
+
+        Returns:
+            Optional[dict]: A fresh copy of the cached response, or `None` on a miss or expired entry.
+        """
+        value = await self._call(self.backend.get, key, time.time())
+        if value is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return loads(value)
+
+    async def set(self, key: str, response: Dict[str, Any]) -> None:
+        """
+        Store an upstream response.
+
+        Parameters:
+            key (str): Cache key from `make_cache_key`.
+            response (dict): JSON-serializable upstream response. It is serialized immediately, so later mutation by the caller does not affect the cached copy.
+        """
+        value = dumps(response)
+        await self._call(self.backend.set, key, value, time.time() + self.ttl_seconds)
+
+    async def purge(self) -> int:
+        """
+        Remove every cached entry.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        return await self._call(self.backend.purge)
+
+    async def snapshot(self) -> Dict[str, Any]:
+        """
+        Report cache counters and current occupancy.
+
+        Returns:
+            dict: Hits, misses, evictions, expirations, hit ratio, entry count and stored bytes.
+        """
+        entries, size = await self._call(self.backend.usage)
+        lookups = self.stats.hits + self.stats.misses
+        return {
+            **asdict(self.stats),
+            "hit_ratio": round(self.stats.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    async def _call(self, func, *args):
+        # SQLite work is blocking disk I/O; keep it off the event loop.
+        if self._blocking:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+
+def create_response_cache(
+    backend: str,
+    ttl_seconds: float,
+    max_entries: int,
+    max_bytes: int,
+    sqlite_path: str = "nanocode_cache.sqlite3",
+) -> ResponseCache:
+    """
+    Build a ResponseCache with the requested storage backend.
+
+    Parameters:
+        backend (str): "memory" for an in-process LRU or "sqlite" for an on-disk cache that survives restarts.
+        ttl_seconds (float): Entry lifetime in seconds.
+        max_entries (int): Maximum number of cached responses.
+        max_bytes (int): Maximum total size of cached responses in bytes.
+        sqlite_path (str): Database file used by the "sqlite" backend.
+
+    Returns:
+        ResponseCache: The configured cache.
+
+    Raises:
+        ValueError: If `backend` is not a known backend name.
+    """
+    stats = CacheStats()
+    if backend == "memory":
+        store: CacheBackend = MemoryCacheBackend(max_entries, max_bytes, stats)
+    elif backend == "sqlite":
+        store = SQLiteCacheBackend(sqlite_path, max_entries, max_bytes, stats)
+    else:
+        raise ValueError(f"Unknown response cache backend: {backend}")
+    return ResponseCache(store, ttl_seconds, stats)
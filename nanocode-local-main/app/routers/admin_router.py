@@ -1,5 +1,30 @@
-"""Admin endpoints placeholder."""
-from fastapi import APIRouter
+"""Admin endpoints for operational introspection."""
+import asyncio
+from typing import Optional
+
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+
+from app.admission import AdmissionController
+from app.dependencies import (
+    get_admission_controller,
+    get_endpoint_pool,
+    get_http_client,
+    get_resilience,
+    get_response_cache,
+    get_semantic_cache,
+    get_singleflight,
+    get_trace_store,
+)
+from app.endpoint_pool import EndpointPool
+from app.http_pool import get_pool_stats
+from app.metrics import REGISTRY
+from app.resilience import Resilience
+from app.response_cache import ResponseCache
+from app.semantic_cache import SemanticCache
+from app.singleflight import SingleFlight
+from app.traces import TraceStore
+from nanocode.metrics import CONTENT_TYPE
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -12,4 +37,258 @@ async def ping() -> dict:
     Returns:
         dict: A mapping containing {"status": "ok"}.
     """
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@router.get("/metrics")
+async def metrics() -> Response:
+    """
+    Expose request, stage and upstream metrics in the Prometheus text format.
+    
+    Returns:
+        Response: `text/plain; version=0.0.4` exposition of every registered metric.
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@router.get("/pool")
+async def pool_stats(http_client: Optional[httpx.AsyncClient] = Depends(get_http_client)) -> dict:
+    """
+    Report connection pool statistics for the shared model server client.
+    
+    Parameters:
+        http_client (Optional[httpx.AsyncClient]): Shared pooled client provided via Depends(get_http_client).
+    
+    Returns:
+        dict: {"status": "ok", "pool": {...}} with active, idle and waiting connection counts, or {"status": "unavailable"} when no shared client is running.
+    """
+    if http_client is None:
+        return {"status": "unavailable"}
+    return {"status": "ok", "pool": get_pool_stats(http_client)}
+
+
+@router.get("/startup")
+async def startup_stats(request: Request) -> dict:
+    """
+    Report how long the app took to import and to start (see nanocode/startup.py).
+    
+    Parameters:
+        request (Request): Incoming request, used to reach `app.state`.
+    
+    Returns:
+        dict: {"status": "ok", "startup": {...}} with import, per-phase and total lifespan milliseconds, or {"status": "unavailable"} when the lifespan has not run.
+    """
+    report = getattr(request.app.state, "startup", None)
+    if report is None:
+        return {"status": "unavailable"}
+    return {"status": "ok", "startup": report.snapshot()}
+
+
+@router.get("/cache")
+async def cache_stats(cache: Optional[ResponseCache] = Depends(get_response_cache)) -> dict:
+    """
+    Report response cache counters and occupancy.
+    
+    Parameters:
+        cache (Optional[ResponseCache]): Process-wide response cache provided via Depends(get_response_cache).
+    
+    Returns:
+        dict: {"status": "ok", "cache": {...}} with hit/miss/eviction counters, or {"status": "disabled"}.
+    """
+    if cache is None:
+        return {"status": "disabled"}
+    return {"status": "ok", "cache": await cache.snapshot()}
+
+
+@router.post("/cache/purge")
+async def purge_cache(cache: Optional[ResponseCache] = Depends(get_response_cache)) -> dict:
+    """
+    Drop every cached response.
+    
+    Parameters:
+        cache (Optional[ResponseCache]): Process-wide response cache provided via Depends(get_response_cache).
+    
+    Returns:
+        dict: {"status": "ok", "purged": int} with the number of removed entries, or {"status": "disabled"}.
+    """
+    if cache is None:
+        return {"status": "disabled"}
+    return {"status": "ok", "purged": await cache.purge()}
+
+
+@router.get("/coalescing")
+async def coalescing_stats(singleflight: Optional[SingleFlight] = Depends(get_singleflight)) -> dict:
+    """
+    Report how many generation requests were coalesced onto an in-flight upstream call.
+    
+    Parameters:
+        singleflight (Optional[SingleFlight]): Process-wide registry provided via Depends(get_singleflight).
+    
+    Returns:
+        dict: {"status": "ok", "coalescing": {...}} with leader and coalesced counts, or {"status": "disabled"}.
+    """
+    if singleflight is None:
+        return {"status": "disabled"}
+    return {"status": "ok", "coalescing": singleflight.snapshot()}
+
+
+@router.get("/admission")
+async def admission_stats(admission: Optional[AdmissionController] = Depends(get_admission_controller)) -> dict:
+    """
+    Report the upstream concurrency limit, queue occupancy and shed requests.
+    
+    Parameters:
+        admission (Optional[AdmissionController]): Process-wide controller provided via Depends(get_admission_controller).
+    
+    Returns:
+        dict: {"status": "ok", "admission": {...}} with the current limit and admission counters, or {"status": "disabled"}.
+    """
+    if admission is None:
+        return {"status": "disabled"}
+    return {"status": "ok", "admission": admission.snapshot()}
+
+
+@router.get("/upstream")
+async def upstream_stats(resilience: Resilience = Depends(get_resilience)) -> dict:
+    """
+    Report retry and hedging settings, hedge usage and the circuit state of each model server endpoint.
+    
+    Parameters:
+        resilience (Resilience): Process-wide resilience state provided via Depends(get_resilience).
+    
+    Returns:
+        dict: {"status": "ok", "upstream": {...}}.
+    """
+    return {"status": "ok", "upstream": resilience.snapshot()}
+
+
+@router.get("/endpoints")
+async def endpoint_stats(pool: Optional[EndpointPool] = Depends(get_endpoint_pool)) -> dict:
+    """
+    Report the load-balancing strategy and the state of each model server replica.
+    
+    Parameters:
+        pool (Optional[EndpointPool]): Process-wide replica pool provided via Depends(get_endpoint_pool).
+    
+    Returns:
+        dict: {"status": "ok", "endpoints": {...}} with outstanding calls, latency EWMA and circuit state per endpoint, or {"status": "disabled"} when a single model server is configured.
+    """
+    if pool is None:
+        return {"status": "disabled"}
+    return {"status": "ok", "endpoints": pool.snapshot()}
+
+
+@router.get("/semantic-cache")
+async def semantic_cache_stats(semantic_cache: Optional[SemanticCache] = Depends(get_semantic_cache)) -> dict:
+    """
+    Report semantic cache hit rate, latency saved and the similarity distribution.
+    
+    Parameters:
+        semantic_cache (Optional[SemanticCache]): Process-wide semantic cache provided via Depends(get_semantic_cache).
+    
+    Returns:
+        dict: {"status": "ok", "semantic_cache": {...}} or {"status": "disabled"}.
+    """
+    if semantic_cache is None:
+        return {"status": "disabled"}
+    return {"status": "ok", "semantic_cache": semantic_cache.snapshot()}
+
+
+@router.post("/semantic-cache/purge")
+async def purge_semantic_cache(semantic_cache: Optional[SemanticCache] = Depends(get_semantic_cache)) -> dict:
+    """
+    Drop every semantically cached response.
+    
+    Parameters:
+        semantic_cache (Optional[SemanticCache]): Process-wide semantic cache provided via Depends(get_semantic_cache).
+    
+    Returns:
+        dict: {"status": "ok", "purged": int} with the number of removed entries, or {"status": "disabled"}.
+    """
+    if semantic_cache is None:
+        return {"status": "disabled"}
+    return {"status": "ok", "purged": semantic_cache.purge()}
+
+
+@router.get("/traces")
+async def list_traces(
+    limit: int = Query(default=100, ge=1, le=1000),
+    before: Optional[str] = Query(default=None),
+    since: Optional[float] = Query(default=None),
+    until: Optional[float] = Query(default=None),
+    route: Optional[str] = Query(default=None),
+    outcome: Optional[str] = Query(default=None),
+    constraint: Optional[str] = Query(default=None),
+    traces: Optional[TraceStore] = Depends(get_trace_store),
+) -> dict:
+    """
+    Page through request traces, newest first.
+    
+    Pass the returned `next` as `before` to get the following page; a page reads only the
+    stored blocks it overlaps, so paging stays cheap however many traces are kept.
+    
+    Parameters:
+        limit (int): Traces per page.
+        before (Optional[str]): Cursor from the previous page.
+        since (Optional[float]): Earliest request start, as a Unix timestamp.
+        until (Optional[float]): Latest request start, as a Unix timestamp.
+        route (Optional[str]): Only traces of this route, e.g. "/nanocode".
+        outcome (Optional[str]): Only traces with this outcome ("ok", "cancelled", "rejected" or "error").
+        constraint (Optional[str]): Only traces of requests with this constraint.
+        traces (Optional[TraceStore]): Trace store provided via Depends(get_trace_store).
+    
+    Returns:
+        dict: {"status": "ok", "traces": [...], "next": str | None}, or {"status": "disabled"}.
+    """
+    if traces is None:
+        return {"status": "disabled"}
+    page, cursor = await asyncio.to_thread(
+        traces.query,
+        limit=limit,
+        before=before,
+        since=since,
+        until=until,
+        route=route,
+        outcome=outcome,
+        constraint=constraint,
+    )
+    return {"status": "ok", "traces": page, "next": cursor}
+
+
+@router.get("/traces/stats")
+async def trace_stats(traces: Optional[TraceStore] = Depends(get_trace_store)) -> dict:
+    """
+    Report recorded, dropped and written traces and the size of the trace store.
+    
+    Parameters:
+        traces (Optional[TraceStore]): Trace store provided via Depends(get_trace_store).
+    
+    Returns:
+        dict: {"status": "ok", "traces": {...}}, or {"status": "disabled"}.
+    """
+    if traces is None:
+        return {"status": "disabled"}
+    return {"status": "ok", "traces": await asyncio.to_thread(traces.snapshot)}
+
+
+@router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str, traces: Optional[TraceStore] = Depends(get_trace_store)) -> dict:
+    """
+    Return one request trace.
+    
+    Parameters:
+        trace_id (str): Id from `X-Nanocode-Trace` or a trace listing.
+        traces (Optional[TraceStore]): Trace store provided via Depends(get_trace_store).
+    
+    Returns:
+        dict: {"status": "ok", "trace": {...}}, or {"status": "disabled"}.
+    
+    Raises:
+        HTTPException: 404 if no stored trace has this id.
+    """
+    if traces is None:
+        return {"status": "disabled"}
+    trace = await asyncio.to_thread(traces.get, trace_id)
+    if trace is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trace not found")
+    return {"status": "ok", "trace": trace}
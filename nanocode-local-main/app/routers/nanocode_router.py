@@ -1,12 +1,49 @@
-"""Nanocode generation endpoint."""
+"""Nanocode generation endpoints."""
+import asyncio
 import logging
+import time
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, Awaitable, Callable, ContextManager, Dict, List, Optional, Set, Tuple
+
 import httpx
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.types import Receive, Scope, Send
 
-from app.dependencies import get_model_client
+from app import metrics
+from app.admission import DEFAULT_PRIORITY, DEFAULT_TENANT, AdmissionController, AdmissionRejected
+from app.config import Settings, get_settings
+from app.dependencies import (
+    get_admission_controller,
+    get_health_tracker,
+    get_model_client,
+    get_model_identity,
+    get_prompt_budget,
+    get_response_cache,
+    get_semantic_cache,
+    get_singleflight,
+    get_trace_store,
+)
 from app.model_client import ModelClient
-from nanocode.core import postprocess_output, preprocess_prompt
+from app.resilience import CircuitOpenError
+from app.response_cache import ResponseCache, make_cache_key
+from app.semantic_cache import SemanticCache, make_partition_key
+from app.singleflight import SingleFlight
+from app.traces import CLIENT_CLOSED, Trace, TraceStore
+from nanocode.core import StreamingOutput, postprocess_output
+from nanocode.health import HealthTracker
+from nanocode.prompts import (
+    Message,
+    PromptBudget,
+    PromptTemplate,
+    PromptTooLong,
+    build_messages,
+    build_prompt,
+    fit_prompt,
+)
 from nanocode.schema import NanocodeRequest, NanocodeResponse
+from nanocode.serialization import dumps, model_response
 from nanocode.validation import validate_request
 
 logger = logging.getLogger(__name__)
@@ -14,22 +51,10 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/nanocode", tags=["nanocode"])
 
 
-@router.post("", response_model=NanocodeResponse)
-async def generate_nanocode(
-    payload: NanocodeRequest,
-    client: ModelClient = Depends(get_model_client),
-) -> NanocodeResponse:
-    """
-    Generate nanocode from the provided request payload.
-    
-    Parameters:
-        payload (NanocodeRequest): Request data containing the input prompt and generation options.
-    
-    Returns:
-        NanocodeResponse: The model's output after postprocessing, formatted for the Nanocode API.
-    """
+def _validate(payload: NanocodeRequest) -> None:
     try:
-        validate_request(payload)
+        with metrics.VALIDATE.time():
+            validate_request(payload)
     except ValueError as exc:
         logger.warning("Invalid Nanocode request", extra={"error": str(exc)})
         raise HTTPException(
@@ -37,12 +62,60 @@ async def generate_nanocode(
             detail=str(exc),
         ) from exc
 
-    prompt = preprocess_prompt(payload)
-    logger.info("Nanocode request received", extra={"has_constraints": bool(payload.constraints)})
 
-    try:
-        raw = await client.generate(prompt=prompt)
-    except httpx.HTTPStatusError as exc:
+async def _preprocess(payload: NanocodeRequest, budget: Optional[PromptBudget]) -> Tuple[str, List[Message]]:
+    """
+    Assemble the prompt and hold it to the token budget, if one is configured.
+    
+    Counting a long prompt is CPU-bound, so unless the prompt's count is cached and within
+    the limit, the budget check runs in a worker thread.
+    
+    Parameters:
+        payload (NanocodeRequest): The validated request.
+        budget (Optional[PromptBudget]): Token limit and overflow policy, or `None`.
+    
+    Returns:
+        tuple: The flattened prompt (for cache keys and metadata) and the chat messages sent upstream, with the input truncated when the policy allows it.
+    
+    Raises:
+        HTTPException: 413 when the prompt is over the budget and cannot be truncated to fit.
+    """
+    with metrics.PREPROCESS.time():
+        if budget is None:
+            messages = build_messages(payload)
+            return PromptTemplate.render(messages), messages
+        try:
+            tokens = budget.tokenizer.cached_count(build_prompt(payload))
+            if tokens is not None and tokens <= budget.max_tokens:
+                fitted = fit_prompt(payload, budget)
+            else:
+                fitted = await asyncio.to_thread(fit_prompt, payload, budget)
+        except PromptTooLong as exc:
+            metrics.PROMPTS_OVER_BUDGET.labels("rejected").inc()
+            logger.warning("Prompt over token budget", extra={"tokens": exc.tokens, "limit": exc.limit})
+            raise HTTPException(
+                status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                detail=str(exc),
+            ) from exc
+    metrics.PROMPT_TOKENS.observe(fitted.tokens)
+    if fitted.truncated:
+        metrics.PROMPTS_OVER_BUDGET.labels("truncated").inc()
+        logger.info("Prompt input truncated to the token budget", extra={"tokens": fitted.tokens})
+    return fitted.text, fitted.messages
+
+
+def _upstream_http_exception(exc: httpx.HTTPError) -> HTTPException:
+    """
+    Log an upstream failure and translate it into the HTTPException returned to the caller.
+    
+    Parameters:
+        exc (httpx.HTTPError): Error raised while calling the model server.
+    
+    Returns:
+        HTTPException: 502 for upstream error statuses, 503 when the model server cannot be reached or its circuit is open.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        metrics.UPSTREAM_ERRORS.labels("status").inc()
         logger.warning(
             "Upstream model error",
             extra={
@@ -51,25 +124,599 @@ async def generate_nanocode(
                 "request_url": str(exc.request.url),
             },
         )
-        raise HTTPException(
+        return HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
             detail=f"Upstream model error: {exc.response.status_code}",
-        ) from exc
-    except httpx.RequestError as exc:
-        logger.error(
-            "Model server unavailable",
-            extra={
-                "error_message": str(exc),
-                "request_url": str(exc.request.url) if getattr(exc, "request", None) else "",
-            },
         )
+    if isinstance(exc, CircuitOpenError):
+        kind = "circuit_open"
+    else:
+        kind = "timeout" if isinstance(exc, httpx.TimeoutException) else "connect"
+    metrics.UPSTREAM_ERRORS.labels(kind).inc()
+    logger.error(
+        "Model server unavailable",
+        extra={
+            "error_message": str(exc),
+            "request_url": str(exc.request.url) if getattr(exc, "request", None) else "",
+        },
+    )
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Model server unavailable",
+    )
+
+
+def _reachable(exc: BaseException) -> bool:
+    # Timeouts and error statuses mean the model server accepted the connection; only a
+    # failed connect (or an open circuit, which stands in for one) marks it unreachable.
+    return not isinstance(exc, (httpx.ConnectError, CircuitOpenError))
+
+
+def _shed_http_exception(exc: AdmissionRejected) -> HTTPException:
+    """
+    Translate an admission rejection into the HTTPException returned to the caller.
+    
+    Parameters:
+        exc (AdmissionRejected): Rejection raised by the admission controller.
+    
+    Returns:
+        HTTPException: 429, 503 or 504 with a `Retry-After` header.
+    """
+    metrics.ADMISSION_REJECTED.labels(exc.reason).inc()
+    logger.warning("Upstream call shed", extra={"reason": exc.reason, "retry_after": exc.retry_after})
+    return HTTPException(
+        status_code=exc.status_code,
+        detail="Server overloaded, retry later",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def _deadline(payload: NanocodeRequest) -> Optional[float]:
+    if payload.deadline_ms is None:
+        return None
+    return time.monotonic() + payload.deadline_ms / 1000.0
+
+
+def _check_deadline(deadline: Optional[float]) -> None:
+    if deadline is not None and deadline <= time.monotonic():
+        raise AdmissionRejected(504, 1, "deadline_exceeded")
+
+
+async def _wait_until(deadline: Optional[float], call: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Await `call` until the caller's own deadline.
+    
+    Parameters:
+        deadline (Optional[float]): `time.monotonic()` after which the caller stops waiting; `None` waits for good.
+        call (Awaitable[Dict[str, Any]]): The upstream call; cancelled when the deadline passes (a shared call only stops once no caller waits for it).
+    
+    Returns:
+        dict: The result of `call`.
+    
+    Raises:
+        AdmissionRejected: 504 when the deadline passes first.
+    """
+    _check_deadline(deadline)
+    if deadline is None:
+        return await call
+    try:
+        return await asyncio.wait_for(call, deadline - time.monotonic())
+    except asyncio.TimeoutError:
+        raise AdmissionRejected(504, 1, "deadline_exceeded") from None
+
+
+def _cache_directives(cache_control: Optional[str]) -> Set[str]:
+    if not cache_control:
+        return set()
+    return {part.strip().lower() for part in cache_control.split(",") if part.strip()}
+
+
+def _stage(trace: Optional[Trace], name: str) -> ContextManager[None]:
+    return trace.stage(name) if trace is not None else nullcontext()
+
+
+def _record_trace(
+    traces: Optional[TraceStore],
+    trace: Optional[Trace],
+    status_code: int,
+    error: Any = None,
+) -> Optional[str]:
+    if traces is None or trace is None:
+        return None
+    return traces.record(trace.finish(status_code, error))
+
+
+def _trace_attempt(trace: Optional[Trace]) -> None:
+    # From here on a failure counts against the constraints instead of waiving them.
+    if trace is not None:
+        trace.attempted = True
+
+
+def _trace_response(trace: Optional[Trace], raw: Dict[str, Any], headers: Dict[str, str]) -> None:
+    # Copies what the record needs from the upstream result; the prompt stays out of it.
+    if trace is None:
+        return
+    trace.attempted = True
+    metadata = raw.get("metadata") or {}
+    trace.set(
+        cache=headers.get("X-Nanocode-Cache"),
+        model=metadata.get("model"),
+        backend=metadata.get("backend"),
+        usage=metadata.get("usage"),
+    )
+
+
+class _ClosingStreamingResponse(StreamingResponse):
+    """A StreamingResponse that awaits `on_close` once it is sent or abandoned, even if its body never started."""
+
+    def __init__(self, content: AsyncIterator[bytes], on_close: Callable[[], Awaitable[None]], **kwargs: Any) -> None:
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.on_close()
+
+
+def _sse(event: str, data: Dict[str, Any]) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+async def _generate(
+    payload: NanocodeRequest,
+    client: ModelClient,
+    cache: Optional[ResponseCache],
+    singleflight: Optional[SingleFlight],
+    semantic_cache: Optional[SemanticCache],
+    health: HealthTracker,
+    admission: Optional[AdmissionController],
+    model_identity: str,
+    directives: Set[str],
+    tenant: Optional[str],
+    budget: Optional[PromptBudget] = None,
+    trace: Optional[Trace] = None,
+) -> Tuple[NanocodeResponse, Dict[str, str]]:
+    """
+    Run one request through validation, the caches, admission control and the model.
+    
+    Shared by `POST /nanocode` and `POST /nanocode/batch`; see `generate_nanocode` for
+    the caching and admission behaviour. When a `trace` is given, the time spent in each
+    stage and how the response was served are recorded on it.
+    
+    Returns:
+        tuple: The postprocessed response and the `X-Nanocode-*` headers describing how it was served.
+    
+    Raises:
+        HTTPException: 422 for invalid input, 413 over the token budget, 429/503/504 when shed, 502/503 for upstream failures.
+    """
+    with _stage(trace, "validate"):
+        _validate(payload)
+    deadline = _deadline(payload)
+
+    with _stage(trace, "preprocess"):
+        prompt, messages = await _preprocess(payload, budget)
+    logger.info("Nanocode request received", extra={"has_constraints": bool(payload.constraints)})
+
+    headers: Dict[str, str] = {}
+    cache_key = make_cache_key(prompt, model_identity)
+    raw = None
+    if cache is not None and "no-cache" not in directives and "no-store" not in directives:
+        with _stage(trace, "cache"):
+            raw = await cache.get(cache_key)
+        headers["X-Nanocode-Cache"] = "miss" if raw is None else "hit"
+    elif cache is not None:
+        headers["X-Nanocode-Cache"] = "bypass"
+
+    semantic_vector = None
+    if raw is None and semantic_cache is not None and "no-store" not in directives:
+        with _stage(trace, "semantic_cache"):
+            semantic_vector = await semantic_cache.embed(payload.input)
+            partition = make_partition_key(model_identity, payload.constraints)
+            if "no-cache" not in directives:
+                match = semantic_cache.lookup(semantic_vector, partition)
+                if match is not None:
+                    raw, similarity = match
+                    headers["X-Nanocode-Cache"] = "semantic"
+                    headers["X-Nanocode-Similarity"] = f"{similarity:.4f}"
+
+    if raw is None:
+        store = cache is not None and "no-store" not in directives
+
+        async def generate() -> Dict[str, Any]:
+            started = health.started()
+            try:
+                with metrics.UPSTREAM.time():
+                    result = await client.generate(prompt=prompt, messages=messages)
+            except BaseException as exc:
+                health.finished(started, ok=False, reachable=_reachable(exc))
+                raise
+            health.finished(started, ok=True)
+            return result
+
+        async def call_upstream(slot_deadline: Optional[float]) -> Dict[str, Any]:
+            started = time.perf_counter()
+            if admission is None:
+                result = await generate()
+            else:
+                async with admission.slot(payload.priority, tenant, slot_deadline):
+                    result = await generate()
+            if store:
+                await cache.set(cache_key, result)
+            if semantic_vector is not None:
+                elapsed_ms = (time.perf_counter() - started) * 1000.0
+                semantic_cache.store(semantic_vector, partition, result, elapsed_ms)
+            return result
+
+        try:
+            with _stage(trace, "upstream"):
+                if singleflight is None:
+                    raw = await _wait_until(deadline, call_upstream(deadline))
+                else:
+                    # Callers share a call only within one priority class and tenant, so none
+                    # queues in another's class or is charged to another tenant. Deadlines are
+                    # not shared: the call is admitted without one and each caller stops
+                    # waiting at its own.
+                    flight_key = f"{cache_key}|{payload.priority or DEFAULT_PRIORITY}|{tenant or DEFAULT_TENANT}"
+                    raw = await _wait_until(deadline, singleflight.do(flight_key, lambda: call_upstream(None)))
+        except AdmissionRejected as exc:
+            raise _shed_http_exception(exc) from exc
+        except Exception as exc:
+            _trace_attempt(trace)
+            if isinstance(exc, (httpx.HTTPStatusError, httpx.RequestError)):
+                raise _upstream_http_exception(exc) from exc
+            raise
+
+    # The upstream dict may be shared with coalesced callers; copy before annotating it.
+    raw = {**raw, "metadata": dict(raw.get("metadata") or {})}
+    if headers.get("X-Nanocode-Cache") == "semantic":
+        # The entry was generated for an earlier request's prompt; report this one's.
+        raw["metadata"]["prompt"] = prompt
+    else:
+        raw["metadata"].setdefault("prompt", prompt)
+    _trace_response(trace, raw, headers)
+
+    with _stage(trace, "postprocess"), metrics.POSTPROCESS.time():
+        return postprocess_output(payload, raw), headers
+
+
+@router.post("", response_model=NanocodeResponse)
+async def generate_nanocode(
+    payload: NanocodeRequest,
+    client: ModelClient = Depends(get_model_client),
+    cache: Optional[ResponseCache] = Depends(get_response_cache),
+    singleflight: Optional[SingleFlight] = Depends(get_singleflight),
+    semantic_cache: Optional[SemanticCache] = Depends(get_semantic_cache),
+    health: HealthTracker = Depends(get_health_tracker),
+    admission: Optional[AdmissionController] = Depends(get_admission_controller),
+    model_identity: str = Depends(get_model_identity),
+    budget: Optional[PromptBudget] = Depends(get_prompt_budget),
+    traces: Optional[TraceStore] = Depends(get_trace_store),
+    cache_control: Optional[str] = Header(default=None),
+    x_nanocode_tenant: Optional[str] = Header(default=None),
+) -> Response:
+    """
+    Generate nanocode from the provided request payload.
+    
+    With `response_cache_enabled` set, identical prompts for the same model are answered
+    from the response cache. A `Cache-Control: no-cache` request header skips the lookup
+    (the fresh result is still stored) and `no-store` also skips storing it. The
+    `X-Nanocode-Cache` response header reports `hit`, `miss` or `bypass`. Concurrent
+    cache misses for the same prompt share a single upstream call.
+    
+    When the semantic cache is enabled, an exact-cache miss is also looked up by input
+    similarity among earlier requests with identical constraints; a match is reported as
+    `X-Nanocode-Cache: semantic` together with `X-Nanocode-Similarity`.
+    
+    Upstream calls pass through the admission controller: when every slot is busy and
+    the wait queue is full the request fails fast with 429, and when no slot frees up
+    within the queue deadline it fails with 503; both carry `Retry-After`. Waiting
+    requests are served by `priority` class first and by weighted fair share of the
+    `X-Nanocode-Tenant` header within a class. A request whose `deadline_ms` passes
+    before it reaches the model fails with 504 without an upstream call; one whose
+    deadline passes while it waits for the model fails with 504 as well. Concurrent
+    identical requests share an upstream call only within the same priority and tenant,
+    and each keeps its own deadline.
+    
+    With `prompt_max_tokens` set, the assembled prompt is counted before the caches and
+    the model are consulted. A prompt over the limit fails with 413, or has its input
+    truncated to fit when `prompt_overflow` is "truncate".
+    
+    With `trace_enabled` set, every request, failed or not, leaves a trace of its stages,
+    constraints and outcome; successful responses name it in `X-Nanocode-Trace`.
+    
+    Parameters:
+        payload (NanocodeRequest): Request data containing the input prompt and generation options.
+    
+    Returns:
+        Response: The postprocessed NanocodeResponse as JSON. It is serialized directly from the validated model; `response_model` only documents the schema.
+    """
+    trace = None
+    if traces is not None:
+        trace = Trace("/nanocode", payload.constraints, payload.priority, x_nanocode_tenant)
+    try:
+        result, headers = await _generate(
+            payload,
+            client,
+            cache,
+            singleflight,
+            semantic_cache,
+            health,
+            admission,
+            model_identity,
+            _cache_directives(cache_control),
+            x_nanocode_tenant,
+            budget,
+            trace,
+        )
+    except HTTPException as exc:
+        _record_trace(traces, trace, exc.status_code, exc.detail)
+        raise
+    except Exception:
+        _record_trace(traces, trace, status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal error")
+        raise
+    trace_id = _record_trace(traces, trace, status.HTTP_200_OK)
+    if trace_id is not None:
+        headers["X-Nanocode-Trace"] = trace_id
+    return model_response(result, headers)
+
+
+@router.post("/batch")
+async def batch_nanocode(
+    request: Request,
+    concurrency: Optional[int] = Query(default=None, ge=1),
+    client: ModelClient = Depends(get_model_client),
+    cache: Optional[ResponseCache] = Depends(get_response_cache),
+    singleflight: Optional[SingleFlight] = Depends(get_singleflight),
+    semantic_cache: Optional[SemanticCache] = Depends(get_semantic_cache),
+    health: HealthTracker = Depends(get_health_tracker),
+    admission: Optional[AdmissionController] = Depends(get_admission_controller),
+    model_identity: str = Depends(get_model_identity),
+    budget: Optional[PromptBudget] = Depends(get_prompt_budget),
+    traces: Optional[TraceStore] = Depends(get_trace_store),
+    settings: Settings = Depends(get_settings),
+    cache_control: Optional[str] = Header(default=None),
+    x_nanocode_tenant: Optional[str] = Header(default=None),
+) -> StreamingResponse:
+    """
+    Generate for many requests at once from a JSONL body.
+    
+    Each non-blank line is a NanocodeRequest; lines run concurrently (at most
+    `concurrency`, default `batch_concurrency`, capped at `batch_max_concurrency`)
+    through the same pipeline as `POST /nanocode`, including the caches and admission
+    control. Items without a `priority` are scheduled as "batch".
+    
+    The response is JSONL in completion order. Each line carries the 0-based `index` of
+    its input line and either `result` (a NanocodeResponse) or `error` with the `status`
+    and `detail` the item would have failed with on its own (500 for an unexpected
+    error); one failing item does not fail the batch.
+    
+    Parameters:
+        request (Request): Request whose body is the JSONL input.
+        concurrency (Optional[int]): Items processed at once.
+    
+    Returns:
+        StreamingResponse: An `application/x-ndjson` response.
+    
+    Raises:
+        HTTPException: 413 if the body holds more than `batch_max_items` items.
+    """
+    # Read the whole body up front: the response starts streaming before every item is
+    # done, and the request body cannot be read once the response has started.
+    body = await request.body()
+    items = [(index, line) for index, line in enumerate(body.splitlines()) if line.strip()]
+    if len(items) > settings.batch_max_items:
         raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Model server unavailable",
-        ) from exc
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Batch holds {len(items)} items; the limit is {settings.batch_max_items}",
+        )
+    limit = min(concurrency or settings.batch_concurrency, settings.batch_max_concurrency)
+    directives = _cache_directives(cache_control)
+    logger.info("Nanocode batch received", extra={"items": len(items), "concurrency": limit})
+
+    async def generate_item(index: int, payload: NanocodeRequest) -> Dict[str, Any]:
+        if payload.priority is None:
+            payload = payload.model_copy(update={"priority": "batch"})
+        trace = None
+        if traces is not None:
+            trace = Trace("/nanocode/batch", payload.constraints, payload.priority, x_nanocode_tenant)
+        try:
+            result, _ = await _generate(
+                payload,
+                client,
+                cache,
+                singleflight,
+                semantic_cache,
+                health,
+                admission,
+                model_identity,
+                directives,
+                x_nanocode_tenant,
+                budget,
+                trace,
+            )
+        except HTTPException as exc:
+            _record_trace(traces, trace, exc.status_code, exc.detail)
+            return {"index": index, "error": {"status": exc.status_code, "detail": exc.detail}}
+        except Exception:
+            # A bug hit by one item must not end the stream for the others.
+            logger.exception("Batch item failed", extra={"index": index})
+            _record_trace(traces, trace, status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal error")
+            return {"index": index, "error": {"status": 500, "detail": "Internal error"}}
+        _record_trace(traces, trace, status.HTTP_200_OK)
+        return {"index": index, "result": result.model_dump()}
+
+    async def run(index: int, line: bytes) -> bytes:
+        # Only the line itself is the client's fault; a ValidationError raised while
+        # generating (e.g. an invalid upstream response) is a 500 like on /nanocode.
+        try:
+            payload = NanocodeRequest.model_validate_json(line)
+        except ValidationError as exc:
+            detail = exc.errors(include_url=False, include_context=False, include_input=False)
+            item = {"index": index, "error": {"status": 422, "detail": detail}}
+        else:
+            item = await generate_item(index, payload)
+        metrics.BATCH_ITEMS.labels("error" if "error" in item else "ok").inc()
+        return dumps(item) + b"\n"
+
+    async def results() -> AsyncIterator[bytes]:
+        pending: Set["asyncio.Task[bytes]"] = set()
+        queued = iter(items)
+        try:
+            while True:
+                for index, line in queued:
+                    pending.add(asyncio.ensure_future(run(index, line)))
+                    if len(pending) >= limit:
+                        break
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            # The client went away: stop the items still running.
+            for task in pending:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.post("/stream")
+async def stream_nanocode(
+    payload: NanocodeRequest,
+    client: ModelClient = Depends(get_model_client),
+    health: HealthTracker = Depends(get_health_tracker),
+    admission: Optional[AdmissionController] = Depends(get_admission_controller),
+    budget: Optional[PromptBudget] = Depends(get_prompt_budget),
+    traces: Optional[TraceStore] = Depends(get_trace_store),
+    x_nanocode_tenant: Optional[str] = Header(default=None),
+) -> StreamingResponse:
+    """
+    Stream nanocode generation to the caller as Server-Sent Events.
+    
+    Emits `event: delta` frames carrying `{"delta": str}` as the model produces output,
+    then a single `event: done` frame holding the full NanocodeResponse (including
+    metadata). Upstream failures after the stream has started are sent as `event: error`.
+    
+    A stream holds an admission slot until it ends; when none is available the request
+    is rejected with 429 or 503 and `Retry-After` before any event is sent. `priority`,
+    `deadline_ms` and `X-Nanocode-Tenant` are scheduled as for `POST /nanocode`.
+    
+    With `trace_enabled` set, the trace is recorded when the stream ends; a stream the
+    client abandons is recorded with status 499 (`CLIENT_CLOSED`).
+    
+    Parameters:
+        payload (NanocodeRequest): Request data containing the input prompt and generation options.
+    
+    Returns:
+        StreamingResponse: A `text/event-stream` response.
+    """
+    trace = None
+    if traces is not None:
+        trace = Trace("/nanocode/stream", payload.constraints, payload.priority, x_nanocode_tenant)
+    try:
+        with _stage(trace, "validate"):
+            _validate(payload)
+        deadline = _deadline(payload)
+
+        with _stage(trace, "preprocess"):
+            prompt, messages = await _preprocess(payload, budget)
+        logger.info(
+            "Nanocode stream request received",
+            extra={"has_constraints": bool(payload.constraints)},
+        )
+
+        # Pull the first event eagerly so connection and status errors still map onto
+        # 502/503 responses rather than an in-band error frame.
+        try:
+            if admission is None:
+                _check_deadline(deadline)
+            else:
+                await admission.acquire(payload.priority, x_nanocode_tenant, deadline)
+        except AdmissionRejected as exc:
+            raise _shed_http_exception(exc) from exc
+        events = client.generate_stream(prompt=prompt, messages=messages)
+        _trace_attempt(trace)
+        started = health.started()
+        try:
+            with _stage(trace, "upstream"):
+                first = await events.__anext__()
+        except StopAsyncIteration:
+            first = {"type": "done", "metadata": {}}
+        except BaseException as exc:
+            health.finished(started, ok=False, reachable=_reachable(exc))
+            if admission is not None:
+                admission.release(time.perf_counter() - started, ok=False)
+            await events.aclose()
+            if isinstance(exc, (httpx.HTTPStatusError, httpx.RequestError)):
+                raise _upstream_http_exception(exc) from exc
+            raise
+    except HTTPException as exc:
+        _record_trace(traces, trace, exc.status_code, exc.detail)
+        raise
+    except Exception:
+        _record_trace(traces, trace, status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal error")
+        raise
+    # Streams stay in flight until they end but are scored on time to first event.
+    first_event_latency = time.perf_counter() - started
+    ok = False
+    # What the trace records if the stream ends without a done frame.
+    failure: Tuple[int, str] = (CLIENT_CLOSED, "Client closed the stream")
+    closed = False
+
+    async def close() -> None:
+        # Runs once: after the last frame, or from the response when the client went away,
+        # possibly before `relay` ever started.
+        nonlocal closed
+        if closed:
+            return
+        closed = True
+        health.finished(started, ok=ok, latency=first_event_latency)
+        if admission is not None:
+            admission.release(first_event_latency, ok)
+        await events.aclose()
+        if ok:
+            _record_trace(traces, trace, status.HTTP_200_OK)
+        else:
+            _record_trace(traces, trace, *failure)
 
-    if "metadata" not in raw or raw["metadata"] is None:
-        raw["metadata"] = {}
-    raw["metadata"].setdefault("prompt", prompt)
+    async def relay(event: Dict[str, Any]) -> AsyncIterator[bytes]:
+        nonlocal ok, failure
+        output = StreamingOutput(payload)
+        try:
+            with _stage(trace, "stream"):
+                while True:
+                    kind = event.get("type")
+                    if kind == "delta":
+                        yield _sse("delta", {"delta": output.feed(event.get("delta", ""))})
+                    elif kind == "error":
+                        failure = (status.HTTP_502_BAD_GATEWAY, event.get("detail", "Upstream model error"))
+                        yield _sse("error", {"detail": failure[1]})
+                        return
+                    elif kind == "done":
+                        ok = True
+                        metadata = event.get("metadata") or {}
+                        metadata.setdefault("prompt", prompt)
+                        _trace_response(trace, event, {})
+                        yield _sse("done", output.finish(metadata).model_dump())
+                        return
+                    try:
+                        event = await events.__anext__()
+                    except StopAsyncIteration:
+                        failure = (status.HTTP_502_BAD_GATEWAY, "Upstream stream ended unexpectedly")
+                        yield _sse("error", {"detail": failure[1]})
+                        return
+                    except httpx.HTTPError as exc:
+                        metrics.UPSTREAM_ERRORS.labels("stream").inc()
+                        logger.error("Upstream stream failed", extra={"error_message": str(exc)})
+                        failure = (status.HTTP_503_SERVICE_UNAVAILABLE, "Model server unavailable")
+                        yield _sse("error", {"detail": failure[1]})
+                        return
+        except Exception:
+            failure = (status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal error")
+            raise
+        finally:
+            await close()
 
-    return postprocess_output(payload, raw)
+    return _ClosingStreamingResponse(relay(first), close, media_type="text/event-stream")
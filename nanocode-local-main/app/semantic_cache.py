@@ -0,0 +1,192 @@
+"""Semantic response cache: serve near-identical requests from an earlier upstream response."""
+import bisect
+import hashlib
+import json
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from nanocode.serialization import dumps, loads
+
+# numpy and the embeddings package are imported when a cache is first used, so an API
+# with the semantic cache disabled (the default) starts without loading them.
+if TYPE_CHECKING:
+    import numpy as np
+
+    from nanocode.embeddings.service import EmbeddingService
+    from nanocode.embeddings.store import InMemoryStore
+
+SIMILARITY_BUCKETS: Tuple[float, ...] = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98, 0.99, 1.0)
+
+
+def make_partition_key(model_identity: str, constraints: Optional[Sequence[str]]) -> str:
+    """
+    Derive the partition a request may share cached responses within.
+
+    Parameters:
+        model_identity (str): Identifies the upstream model (see `get_model_identity`).
+        constraints (Optional[Sequence[str]]): The request's constraints; only an exact match shares a partition.
+
+    Returns:
+        str: Hex SHA-256 digest over the model identity and the constraint list.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([model_identity, list(constraints or [])]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass
+class SemanticCacheStats:
+    lookups: int = 0
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    saved_ms: float = 0.0
+
+
+@dataclass
+class _Entry:
+    partition: str
+    response: bytes
+    upstream_ms: float
+    expires_at: float
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        embeddings: "EmbeddingService",
+        threshold: float,
+        max_entries: int,
+        ttl_seconds: float,
+    ) -> None:
+        """
+        Initialize an empty semantic cache.
+
+        Requests are embedded and compared by cosine similarity against earlier requests
+        in the same partition (same model and identical constraints). The nearest one is
+        a hit when its similarity reaches `threshold`.
+
+        Parameters:
+            embeddings (EmbeddingService): Service used to embed request inputs.
+            threshold (float): Minimum cosine similarity for a hit.
+            max_entries (int): Maximum cached responses across all partitions; the least recently used is evicted.
+            ttl_seconds (float): Lifetime of each entry from the moment it is stored.
+        """
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = SemanticCacheStats()
+        self.similarity_counts = [0] * (len(SIMILARITY_BUCKETS) + 1)
+        self._partitions: Dict[str, "InMemoryStore"] = {}
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    async def embed(self, text: str) -> "np.ndarray":
+        """Embed a request input with the shared embedding service."""
+        return await self.embeddings.embed(text)
+
+    def lookup(self, vector: "np.ndarray", partition: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Find a cached response for a semantically equivalent request.
+
+        Parameters:
+            vector (np.ndarray): Embedding of the request input.
+            partition (str): Key from `make_partition_key`.
+
+        Returns:
+            Optional[tuple]: `(response, similarity)` with a fresh copy of the cached upstream response, or `None` on a miss.
+        """
+        from nanocode.embeddings.retrieval import Retriever
+
+        self.stats.lookups += 1
+        store = self._partitions.get(partition)
+        hits = Retriever(store).search([vector], k=1)[0] if store is not None else []
+        if not hits:
+            self.stats.misses += 1
+            return None
+
+        key, similarity = hits[0]
+        self.similarity_counts[bisect.bisect_left(SIMILARITY_BUCKETS, similarity)] += 1
+        entry = self._entries[key]
+        if entry.expires_at <= time.time():
+            self._remove(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        if similarity < self.threshold:
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        self.stats.saved_ms += entry.upstream_ms
+        return loads(entry.response), similarity
+
+    def store(self, vector: "np.ndarray", partition: str, response: Dict[str, Any], upstream_ms: float) -> None:
+        """
+        Remember an upstream response for later semantic lookups.
+
+        Parameters:
+            vector (np.ndarray): Embedding of the request input.
+            partition (str): Key from `make_partition_key`.
+            response (dict): JSON-serializable upstream response; serialized immediately.
+            upstream_ms (float): Time the upstream call took, reported as saved on each hit.
+        """
+        from nanocode.embeddings.store import InMemoryStore
+
+        if self.max_entries <= 0 or not vector.any():
+            return
+        key = uuid.uuid4().hex
+        self._partitions.setdefault(partition, InMemoryStore(dim=len(vector), initial_capacity=64)).add(key, vector)
+        self._entries[key] = _Entry(
+            partition=partition,
+            response=dumps(response),
+            upstream_ms=upstream_ms,
+            expires_at=time.time() + self.ttl_seconds,
+        )
+        self.stats.stores += 1
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.stats.evictions += 1
+
+    def purge(self) -> int:
+        """
+        Remove every cached entry.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        count = len(self._entries)
+        self._entries.clear()
+        self._partitions.clear()
+        return count
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report hit rate, latency saved and the distribution of nearest-neighbour similarity.
+
+        Returns:
+            dict: Counters, hit ratio, total and mean upstream milliseconds saved per hit, threshold, entry count and non-cumulative similarity bucket counts.
+        """
+        labels: List[str] = [f"le_{bound:g}" for bound in SIMILARITY_BUCKETS] + ["overflow"]
+        return {
+            **asdict(self.stats),
+            "saved_ms": round(self.stats.saved_ms, 2),
+            "hit_ratio": round(self.stats.hits / self.stats.lookups, 4) if self.stats.lookups else 0.0,
+            "mean_saved_ms": round(self.stats.saved_ms / self.stats.hits, 2) if self.stats.hits else 0.0,
+            "threshold": self.threshold,
+            "entries": len(self._entries),
+            "similarity": dict(zip(labels, self.similarity_counts)),
+        }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        store = self._partitions[entry.partition]
+        store.delete(key)
+        if not len(store):
+            del self._partitions[entry.partition]
@@ -0,0 +1,93 @@
+"""Single-flight deduplication of concurrent identical upstream calls."""
+import asyncio
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class SingleFlightStats:
+    leaders: int = 0
+    coalesced: int = 0
+    abandoned: int = 0
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        """
+        Initialize an empty registry of in-flight calls.
+
+        The first caller for a key starts the work as a separate task; concurrent callers
+        with the same key await that task instead of starting their own.
+        """
+        self._calls: Dict[str, _Call] = {}
+        self.stats = SingleFlightStats()
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `func` once per key among concurrent callers and share its outcome.
+
+        Cancelling one caller (e.g. a client disconnect) only stops that caller from
+        waiting; the shared call keeps running for the others. It is cancelled only when
+        every caller waiting on it has gone away.
+
+        Parameters:
+            key (str): Identity of the call, e.g. the response cache key for a prompt.
+            func (Callable[[], Awaitable[T]]): Zero-argument coroutine factory performing the call.
+
+        Returns:
+            T: The result of the shared call.
+
+        Raises:
+            Exception: Whatever the shared call raised, re-raised in every waiting caller.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._finish(key, task))
+            self.stats.leaders += 1
+        else:
+            self.stats.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if not call.task.done() and call.waiters == 1:
+                call.task.cancel()
+                self.stats.abandoned += 1
+            raise
+        finally:
+            call.waiters -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report coalescing counters.
+
+        Returns:
+            dict: Leader (upstream) calls, coalesced duplicate callers, abandoned calls, the
+            number of calls currently in flight and the share of callers that were coalesced.
+        """
+        callers = self.stats.leaders + self.stats.coalesced
+        return {
+            **asdict(self.stats),
+            "in_flight": len(self._calls),
+            "coalesced_ratio": round(self.stats.coalesced / callers, 4) if callers else 0.0,
+        }
+
+    def _finish(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._calls.get(key) is not None and self._calls[key].task is task:
+            del self._calls[key]
+        # Mark the exception as retrieved so an abandoned failing call does not log noise.
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,404 @@
+"""Certification traces: per-request records of stages, constraints and outcome, stored append-only."""
+import gzip
+import heapq
+import logging
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app import metrics
+from nanocode.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Status recorded for requests the client abandoned, as nginx logs them.
+CLIENT_CLOSED = 499
+
+_SEGMENT = re.compile(r"^traces-(\d{8})\.jsonl\.gz$")
+
+
+class Trace:
+    """Collects one request's trace while it is handled; `finish` turns it into the stored record."""
+
+    __slots__ = ("route", "fields", "stages", "attempted", "_started", "_clock")
+
+    def __init__(
+        self,
+        route: str,
+        constraints: Optional[Sequence[str]] = None,
+        priority: Optional[str] = None,
+        tenant: Optional[str] = None,
+    ) -> None:
+        self.route = route
+        self.fields: Dict[str, Any] = {
+            "constraints": list(constraints or []),
+            "priority": priority,
+            "tenant": tenant,
+        }
+        self.stages: Dict[str, float] = {}
+        # Set once a response was generated or a generation was tried; see `finish`.
+        self.attempted = False
+        self._started = time.time()
+        self._clock = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as stage `name`, in milliseconds; repeated stages add up."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000.0
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def set(self, **fields: Any) -> None:
+        self.fields.update(fields)
+
+    def finish(self, status: int, error: Any = None) -> Dict[str, Any]:
+        """
+        Build the record for a request that ended with HTTP `status`.
+
+        The outcome is "ok" below 400, "cancelled" for `CLIENT_CLOSED`, "rejected" for other
+        4xx and "error" for 5xx. Each constraint is reported as "applied" when the response
+        was generated under it (or served from a cache entry for the same prompt), as
+        "failed" for a 5xx after generation was attempted, and as "waived" otherwise: a
+        rejected, shed, timed-out or cancelled request never had its constraints evaluated.
+
+        Parameters:
+            status (int): Status the request ended with (200 for success).
+            error (Any): Error detail returned to the caller, if any.
+
+        Returns:
+            dict: The trace record, without an `id` until the store assigns one.
+        """
+        ok = status < 400
+        if ok:
+            outcome = "ok"
+        elif status == CLIENT_CLOSED:
+            outcome = "cancelled"
+        else:
+            outcome = "rejected" if status < 500 else "error"
+        if ok:
+            verdict = "applied"
+        elif self.attempted and status >= 500:
+            verdict = "failed"
+        else:
+            verdict = "waived"
+        constraints = self.fields.pop("constraints")
+        record = {
+            "ts": self._started,
+            "route": self.route,
+            "status": status,
+            "outcome": outcome,
+            "duration_ms": round((time.perf_counter() - self._clock) * 1000.0, 3),
+            "stages": {name: round(ms, 3) for name, ms in self.stages.items()},
+            "constraints": {constraint: verdict for constraint in constraints},
+            **{key: value for key, value in self.fields.items() if value is not None},
+        }
+        if error is not None:
+            record["error"] = error
+        return record
+
+
+@dataclass
+class TraceStats:
+    recorded: int = 0
+    dropped: int = 0
+    flushed: int = 0
+    blocks: int = 0
+    flush_errors: int = 0
+
+
+class TraceStore:
+    def __init__(
+        self,
+        directory: str,
+        buffer_size: int = 10000,
+        flush_interval: float = 1.0,
+        flush_batch: int = 1000,
+        segment_bytes: int = 64 * 1024 * 1024,
+        max_segments: int = 64,
+    ) -> None:
+        """
+        Initialize an append-only trace store and start its writer thread.
+
+        `record` only appends to an in-memory ring buffer of `buffer_size` traces; when the
+        writer falls that far behind, the oldest unwritten traces are dropped and counted.
+        The writer thread wakes every `flush_interval` seconds, or once `flush_batch` traces
+        are waiting, and appends them to the current segment as one gzip member of JSON
+        lines (a "block"). Segments are named `traces-<seq>.jsonl.gz`, rotate after
+        `segment_bytes`, and only the newest `max_segments` are kept (0 keeps all). Every
+        block is listed in a SQLite index (`index.sqlite3`) with its offset and its id and
+        time ranges, so reads decompress only the blocks they need.
+
+        Trace ids start with the start time in milliseconds, so ordering by id is ordering
+        by start time. One process should write to a directory at a time.
+
+        Parameters:
+            directory (str): Directory holding segments and the index; created if missing.
+            buffer_size (int): Traces held in memory before the oldest are dropped.
+            flush_interval (float): Longest time in seconds a trace waits to be written.
+            flush_batch (int): Traces per block.
+            segment_bytes (int): Segment size after which a new segment is started.
+            max_segments (int): Segments kept; older ones are deleted with their index entries.
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.flush_batch = max(1, flush_batch)
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.stats = TraceStats()
+        self._buffer: "deque[Dict[str, Any]]" = deque(maxlen=max(1, buffer_size))
+        self._node = secrets.token_hex(2)
+        self._sequence = 0
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "index.sqlite3"), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blocks ("
+            " segment INTEGER NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL,"
+            " count INTEGER NOT NULL, first_id TEXT NOT NULL, last_id TEXT NOT NULL,"
+            " first_ts REAL NOT NULL, last_ts REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS blocks_last_id ON blocks (last_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS blocks_ts ON blocks (last_ts, first_ts)")
+        segments = self._segments()
+        self._segment = segments[-1] if segments else 1
+        self._file = open(self._path(self._segment), "ab")
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    # -- request path ---------------------------------------------------------
+
+    def record(self, trace: Dict[str, Any]) -> str:
+        """
+        Queue a finished trace for writing without blocking.
+
+        Parameters:
+            trace (Dict[str, Any]): Record from `Trace.finish`; an `id` is added.
+
+        Returns:
+            str: The trace id.
+        """
+        self._sequence += 1
+        trace_id = f"{int(trace['ts'] * 1000):012x}{self._node}{self._sequence & 0xFFFFFF:06x}"
+        trace["id"] = trace_id
+        if len(self._buffer) == self._buffer.maxlen:
+            self.stats.dropped += 1
+            metrics.TRACES_DROPPED.inc()
+        self._buffer.append(trace)
+        self.stats.recorded += 1
+        if len(self._buffer) >= self.flush_batch:
+            self._wake.set()
+        return trace_id
+
+    # -- writer thread --------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self) -> None:
+        """Write every buffered trace; called by the writer thread, and safe to call from others."""
+        # Traces leave the buffer only under the lock, so a reader holding it sees each
+        # trace either buffered or indexed.
+        with self._lock:
+            while self._buffer:
+                batch = []
+                while self._buffer and len(batch) < self.flush_batch:
+                    batch.append(self._buffer.popleft())
+                try:
+                    self._write_block(batch)
+                except Exception:
+                    # Keep serving; a full disk must not take the API down with it.
+                    self.stats.flush_errors += 1
+                    logger.exception("Writing %d traces failed; they are lost", len(batch))
+
+    def _write_block(self, batch: List[Dict[str, Any]]) -> None:
+        data = gzip.compress(b"".join(dumps(trace) + b"\n" for trace in batch), compresslevel=6)
+        if self._file.tell() > 0 and self._file.tell() + len(data) > self.segment_bytes:
+            self._rotate()
+        offset = self._file.tell()
+        self._file.write(data)
+        self._file.flush()
+        ids = [trace["id"] for trace in batch]
+        times = [trace["ts"] for trace in batch]
+        self._conn.execute(
+            "INSERT INTO blocks (segment, offset, length, count, first_id, last_id, first_ts, last_ts)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (self._segment, offset, len(data), len(batch), min(ids), max(ids), min(times), max(times)),
+        )
+        self.stats.flushed += len(batch)
+        self.stats.blocks += 1
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._segment += 1
+        self._file = open(self._path(self._segment), "ab")
+        if self.max_segments > 0:
+            for segment in self._segments()[: -self.max_segments]:
+                self._conn.execute("DELETE FROM blocks WHERE segment = ?", (segment,))
+                os.remove(self._path(segment))
+
+    def close(self) -> None:
+        """Write the remaining traces, stop the writer thread and close the files."""
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join()
+        with self._lock:
+            self._file.close()
+            self._conn.close()
+
+    # -- queries --------------------------------------------------------------
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"traces-{segment:08d}.jsonl.gz")
+
+    def _segments(self) -> List[int]:
+        return sorted(int(match.group(1)) for match in map(_SEGMENT.match, os.listdir(self.directory)) if match)
+
+    def _read_block(self, segment: int, offset: int, length: int) -> List[Dict[str, Any]]:
+        try:
+            with open(self._path(segment), "rb") as handle:
+                handle.seek(offset)
+                data = gzip.decompress(handle.read(length))
+        except (OSError, EOFError):
+            # Deleted by retention meanwhile, or cut short by a crash.
+            return []
+        return [loads(line) for line in data.splitlines() if line]
+
+    def query(
+        self,
+        limit: int = 100,
+        before: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        route: Optional[str] = None,
+        outcome: Optional[str] = None,
+        constraint: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Page through traces, newest first.
+
+        Blocks are read lazily in order of their newest id and merged, so a page costs the
+        blocks it overlaps, however many traces are stored. Unwritten traces are included.
+
+        Parameters:
+            limit (int): Traces per page.
+            before (Optional[str]): Cursor from the previous page; only older traces are returned.
+            since (Optional[float]): Earliest start time, as a Unix timestamp.
+            until (Optional[float]): Latest start time, as a Unix timestamp.
+            route (Optional[str]): Only traces of this route.
+            outcome (Optional[str]): Only traces with this outcome ("ok", "cancelled", "rejected" or "error").
+            constraint (Optional[str]): Only traces of requests with this constraint.
+
+        Returns:
+            tuple: The page and the cursor for the next one (`None` on the last page).
+        """
+        low = since if since is not None else float("-inf")
+        high = until if until is not None else float("inf")
+
+        def matches(trace: Dict[str, Any]) -> bool:
+            return (
+                (before is None or trace["id"] < before)
+                and low <= trace["ts"] <= high
+                and (route is None or trace.get("route") == route)
+                and (outcome is None or trace.get("outcome") == outcome)
+                and (constraint is None or constraint in trace.get("constraints", {}))
+            )
+
+        with self._lock:
+            pending = list(self._buffer)
+            rows = self._conn.execute(
+                "SELECT segment, offset, length, last_id FROM blocks"
+                " WHERE first_id < ? AND last_ts >= ? AND first_ts <= ? ORDER BY last_id DESC",
+                (before or "~", max(low, -1e18), min(high, 1e18)),
+            ).fetchall()
+        # Max-heap on id across loaded traces.
+        heap = [(_Desc(trace["id"]), trace) for trace in pending if matches(trace)]
+        heapq.heapify(heap)
+        blocks = iter(rows)
+        block = next(blocks, None)
+        page: List[Dict[str, Any]] = []
+        while len(page) < limit:
+            # A trace can be emitted once no unread block may hold a newer one.
+            while block is not None and (not heap or block[3] > heap[0][0].value):
+                for trace in self._read_block(block[0], block[1], block[2]):
+                    if matches(trace):
+                        heapq.heappush(heap, (_Desc(trace["id"]), trace))
+                block = next(blocks, None)
+            if not heap:
+                break
+            page.append(heapq.heappop(heap)[1])
+        more = len(page) == limit and (heap or block is not None)
+        return page, (page[-1]["id"] if more else None)
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up one trace.
+
+        Parameters:
+            trace_id (str): Id returned by `record`.
+
+        Returns:
+            Optional[Dict[str, Any]]: The trace, or `None` if it is unknown or was deleted by retention.
+        """
+        with self._lock:
+            pending = list(self._buffer)
+            rows = self._conn.execute(
+                "SELECT segment, offset, length FROM blocks WHERE first_id <= ? AND last_id >= ?",
+                (trace_id, trace_id),
+            ).fetchall()
+        for trace in pending:
+            if trace["id"] == trace_id:
+                return trace
+        for segment, offset, length in rows:
+            for trace in self._read_block(segment, offset, length):
+                if trace["id"] == trace_id:
+                    return trace
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report write-path counters and what is on disk.
+
+        Returns:
+            dict: Recorded, dropped and flushed counts, buffered traces, and stored traces, blocks, segments and bytes.
+        """
+        with self._lock:
+            stored, blocks = self._conn.execute("SELECT COALESCE(SUM(count), 0), COUNT(*) FROM blocks").fetchone()
+        segments = self._segments()
+        return {
+            **asdict(self.stats),
+            "buffered": len(self._buffer),
+            "stored": stored,
+            "stored_blocks": blocks,
+            "segments": len(segments),
+            "bytes": sum(os.path.getsize(self._path(segment)) for segment in segments),
+        }
+
+
+class _Desc:
+    # Inverts string ordering so heapq's min-heap pops the newest id first.
+    __slots__ = ("value",)
+
+    def __init__(self, value: str) -> None:
+        self.value = value
+
+    def __lt__(self, other: "_Desc") -> bool:
+        return self.value > other.value
@@ -0,0 +1,5 @@
+"""Load tests and microbenchmarks for the Nanocode API and model server.
+
+Run `python -m benchmarks --help`; results are written as JSON that `--baseline`
+compares against a previous run.
+"""
@@ -0,0 +1,111 @@
+"""Command line entry point: `python -m benchmarks`."""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Optional
+
+from benchmarks.load import run_load
+from benchmarks.micro import run_micro
+from benchmarks.report import compare
+from benchmarks.serialization import run_serialization
+from benchmarks.startup import run_startup
+
+
+def _commit() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def _env(pairs: list) -> Dict[str, str]:
+    env = {}
+    for pair in pairs:
+        name, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"--env expects NAME=VALUE, got {pair!r}")
+        env[name] = value
+    return env
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Nanocode API against an in-process mock model server")
+    parser.add_argument("--rps", type=float, default=100.0, help="Requests started per second (open loop)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of unmeasured load first")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Mock backend latency per batch")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Mock backend jitter per batch")
+    parser.add_argument("--path", default="/nanocode", choices=["/nanocode", "/nanocode/stream"])
+    parser.add_argument("--distinct-inputs", type=int, default=0, help="Cycle through this many inputs (0: all unique)")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="Setting for the run")
+    parser.add_argument("--skip-load", action="store_true", help="Skip the load test")
+    parser.add_argument("--skip-micro", action="store_true", help="Skip the microbenchmarks")
+    parser.add_argument("--skip-startup", action="store_true", help="Skip the cold start measurements")
+    parser.add_argument("--skip-serialization", action="store_true", help="Skip the per-request cost by output size")
+    parser.add_argument("--startup-runs", type=int, default=3, help="Cold starts per service (fastest is kept)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per microbenchmark round")
+    parser.add_argument("-o", "--output", default=None, help="Write the results JSON here")
+    parser.add_argument("--baseline", default=None, help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Change counted as a regression")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+    }
+    if not args.skip_startup:
+        results["startup"] = run_startup(args.startup_runs)
+    if not args.skip_micro:
+        results["micro"] = run_micro(args.min_time)
+    if not args.skip_serialization:
+        results["serialization"] = asyncio.run(run_serialization())
+    if not args.skip_load:
+        results["load"] = asyncio.run(
+            run_load(
+                rps=args.rps,
+                duration=args.duration,
+                warmup=args.warmup,
+                latency_ms=args.latency_ms,
+                jitter_ms=args.jitter_ms,
+                path=args.path,
+                distinct_inputs=args.distinct_inputs,
+                env=_env(args.env),
+            )
+        )
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(text + "\n")
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        before = baseline.get("load", {}).get("parameters")
+        after = results.get("load", {}).get("parameters")
+        if before and after and before != after:
+            print("Warning: the load test parameters differ from the baseline run", file=sys.stderr)
+        regressions = compare(baseline, results, args.threshold)
+        for item in regressions:
+            print(
+                f"REGRESSION {item['metric']}: {item['baseline']} -> {item['current']} ({item['change']:+.1%})",
+                file=sys.stderr,
+            )
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
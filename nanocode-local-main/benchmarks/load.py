@@ -0,0 +1,223 @@
+"""Open-loop load generation against an in-process API and mock model server."""
+import asyncio
+import math
+import os
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Mapping, Optional
+
+import httpx
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Return the nearest-rank `q`-th percentile (0-100) of an ascending list, or 0.0 when it is empty."""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(len(ordered) * q / 100.0))
+    return ordered[min(len(ordered), rank) - 1]
+
+
+def _clear_caches() -> None:
+    # Settings and the process-wide dependencies are lru_cached; drop them so the
+    # environment of the run (and afterwards the original one) takes effect.
+    import app.dependencies
+    from app.config import get_settings
+    from model_server.config import get_settings as get_model_settings
+
+    get_settings.cache_clear()
+    get_model_settings.cache_clear()
+    for value in vars(app.dependencies).values():
+        if callable(getattr(value, "cache_clear", None)):
+            value.cache_clear()
+
+
+@asynccontextmanager
+async def in_process_stack(
+    latency_ms: float = 0.0,
+    jitter_ms: float = 0.0,
+    env: Optional[Mapping[str, str]] = None,
+) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Run the API and a mock-backed model server in this process, wired through ASGI transports.
+
+    Both lifespans run as in production; the API's pooled model server client is swapped
+    for one that calls the model server app directly, so no sockets are opened and the
+    numbers measure the services themselves rather than the network.
+
+    Parameters:
+        latency_ms (float): Artificial latency of each mock backend batch (`MODEL_MOCK_LATENCY_MS`).
+        jitter_ms (float): Upper bound of the random jitter added to it (`MODEL_MOCK_JITTER_MS`).
+        env (Optional[Mapping[str, str]]): Extra environment variables for the run, e.g. API settings such as `RESPONSE_CACHE_ENABLED=false`.
+
+    Yields:
+        httpx.AsyncClient: Client whose requests are handled by the API app.
+    """
+    overrides = {
+        "MODEL_BACKEND": "mock",
+        "MODEL_MOCK_LATENCY_MS": str(latency_ms),
+        "MODEL_MOCK_JITTER_MS": str(jitter_ms),
+        # Per-request INFO logs would dominate the profile.
+        "LOG_LEVEL": "WARNING",
+        # The pooled client is replaced below; do not warm it against a real model server.
+        "MODEL_CLIENT_WARMUP_CONNECTIONS": "0",
+        **(env or {}),
+    }
+    from app.main import app as api_app, lifespan as api_lifespan
+    from model_server.server import app as model_app, lifespan as model_lifespan
+
+    saved = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+    _clear_caches()
+    # Measure the real pipeline even if something (e.g. a test) overrode dependencies.
+    overridden = dict(api_app.dependency_overrides)
+    api_app.dependency_overrides.clear()
+    try:
+        async with model_lifespan(model_app), api_lifespan(api_app):
+            pooled = api_app.state.http_client
+            api_app.state.http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=model_app))
+            try:
+                async with httpx.AsyncClient(
+                    transport=httpx.ASGITransport(app=api_app), base_url="http://nanocode", timeout=60.0
+                ) as client:
+                    yield client
+            finally:
+                await api_app.state.http_client.aclose()
+                api_app.state.http_client = pooled
+    finally:
+        api_app.dependency_overrides.update(overridden)
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        _clear_caches()
+
+
+async def open_loop(
+    send: Callable[[int], Awaitable[Any]],
+    rps: float,
+    duration: float,
+    warmup: float = 0.0,
+) -> Dict[str, Any]:
+    """
+    Fire requests at a fixed rate, whether or not earlier ones have finished.
+
+    Request `i` is due at `i / rps` seconds and its latency is counted from that moment,
+    so time spent queued behind a slow service is charged to the service (no coordinated
+    omission). Requests due during the first `warmup` seconds run but are not reported.
+
+    Parameters:
+        send (Callable[[int], Awaitable[Any]]): Sends request `i` and returns its HTTP status code; an exception counts as an error.
+        rps (float): Requests started per second.
+        duration (float): Seconds of measured load after the warm-up.
+        warmup (float): Seconds of unmeasured load first.
+
+    Returns:
+        dict: Request, success and error counts, `error_rate`, `throughput_rps` (successful responses per second of the measured window), latency percentiles in milliseconds, per-status counts and `max_send_lag_ms`, how late the generator itself fired a request.
+    """
+    total = int(rps * (warmup + duration))
+    measured_from = int(rps * warmup)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    max_lag = 0.0
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    finished_at = start
+
+    async def one(index: int, due: float) -> None:
+        nonlocal finished_at
+        try:
+            status = await send(index)
+        except Exception as exc:
+            status = type(exc).__name__
+        if index < measured_from:
+            return
+        finished_at = max(finished_at, loop.time())
+        statuses[str(status)] += 1
+        if status == 200:
+            latencies.append(loop.time() - due)
+
+    tasks = []
+    for index in range(total):
+        due = start + index / rps
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            max_lag = max(max_lag, -delay)
+        tasks.append(asyncio.ensure_future(one(index, due)))
+    await asyncio.gather(*tasks)
+
+    requests = total - measured_from
+    window = max(finished_at - (start + warmup), 1e-9)
+    ordered = sorted(latencies)
+    errors = requests - len(ordered)
+    return {
+        "requests": requests,
+        "ok": len(ordered),
+        "errors": errors,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "throughput_rps": round(len(ordered) / window, 1),
+        "latency_ms": {
+            "mean": round(1000.0 * sum(ordered) / len(ordered), 2) if ordered else 0.0,
+            "p50": round(1000.0 * percentile(ordered, 50), 2),
+            "p95": round(1000.0 * percentile(ordered, 95), 2),
+            "p99": round(1000.0 * percentile(ordered, 99), 2),
+            "max": round(1000.0 * ordered[-1], 2) if ordered else 0.0,
+        },
+        "statuses": dict(sorted(statuses.items())),
+        "max_send_lag_ms": round(1000.0 * max_lag, 2),
+    }
+
+
+async def run_load(
+    rps: float = 100.0,
+    duration: float = 10.0,
+    warmup: float = 2.0,
+    latency_ms: float = 20.0,
+    jitter_ms: float = 10.0,
+    path: str = "/nanocode",
+    distinct_inputs: int = 0,
+    env: Optional[Mapping[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Load the in-process stack at a fixed rate and report what it sustained.
+
+    Parameters:
+        rps (float): Requests started per second.
+        duration (float): Seconds of measured load.
+        warmup (float): Seconds of unmeasured load first.
+        latency_ms (float): Mock backend latency per batch.
+        jitter_ms (float): Mock backend jitter per batch.
+        path (str): API route to POST NanocodeRequests to: "/nanocode" or "/nanocode/stream".
+        distinct_inputs (int): Cycle through this many different inputs so caches and request coalescing take part; 0 makes every input unique.
+        env (Optional[Mapping[str, str]]): Extra environment variables for the run.
+
+    Returns:
+        dict: The `open_loop` report plus the parameters of the run.
+    """
+    async with in_process_stack(latency_ms, jitter_ms, env) as client:
+
+        async def send(index: int) -> int:
+            key = index % distinct_inputs if distinct_inputs else index
+            payload = {"input": f"Write a function that validates order {key}", "constraints": ["python"]}
+            if path.endswith("/stream"):
+                async with client.stream("POST", path, json=payload) as response:
+                    async for _ in response.aiter_bytes():
+                        pass
+                    return response.status_code
+            response = await client.post(path, json=payload)
+            return response.status_code
+
+        report = await open_loop(send, rps, duration, warmup)
+    report["parameters"] = {
+        "rps": rps,
+        "duration": duration,
+        "warmup": warmup,
+        "latency_ms": latency_ms,
+        "jitter_ms": jitter_ms,
+        "path": path,
+        "distinct_inputs": distinct_inputs,
+        "env": dict(env or {}),
+    }
+    return report
@@ -0,0 +1,99 @@
+"""Microbenchmarks for hot functions on the request path."""
+import time
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+from nanocode.embeddings.retrieval import Retriever
+from nanocode.embeddings.store import InMemoryStore
+from nanocode.prompts import build_prompt
+from nanocode.tokenizer import Tokenizer
+from nanocode.schema import NanocodeRequest
+
+REQUEST = {
+    "input": "Write a function that parses ISO-8601 timestamps and returns UTC datetimes",
+    "constraints": ["python", "no third-party dependencies", "include type hints"],
+    "priority": "interactive",
+}
+
+
+def measure(fn: Callable[[], Any], min_time: float = 0.2, repeats: int = 5) -> Dict[str, float]:
+    """
+    Time a zero-argument callable.
+
+    The call count per round is doubled until a round takes at least `min_time`; the
+    fastest of `repeats` such rounds is reported, which filters out scheduler noise.
+
+    Parameters:
+        fn (Callable[[], Any]): The operation to time.
+        min_time (float): Minimum seconds per round.
+        repeats (int): Rounds to take the best of.
+
+    Returns:
+        dict: `ns_per_op` and `ops_per_second` of the fastest round.
+    """
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        number *= 2
+    best = elapsed
+    for _ in range(repeats - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, time.perf_counter() - started)
+    return {
+        "ns_per_op": round(best / number * 1e9, 1),
+        "ops_per_second": round(number / best, 1),
+    }
+
+
+def run_micro(min_time: float = 0.2, store_size: int = 10000, dim: int = 256) -> Dict[str, Dict[str, float]]:
+    """
+    Run every microbenchmark.
+
+    Parameters:
+        min_time (float): Minimum seconds per timing round.
+        store_size (int): Vectors in the embeddings store that is searched.
+        dim (int): Vector dimensionality.
+
+    Returns:
+        dict: One `measure` result per benchmark name.
+    """
+    request = NanocodeRequest.model_validate(REQUEST)
+    body = request.model_dump_json()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((store_size, dim), dtype=np.float32)
+    keys = [f"doc-{i}" for i in range(store_size)]
+    store = InMemoryStore(dim=dim, initial_capacity=store_size)
+    store.add_many(keys, vectors)
+    retriever = Retriever(store)
+    queries = vectors[:8]
+    batch_keys = keys[:256]
+    batch = vectors[:256]
+
+    prompt = build_prompt(request)
+    tokenizer = Tokenizer()
+    uncached = Tokenizer(cache_size=0)
+
+    def store_add_many() -> None:
+        InMemoryStore(dim=dim, initial_capacity=len(batch_keys)).add_many(batch_keys, batch)
+
+    benchmarks: Dict[str, Callable[[], Any]] = {
+        "build_prompt": lambda: build_prompt(request),
+        "schema_validate": lambda: NanocodeRequest.model_validate(REQUEST),
+        "schema_validate_json": lambda: NanocodeRequest.model_validate_json(body),
+        "schema_dump_json": request.model_dump_json,
+        "count_tokens_cached": lambda: tokenizer.count(prompt),
+        "count_tokens_uncached": lambda: uncached.count(prompt),
+        "store_add_many_256": store_add_many,
+        "store_get": lambda: store.get(keys[store_size // 2]),
+        "store_search_8x10": lambda: retriever.search(queries, k=10),
+    }
+    return {name: measure(fn, min_time) for name, fn in benchmarks.items()}
@@ -0,0 +1,77 @@
+"""Flatten benchmark results and compare them between runs."""
+from typing import Any, Dict, List, Mapping
+
+# Metric name suffixes that are compared, and the direction in which they improve.
+LOWER_IS_BETTER = ("_ms", "_kb", "ns_per_op", "error_rate")
+HIGHER_IS_BETTER = ("_rps", "ops_per_second")
+# Keys holding run metadata or inputs rather than measurements.
+SKIPPED = {"meta", "parameters", "statuses"}
+
+
+def flatten(results: Mapping[str, Any], prefix: str = "") -> Dict[str, float]:
+    """
+    Collect comparable metrics into dotted paths.
+
+    Parameters:
+        results (Mapping[str, Any]): Results as written by `python -m benchmarks`.
+        prefix (str): Path of `results` within the enclosing document.
+
+    Returns:
+        dict: Numeric metrics keyed like "load.latency_ms.p99" or "micro.build_prompt.ns_per_op".
+    """
+    flat: Dict[str, float] = {}
+    for key, value in results.items():
+        if key in SKIPPED:
+            continue
+        path = f"{prefix}{key}"
+        if isinstance(value, Mapping):
+            flat.update(flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def _direction(path: str) -> int:
+    # -1 when lower values are better, 1 when higher ones are, 0 when not compared.
+    # Latency percentiles are nested, as in "load.latency_ms.p99".
+    parent, _, name = path.rpartition(".")
+    if name.endswith(LOWER_IS_BETTER) or parent.endswith("latency_ms"):
+        return -1
+    if name.endswith(HIGHER_IS_BETTER):
+        return 1
+    return 0
+
+
+def compare(baseline: Mapping[str, Any], current: Mapping[str, Any], threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Find metrics that got worse by more than `threshold` since a baseline run.
+
+    Only metrics present in both runs are compared. Error rates are compared in
+    absolute terms, everything else relative to the baseline value.
+
+    Parameters:
+        baseline (Mapping[str, Any]): Results of the reference run.
+        current (Mapping[str, Any]): Results of the run under test.
+        threshold (float): Tolerated change, e.g. 0.1 for 10% (or 0.1 more error rate).
+
+    Returns:
+        list: One `{"metric", "baseline", "current", "change"}` dict per regression, worst first.
+    """
+    before, after = flatten(baseline), flatten(current)
+    regressions = []
+    for path in sorted(before.keys() & after.keys()):
+        direction = _direction(path)
+        if direction == 0:
+            continue
+        old, new = before[path], after[path]
+        if path.endswith("error_rate"):
+            change = new - old
+        elif old:
+            change = (new - old) / old
+        else:
+            continue
+        # Positive `worse` means the metric moved in the wrong direction.
+        worse = change if direction < 0 else -change
+        if worse > threshold:
+            regressions.append({"metric": path, "baseline": old, "current": new, "change": round(change, 4)})
+    return sorted(regressions, key=lambda item: -abs(item["change"]))
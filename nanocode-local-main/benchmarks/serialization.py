@@ -0,0 +1,67 @@
+"""Per-request CPU time and memory of `/nanocode` round trips by response size."""
+import time
+import tracemalloc
+from typing import Dict, Sequence
+
+from benchmarks.load import in_process_stack
+
+SIZES = (1024, 16 * 1024, 256 * 1024, 1024 * 1024)
+
+
+def _label(size: int) -> str:
+    return f"{size // (1024 * 1024)}MB" if size >= 1024 * 1024 else f"{size // 1024}KB"
+
+
+async def run_serialization(sizes: Sequence[int] = SIZES, requests: int = 20) -> Dict[str, Dict[str, float]]:
+    """
+    Send sequential `/nanocode` requests whose outputs have the given sizes.
+
+    Everything runs in this process (see `in_process_stack`), so the CPU time covers the
+    model server, the API and the client together: parsing, validation and encoding of
+    the payload at every hop. It is measured over `requests` calls. The memory figure is
+    the peak traced allocation of a single call, measured in a second pass under
+    `tracemalloc` because tracing slows everything down.
+
+    Parameters:
+        sizes (Sequence[int]): Output sizes in bytes (`MODEL_MOCK_OUTPUT_BYTES`).
+        requests (int): Calls per size and pass.
+
+    Returns:
+        dict: Per size label ("1KB" ... "1MB"), `cpu_ms` per request and `peak_kb` per request.
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    for size in sizes:
+        # Usage counting scales with the output too; leave it out to isolate serialization.
+        env = {"MODEL_MOCK_OUTPUT_BYTES": str(size), "MODEL_COUNT_USAGE": "false"}
+        async with in_process_stack(env=env) as client:
+            counter = 0
+
+            async def call() -> None:
+                nonlocal counter
+                counter += 1
+                response = await client.post("/nanocode", json={"input": f"Generate report {counter}"})
+                response.raise_for_status()
+
+            for _ in range(3):
+                await call()
+
+            started = time.process_time()
+            for _ in range(requests):
+                await call()
+            cpu = (time.process_time() - started) / requests
+
+            tracemalloc.start()
+            try:
+                peaks = []
+                for _ in range(requests):
+                    tracemalloc.reset_peak()
+                    before, _ = tracemalloc.get_traced_memory()
+                    await call()
+                    peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            finally:
+                tracemalloc.stop()
+        results[_label(size)] = {
+            "cpu_ms": round(cpu * 1000.0, 3),
+            "peak_kb": round(sorted(peaks)[len(peaks) // 2] / 1024.0, 1),
+        }
+    return results
@@ -0,0 +1,121 @@
+"""Cold start measurements: import time per module and time until a service is ready."""
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+# Entry point module of each service, with the environment it needs to start offline.
+SERVICES: Dict[str, Tuple[str, Dict[str, str]]] = {
+    "api": ("app.main", {"MODEL_CLIENT_WARMUP_CONNECTIONS": "0", "LOG_LEVEL": "WARNING"}),
+    "model_server": ("model_server.server", {"MODEL_BACKEND": "mock"}),
+}
+
+# Run in a fresh interpreter: import the entry point, run its lifespan startup and print
+# the in-process report once ready.
+_READY_SCRIPT = """
+import asyncio, json, sys
+from importlib import import_module
+
+module = import_module(sys.argv[1])
+
+async def main():
+    async with module.lifespan(module.app):
+        print(json.dumps(module.app.state.startup.snapshot()), flush=True)
+
+asyncio.run(main())
+"""
+
+
+def _env(extra: Mapping[str, str]) -> Dict[str, str]:
+    return {**os.environ, **extra}
+
+
+def import_times(module: str, env: Optional[Mapping[str, str]] = None, top: int = 15) -> Dict[str, Any]:
+    """
+    Import a module in a fresh interpreter under `-X importtime` and summarize the cost.
+
+    Parameters:
+        module (str): Module to import, e.g. "app.main".
+        env (Optional[Mapping[str, str]]): Extra environment variables.
+        top (int): Number of most expensive top-level packages to report.
+
+    Returns:
+        dict: `total_ms` for the module including its dependencies and `packages_ms`, the self time of every imported module summed per top-level package, most expensive first.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=_env(env or {}),
+    )
+    packages: Dict[str, float] = defaultdict(float)
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:") :].split("|"))
+        packages[name.split(".")[0]] += int(self_us)
+        if name == module:
+            total_us = int(cumulative_us)
+    ranked = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return {
+        "total_ms": round(total_us / 1000.0, 2),
+        "packages_ms": {name: round(us / 1000.0, 2) for name, us in ranked},
+    }
+
+
+def time_to_ready(module: str, env: Optional[Mapping[str, str]] = None) -> Dict[str, Any]:
+    """
+    Start a service in a fresh interpreter and time how long it takes to become ready.
+
+    Parameters:
+        module (str): Entry point module exposing `app` and `lifespan`.
+        env (Optional[Mapping[str, str]]): Extra environment variables.
+
+    Returns:
+        dict: `ready_ms`, the wall time from spawning the interpreter until the lifespan startup finished, plus the service's own `import_ms`, `lifespan_ms` and `phases_ms`.
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", _READY_SCRIPT, module],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=_env(env or {}),
+    )
+    line = process.stdout.readline()
+    ready = time.perf_counter() - started
+    _, stderr = process.communicate()
+    if not line:
+        raise RuntimeError(f"{module} did not start:\n{stderr}")
+    report = json.loads(line)
+    return {
+        "ready_ms": round(ready * 1000.0, 2),
+        "import_ms": report["import_ms"],
+        "lifespan_ms": report["lifespan_ms"],
+        "phases_ms": report["phases_ms"],
+    }
+
+
+def run_startup(runs: int = 3) -> Dict[str, Dict[str, Any]]:
+    """
+    Measure every service in `SERVICES`, keeping the fastest of `runs` cold starts.
+
+    Parameters:
+        runs (int): Cold starts per service; the minimum filters out a busy machine.
+
+    Returns:
+        dict: Per service, the fastest `time_to_ready` plus `import_times` under "imports".
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    for service, (module, env) in SERVICES.items():
+        starts: List[Dict[str, Any]] = [time_to_ready(module, env) for _ in range(max(1, runs))]
+        results[service] = {
+            **min(starts, key=lambda start: start["ready_ms"]),
+            "imports": import_times(module, env),
+        }
+    return results
@@ -1,6 +1,8 @@
 export interface NanocodeRequest {
   input: string;
   constraints?: string[];
+  priority?: "interactive" | "default" | "batch";
+  deadline_ms?: number;
 }
 
 export interface NanocodeResponse {
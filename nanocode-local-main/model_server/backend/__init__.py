@@ -1 +1,58 @@
-"""Backends for the model server."""
+"""Backends for the model server, selected by name via `MODEL_BACKEND`."""
+from importlib import import_module
+from typing import TYPE_CHECKING, Dict
+
+if TYPE_CHECKING:
+    from model_server.backend.base import Backend
+    from model_server.config import ModelServerSettings
+
+# Backends are referenced as "module:Class" and imported only when selected, so the
+# provider SDKs of unused backends are never loaded.
+BACKENDS: Dict[str, str] = {
+    "mock": "model_server.backend.mock_backend:MockBackend",
+    "openai": "model_server.backend.openai_backend:OpenAIBackend",
+    "llama_cpp": "model_server.backend.llama_cpp_backend:LlamaCppBackend",
+}
+
+# Names that are reserved for backends without an implementation yet; selecting one
+# fails at startup with the reason rather than at the first request.
+UNSUPPORTED: Dict[str, str] = {
+    "vllm": "model_server/backend/vllm_backend.py is a placeholder",
+}
+
+
+def register_backend(name: str, target: str) -> None:
+    """
+    Register an additional backend implementation.
+    
+    Parameters:
+        name (str): Value of `MODEL_BACKEND` that selects the backend.
+        target (str): Import path in "package.module:ClassName" form; the class must accept a ModelServerSettings.
+    """
+    BACKENDS[name] = target
+
+
+def create_backend(settings: "ModelServerSettings") -> "Backend":
+    """
+    Instantiate the backend selected by `settings.backend`.
+    
+    Parameters:
+        settings (ModelServerSettings): Model server settings; `backend` names the registry entry.
+    
+    Returns:
+        Backend: The constructed (not yet started) backend.
+    
+    Raises:
+        ValueError: If `settings.backend` is not registered or is not supported yet.
+    """
+    if settings.backend in UNSUPPORTED and settings.backend not in BACKENDS:
+        reason = UNSUPPORTED[settings.backend]
+        raise ValueError(f"Model backend {settings.backend!r} is not supported yet ({reason})")
+    try:
+        target = BACKENDS[settings.backend]
+    except KeyError:
+        known = ", ".join(sorted(BACKENDS))
+        raise ValueError(f"Unknown model backend {settings.backend!r}; expected one of: {known}") from None
+    module_name, class_name = target.split(":")
+    backend_cls = getattr(import_module(module_name), class_name)
+    return backend_cls(settings)
@@ -0,0 +1,98 @@
+"""Interface shared by every model server backend."""
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+SYSTEM_PROMPT = "You are Nanocode, a highly structured and helpful assistant."
+
+
+class ChatPrompt(str):
+    """
+    A prompt string that also carries the structured chat messages it was flattened from.
+
+    Being a `str`, it passes through the batch scheduler, usage counting and backends
+    that only read text unchanged; chat-style backends send `messages` instead.
+    """
+
+    messages: Optional[List[Dict[str, str]]]
+
+    def __new__(cls, text: str, messages: Optional[List[Dict[str, str]]] = None) -> "ChatPrompt":
+        prompt = super().__new__(cls, text)
+        prompt.messages = messages
+        return prompt
+
+    def __reduce__(self) -> Any:
+        # Keep `messages` when prompts are pickled to worker processes.
+        return (ChatPrompt, (str(self), self.messages))
+
+
+def build_messages(prompt: str) -> List[Dict[str, str]]:
+    """
+    Build the chat messages sent to chat-style backends.
+    
+    Parameters:
+        prompt (str): Full prompt string provided by the Nanocode backend, or a ChatPrompt.
+    
+    Returns:
+        List[Dict[str, str]]: The messages of a ChatPrompt as given, so their leading system message stays a stable cacheable prefix; otherwise a system message followed by the prompt as the user message.
+    """
+    messages = getattr(prompt, "messages", None)
+    if messages:
+        return [dict(message) for message in messages]
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+class Backend:
+    """Base class for model server backends selected via `MODEL_BACKEND`."""
+
+    name = "base"
+    # True when `generate_batch` runs several prompts in one model call. Only then does the
+    # server hold `/generate` requests back to form batches; other backends get each prompt
+    # on its own as soon as it arrives.
+    native_batching = False
+
+    async def startup(self) -> None:
+        """Acquire clients, processes or models; called once from the server lifespan."""
+
+    async def shutdown(self) -> None:
+        """Release everything acquired in `startup`."""
+
+    async def warmup(self) -> None:
+        """
+        Pay one-off costs (connections, model loading, first inference) before serving.
+
+        Called after `startup` when `MODEL_BACKEND_WARMUP` is true; a failure is logged and
+        does not stop the server.
+        """
+
+    async def generate_batch(self, prompts: List[str]) -> List[Any]:
+        """
+        Generate one response per prompt.
+        
+        Parameters:
+            prompts (List[str]): Prompts collected by the batch scheduler.
+        
+        Returns:
+            List[Any]: For each prompt, in order, either a dict with "output" and "metadata" keys or the exception that prompt failed with.
+        """
+        raise NotImplementedError
+
+    async def stream(self, prompt: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a generation as `{"type": "delta"}` events followed by one `{"type": "done"}` event.
+        
+        Backends without incremental output emit the whole completion as a single delta.
+        
+        Parameters:
+            prompt (str): Prompt to generate for.
+        
+        Yields:
+            dict: Stream events in the format relayed by `/generate/stream`.
+        """
+        [result] = await self.generate_batch([prompt])
+        if isinstance(result, BaseException):
+            raise result
+        if result.get("output"):
+            yield {"type": "delta", "delta": result["output"]}
+        yield {"type": "done", "metadata": result.get("metadata", {})}
@@ -1,17 +1,207 @@
-"""Placeholder for llama.cpp backend."""
+"""llama.cpp backend running CPU inference in a pool of worker processes."""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from model_server.backend.base import Backend, build_messages
+from model_server.config import ModelServerSettings
+from model_server.prefix_cache import cached_prefix_tokens
+
+# Populated once per worker process by `_init_worker`; the parent process never loads it.
+_MODEL: Any = None
+_GENERATION: Dict[str, Any] = {}
+
+
+def _init_worker(
+    model_path: str,
+    n_ctx: int,
+    n_threads: Optional[int],
+    max_tokens: int,
+    temperature: float,
+    prompt_cache_bytes: int = 0,
+) -> None:
+    """
+    Load the llama.cpp model into this worker process.
+
+    Parameters:
+        model_path (str): Path to the GGUF model file.
+        n_ctx (int): Context window size.
+        n_threads (Optional[int]): CPU threads used by this worker; `None` lets llama.cpp decide.
+        max_tokens (int): Default completion length.
+        temperature (float): Default sampling temperature.
+        prompt_cache_bytes (int): Size of the in-memory KV state cache; 0 keeps only the live context.
+    """
+    global _MODEL
+    from llama_cpp import Llama
+
+    _MODEL = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, verbose=False)
+    if prompt_cache_bytes > 0:
+        from llama_cpp import LlamaRAMCache
+
+        _MODEL.set_cache(LlamaRAMCache(capacity_bytes=prompt_cache_bytes))
+    _GENERATION.update(
+        max_tokens=max_tokens,
+        temperature=temperature,
+        model=os.path.basename(model_path),
+        prompt_cache=prompt_cache_bytes > 0,
+    )
+
+
+def _context_tokens() -> Optional[List[int]]:
+    # Tokens whose KV state the model currently holds; llama.cpp keeps the longest common
+    # prefix of the next prompt instead of evaluating it again.
+    input_ids = getattr(_MODEL, "input_ids", None)
+    n_tokens = getattr(_MODEL, "n_tokens", None)
+    if input_ids is None or n_tokens is None:
+        return None
+    return [int(token) for token in input_ids[:n_tokens]]
 
 
 def generate(prompt: str) -> dict:
     """
-    Placeholder generator for the llama.cpp backend.
-    
+    Generate a response with the model loaded in the current worker process.
+
     Parameters:
         prompt (str): The input text prompt to generate a model response for.
-    
+
+    `prefix_cache` is compared against the worker's live context, so it is left out when the
+    RAM prompt cache is on: a prefix restored from that cache would be counted as a miss.
+
     Returns:
-        dict: A dictionary representing the generated response (backend-specific structure).
-    
+        dict: {"output": str, "metadata": {"prompt", "model", "backend", "usage", "prefix_cache", "worker_pid"}}.
+
     Raises:
-        NotImplementedError: Always raised with message "llama.cpp backend not implemented" until this backend is implemented.
+        RuntimeError: If called in a process where `_init_worker` has not loaded a model.
     """
-    raise NotImplementedError("llama.cpp backend not implemented")
\ No newline at end of file
+    if _MODEL is None:
+        raise RuntimeError("llama.cpp model is not loaded in this process")
+    previous = _context_tokens()
+    completion = _MODEL.create_chat_completion(
+        messages=build_messages(prompt),
+        max_tokens=_GENERATION["max_tokens"],
+        temperature=_GENERATION["temperature"],
+    )
+    metadata: Dict[str, Any] = {
+        "prompt": prompt,
+        "model": _GENERATION["model"],
+        "backend": "llama_cpp",
+        "worker_pid": os.getpid(),
+    }
+    if completion.get("usage"):
+        metadata["usage"] = dict(completion["usage"])
+        current = None if _GENERATION["prompt_cache"] else _context_tokens()
+        if current is not None:
+            prompt_ids = current[: metadata["usage"].get("prompt_tokens", 0)]
+            metadata["prefix_cache"] = {"cached_tokens": cached_prefix_tokens(previous, prompt_ids)}
+    return {"output": completion["choices"][0]["message"]["content"] or "", "metadata": metadata}
+
+
+def generate_batch(prompts: list[str]) -> list[Any]:
+    """
+    Generate responses for several prompts sequentially inside one worker process.
+
+    Parameters:
+        prompts (list[str]): Input text prompts to generate responses for, in order.
+
+    Returns:
+        list[Any]: One response dict per prompt, or the exception that prompt failed with.
+    """
+    results: list[Any] = []
+    for prompt in prompts:
+        try:
+            results.append(generate(prompt))
+        except Exception as exc:
+            results.append(exc)
+    return results
+
+
+def _warm_up(prompt: str) -> int:
+    if prompt:
+        generate(prompt)
+    return os.getpid()
+
+
+class LlamaCppBackend(Backend):
+    """Backend that runs a local GGUF model through llama.cpp in worker processes."""
+
+    name = "llama_cpp"
+    native_batching = True
+
+    def __init__(self, settings: ModelServerSettings) -> None:
+        """
+        Initialize the backend; worker processes are started in `startup`.
+
+        Parameters:
+            settings (ModelServerSettings): Provides the model path, llama.cpp options, worker count, per-worker concurrency and warm-up prompt.
+        """
+        self.settings = settings
+        self.workers = max(1, settings.backend_workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def startup(self) -> None:
+        """
+        Start the worker processes, each loading the model once.
+
+        Raises:
+            RuntimeError: If `MODEL_LLAMA_MODEL_PATH` is not set.
+        """
+        if not self.settings.llama_model_path:
+            raise RuntimeError("MODEL_LLAMA_MODEL_PATH must point to a GGUF model for the llama_cpp backend.")
+        # "spawn" avoids forking a process that already runs uvicorn's event loop and threads.
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(
+                self.settings.llama_model_path,
+                self.settings.llama_n_ctx,
+                self.settings.llama_n_threads,
+                self.settings.llama_max_tokens,
+                self.settings.llama_temperature,
+                self.settings.llama_prompt_cache_bytes,
+            ),
+        )
+        # Bound how many chunks are queued per worker so a burst cannot pile up unbounded IPC work.
+        self._slots = asyncio.Semaphore(self.workers * max(1, self.settings.backend_worker_concurrency))
+
+    async def warmup(self) -> None:
+        """Run the warm-up prompt once per worker so the first request does not pay for loading."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self._executor, _warm_up, self.settings.backend_warmup_prompt)
+                for _ in range(self.workers)
+            )
+        )
+
+    async def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def generate_batch(self, prompts: List[str]) -> List[Any]:
+        """
+        Spread a batch over the worker processes without blocking the event loop.
+
+        Parameters:
+            prompts (List[str]): Prompts collected by the batch scheduler.
+
+        Returns:
+            List[Any]: One result dict or exception per prompt, in input order.
+        """
+        # Contiguous chunks, one per worker, keep pickling overhead to one round trip each.
+        size = -(-len(prompts) // self.workers)
+        chunks = [prompts[i : i + size] for i in range(0, len(prompts), size)]
+        results = await asyncio.gather(*(self._run_chunk(chunk) for chunk in chunks))
+        return [result for chunk_results in results for result in chunk_results]
+
+    async def _run_chunk(self, prompts: List[str]) -> List[Any]:
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._executor, generate_batch, prompts)
+            except Exception as exc:
+                return [exc] * len(prompts)
@@ -1,5 +1,12 @@
 """Mock backend returning canned responses."""
-from typing import Dict
+import asyncio
+import random
+from typing import Any, Dict, List
+
+from model_server.backend.base import Backend, build_messages
+from model_server.config import ModelServerSettings
+from model_server.prefix_cache import PrefixCache
+from model_server.tokenizer import configured_tokenizer
 
 
 def generate(prompt: str) -> Dict[str, str]:
@@ -14,4 +21,65 @@ def generate(prompt: str) -> Dict[str, str]:
             - "output": A string in the form "Echo: {prompt}".
             - "metadata": A mapping containing {"backend": "mock"}.
     """
-    return {"output": f"Echo: {prompt}", "metadata": {"backend": "mock"}}
\ No newline at end of file
+    return {"output": f"Echo: {prompt}", "metadata": {"backend": "mock"}}
+
+
+def generate_batch(prompts: List[str]) -> List[Dict[str, str]]:
+    """
+    Return canned mock responses for a batch of prompts.
+    
+    Parameters:
+        prompts (List[str]): Input texts, each echoed in its own response.
+    
+    Returns:
+        List[Dict[str, str]]: One `generate` result per prompt, in input order.
+    """
+    return [generate(prompt) for prompt in prompts]
+
+
+class MockBackend(Backend):
+    """Offline backend that echoes prompts; needs no credentials or model files."""
+
+    name = "mock"
+    native_batching = True
+
+    def __init__(self, settings: ModelServerSettings) -> None:
+        """
+        Initialize the mock backend.
+        
+        Each batch takes `mock_latency_ms` plus up to `mock_jitter_ms` of random jitter,
+        which stands in for provider latency when load testing; `mock_output_bytes`
+        stands in for long completions. A simulated KV prefix cache reports, like a local
+        backend would, the tokens of each prompt's leading messages that an earlier prompt
+        already computed as `metadata["prefix_cache"]["cached_tokens"]`.
+        
+        Parameters:
+            settings (ModelServerSettings): Model server settings; only the `mock_*` and tokenizer options are used.
+        """
+        self.settings = settings
+        self.prefix_cache = PrefixCache()
+
+    async def generate_batch(self, prompts: List[str]) -> List[Dict[str, Any]]:
+        delay_ms = self.settings.mock_latency_ms + random.uniform(0.0, self.settings.mock_jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000.0)
+        if self.settings.mock_output_bytes > 0:
+            results = [self._sized(prompt) for prompt in prompts]
+        else:
+            results = generate_batch(prompts)
+        for prompt, result in zip(prompts, results):
+            result["metadata"]["prefix_cache"] = {"cached_tokens": self._cached_tokens(prompt)}
+        return results
+
+    def _cached_tokens(self, prompt: str) -> int:
+        messages = build_messages(prompt)
+        cached = self.prefix_cache.match(messages)
+        if not cached:
+            return 0
+        return configured_tokenizer().count("\n".join(message["content"] for message in messages[:cached]))
+
+    def _sized(self, prompt: str) -> Dict[str, Any]:
+        result = generate(prompt)
+        size = self.settings.mock_output_bytes
+        result["output"] = (result["output"] * (size // max(1, len(result["output"])) + 1))[:size]
+        return result
@@ -0,0 +1,111 @@
+"""OpenAI chat completions backend."""
+import asyncio
+from typing import Any, AsyncIterator, Dict, List
+
+from model_server.backend.base import Backend, build_messages
+from model_server.config import ModelServerSettings
+
+
+def _usage_to_dict(usage: Any) -> Dict[str, int]:
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+
+
+def _prefix_cache(usage: Any) -> Dict[str, int]:
+    # Prompts of 1024+ tokens are cached by prefix automatically; the hit is reported here.
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {"cached_tokens": getattr(details, "cached_tokens", None) or 0}
+
+
+class OpenAIBackend(Backend):
+    """Backend relaying prompts to the OpenAI chat completions API."""
+
+    name = "openai"
+
+    def __init__(self, settings: ModelServerSettings) -> None:
+        """
+        Initialize the backend; the OpenAI client is created in `startup`.
+        
+        Parameters:
+            settings (ModelServerSettings): Provides `openai_api_key` and `openai_model`.
+        """
+        self.settings = settings
+        self.model = settings.openai_model
+        self.client: Any = None
+
+    async def startup(self) -> None:
+        """
+        Create the AsyncOpenAI client.
+        
+        Raises:
+            RuntimeError: If `OPENAI_API_KEY` is not configured.
+        """
+        if not self.settings.openai_api_key:
+            raise RuntimeError("OPENAI_API_KEY environment variable is not set.")
+        from openai import AsyncOpenAI
+
+        self.client = AsyncOpenAI(api_key=self.settings.openai_api_key)
+
+    async def warmup(self) -> None:
+        """Open the HTTPS connection (and check the key and model) with a cheap model lookup."""
+        await self.client.models.retrieve(self.model)
+
+    async def shutdown(self) -> None:
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    async def generate(self, prompt: str) -> Dict[str, Any]:
+        """
+        Run one chat completion for the prompt.
+        
+        Parameters:
+            prompt (str): Full prompt string provided by the Nanocode backend.
+        
+        Returns:
+            dict: {"output": str, "metadata": {"prompt", "model", optional "usage" and "prefix_cache"}}.
+        """
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=build_messages(prompt),
+        )
+
+        choice = response.choices[0]
+        output_text = choice.message.content or ""
+
+        metadata: Dict[str, Any] = {
+            "prompt": prompt,
+            "model": self.model,
+        }
+
+        if getattr(response, "usage", None) is not None:
+            metadata["usage"] = _usage_to_dict(response.usage)
+            metadata["prefix_cache"] = _prefix_cache(response.usage)
+
+        return {"output": output_text, "metadata": metadata}
+
+    async def generate_batch(self, prompts: List[str]) -> List[Any]:
+        # The chat completions API has no multi-prompt call, so the server sends prompts here
+        # one at a time (`native_batching` is off); a longer list fans out concurrently and
+        # each prompt fails independently.
+        return await asyncio.gather(*(self.generate(prompt) for prompt in prompts), return_exceptions=True)
+
+    async def stream(self, prompt: str) -> AsyncIterator[Dict[str, Any]]:
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=build_messages(prompt),
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        metadata: Dict[str, Any] = {"prompt": prompt, "model": self.model}
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                metadata["usage"] = _usage_to_dict(chunk.usage)
+                metadata["prefix_cache"] = _prefix_cache(chunk.usage)
+            for choice in chunk.choices:
+                if choice.delta.content:
+                    yield {"type": "delta", "delta": choice.delta.content}
+        yield {"type": "done", "metadata": metadata}
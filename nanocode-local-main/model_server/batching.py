@@ -0,0 +1,158 @@
+"""Dynamic micro-batching of generation requests for the model server."""
+import asyncio
+import bisect
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+BatchFn = Callable[[List[str]], Awaitable[List[Any]]]
+
+BATCH_SIZE_BUCKETS: Tuple[float, ...] = (1, 2, 4, 8, 16, 32, 64)
+QUEUE_WAIT_BUCKETS_MS: Tuple[float, ...] = (0.5, 1, 2, 5, 10, 25, 50, 100, 250)
+
+
+class Distribution:
+    def __init__(self, buckets: Sequence[float]) -> None:
+        """
+        Initialize a bucketed (non-cumulative) distribution.
+
+        Parameters:
+            buckets (Sequence[float]): Ascending inclusive upper bounds; values above the last bound land in an overflow bucket.
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{bound:g}" for bound in self.buckets] + ["overflow"]
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4) if self.count else 0.0,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class BatchScheduler:
+    def __init__(self, generate_batch: BatchFn, max_batch_size: int = 8, max_wait_ms: float = 5.0) -> None:
+        """
+        Initialize the scheduler.
+
+        Parameters:
+            generate_batch (BatchFn): Coroutine taking a list of prompts and returning one result per prompt, in order. A result that is an exception fails only its own request.
+            max_batch_size (int): Upper bound on prompts dispatched together.
+            max_wait_ms (float): Longest time the first prompt of a batch waits for companions before dispatch.
+        """
+        self.generate_batch = generate_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.batch_sizes = Distribution(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Distribution(QUEUE_WAIT_BUCKETS_MS)
+        self._queue: "asyncio.Queue[Tuple[str, asyncio.Future, float]]" = asyncio.Queue()
+        self._worker: Optional["asyncio.Task[None]"] = None
+        self._inflight: set = set()
+
+    def start(self) -> None:
+        """Start the background collector task on the running event loop."""
+        if self._worker is None:
+            self._worker = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Stop collecting, wait for dispatched batches and fail anything still queued."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batch scheduler stopped"))
+
+    async def submit(self, prompt: str) -> Any:
+        """
+        Queue a prompt and wait for its slot in a dispatched batch.
+
+        Parameters:
+            prompt (str): Prompt to generate for.
+
+        Returns:
+            Any: The backend's result for this prompt.
+
+        Raises:
+            Exception: The backend error for this prompt or its whole batch.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((prompt, future, time.perf_counter()))
+        return await future
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report scheduler configuration and observed distributions.
+
+        Returns:
+            dict: Queue depth, limits, and the batch-size and queue-wait (ms) distributions.
+        """
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Requests that were cancelled while queued should not cost a model call.
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+            dispatched_at = time.perf_counter()
+            for _, _, enqueued_at in batch:
+                self.queue_wait_ms.observe((dispatched_at - enqueued_at) * 1000.0)
+            self.batch_sizes.observe(len(batch))
+
+            task = asyncio.ensure_future(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        try:
+            results = await self.generate_batch([prompt for prompt, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Backend returned {len(results)} results for {len(batch)} prompts")
+        except Exception as exc:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -1,14 +1,59 @@
 """Settings for the local model server."""
 from functools import lru_cache
+from typing import Optional
+
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class ModelServerSettings(BaseSettings):
-    model_config = SettingsConfigDict(env_prefix="MODEL_", env_file=".env", env_file_encoding="utf-8")
+    model_config = SettingsConfigDict(env_prefix="MODEL_", env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
     host: str = "0.0.0.0"
     port: int = 9000
 
+    # Backend registry key (see model_server/backend/__init__.py): mock, openai or llama_cpp.
+    backend: str = "openai"
+
+    # Micro-batching of /generate requests (see model_server/batching.py).
+    batch_max_size: int = 8
+    batch_max_wait_ms: float = 5.0
+
+    # OpenAI backend; read from the un-prefixed variables used since the first release.
+    openai_api_key: Optional[str] = Field(default=None, validation_alias="OPENAI_API_KEY")
+    openai_model: str = Field(default="gpt-4o", validation_alias="OPENAI_MODEL")
+
+    # Mock backend: artificial latency per dispatched batch, plus up to `mock_jitter_ms` of
+    # uniformly distributed jitter, e.g. for load tests (see benchmarks/).
+    mock_latency_ms: float = 0.0
+    mock_jitter_ms: float = 0.0
+    # When positive, the mock returns an output of this many bytes instead of echoing the prompt.
+    mock_output_bytes: int = 0
+
+    # Token counting (see nanocode/tokenizer.py): a tiktoken-format vocabulary, or estimated
+    # counts when unset. Prompts over max_prompt_tokens (0: no limit) are rejected with 413,
+    # and results without provider `usage` get locally counted usage when count_usage is on.
+    tokenizer_path: Optional[str] = None
+    token_cache_size: int = 10000
+    max_prompt_tokens: int = 0
+    count_usage: bool = True
+
+    # Worker processes for CPU backends such as llama_cpp.
+    backend_workers: int = 1
+    backend_worker_concurrency: int = 1
+    backend_warmup: bool = True
+    backend_warmup_prompt: str = "Hello"
+
+    # llama.cpp backend.
+    llama_model_path: Optional[str] = None
+    llama_n_ctx: int = 4096
+    llama_n_threads: Optional[int] = None
+    llama_max_tokens: int = 512
+    llama_temperature: float = 0.2
+    # In-memory KV state cache per worker, so the prefixes of several constraint profiles
+    # stay reusable; 0 reuses only the prefix shared with the previous prompt.
+    llama_prompt_cache_bytes: int = 0
+
 
 @lru_cache
 def get_settings() -> ModelServerSettings:
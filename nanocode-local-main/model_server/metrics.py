@@ -0,0 +1,86 @@
+"""Model server metrics, exposed at `/metrics`."""
+from typing import Any, List
+
+from model_server.batching import BatchFn
+from nanocode.metrics import Registry
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.histogram(
+    "model_server_request_duration_seconds",
+    "Total time spent handling an HTTP request, including batching queue wait.",
+    ("route",),
+)
+RESPONSES = REGISTRY.counter(
+    "model_server_responses_total",
+    "HTTP responses by route and status code.",
+    ("route", "status"),
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "model_server_requests_in_flight",
+    "HTTP requests currently being handled.",
+)
+PROVIDER_DURATION = REGISTRY.histogram(
+    "model_server_provider_duration_seconds",
+    "Time the backend took to answer one dispatched batch.",
+    ("backend",),
+)
+PROVIDER_ERRORS = REGISTRY.counter(
+    "model_server_provider_errors_total",
+    "Prompts the backend failed to answer.",
+    ("backend",),
+)
+TOKENS = REGISTRY.counter(
+    "model_server_tokens_total",
+    "Tokens in metadata['usage'] (reported by the backend or counted locally) by kind: prompt, "
+    "completion, or cached for prompt tokens served from the backend's prefix cache.",
+    ("backend", "kind"),
+)
+
+
+def record_usage(name: str, metadata: Any) -> None:
+    """
+    Count the tokens reported in a result's `metadata["usage"]` and `metadata["prefix_cache"]`, if any.
+
+    Parameters:
+        name (str): Backend name used as the `backend` label.
+        metadata (Any): Result or stream `done` metadata.
+    """
+    usage = (metadata or {}).get("usage") or {}
+    if usage:
+        TOKENS.labels(name, "prompt").inc(usage.get("prompt_tokens", 0))
+        TOKENS.labels(name, "completion").inc(usage.get("completion_tokens", 0))
+    cached = ((metadata or {}).get("prefix_cache") or {}).get("cached_tokens")
+    if cached:
+        TOKENS.labels(name, "cached").inc(cached)
+
+
+def instrument_batch(name: str, generate_batch: BatchFn) -> BatchFn:
+    """
+    Wrap a backend's `generate_batch` to record provider latency, errors and token usage.
+
+    Parameters:
+        name (str): Backend name used as the `backend` label.
+        generate_batch (BatchFn): The backend coroutine function to wrap.
+
+    Returns:
+        BatchFn: A coroutine function with the same contract.
+    """
+    duration = PROVIDER_DURATION.labels(name)
+    errors = PROVIDER_ERRORS.labels(name)
+
+    async def instrumented(prompts: List[str]) -> List[Any]:
+        try:
+            with duration.time():
+                results = await generate_batch(prompts)
+        except Exception:
+            errors.inc(len(prompts))
+            raise
+        for result in results:
+            if isinstance(result, BaseException):
+                errors.inc()
+                continue
+            record_usage(name, result.get("metadata"))
+        return results
+
+    return instrumented
@@ -0,0 +1,146 @@
+"""Prefix cache accounting: which leading part of each prompt a backend could reuse."""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from model_server.batching import BatchFn
+
+Message = Dict[str, str]
+
+
+class PrefixCache:
+    def __init__(self, max_entries: int = 1024) -> None:
+        """
+        Initialize an LRU of message prefixes, standing in for a KV cache keyed on them.
+
+        A prompt's prefixes are its leading messages without the last one, which carries
+        the request itself. `match` reports how many leading messages a cache holding the
+        state of earlier prompts would already have computed.
+
+        Parameters:
+            max_entries (int): Prefixes kept.
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def match(self, messages: List[Message]) -> int:
+        """
+        Find the longest previously seen prefix of `messages`, then remember all of them.
+
+        Parameters:
+            messages (List[Message]): Chat messages of one prompt.
+
+        Returns:
+            int: Number of leading messages that were cached.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        keys = []
+        for message in messages[:-1]:
+            digest.update(message["role"].encode("utf-8") + b"\0" + message["content"].encode("utf-8") + b"\0")
+            keys.append(digest.copy().digest())
+        cached = 0
+        with self._lock:
+            for key in keys:
+                if key not in self._entries:
+                    break
+                cached += 1
+            for key in keys:
+                self._entries[key] = None
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+
+class PrefixCacheStats:
+    """Totals of the `prefix_cache` metadata reported by a backend."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.hits = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, metadata: Dict[str, Any]) -> None:
+        """
+        Complete `metadata["prefix_cache"]` with `hit` and `hit_rate` and add it to the totals.
+
+        `hit_rate` is the share of the prompt's tokens served from the cache. Results
+        whose backend reports no prefix cache information are left alone.
+
+        Parameters:
+            metadata (Dict[str, Any]): Result or stream `done` metadata, updated in place.
+        """
+        prefix = metadata.get("prefix_cache")
+        if not isinstance(prefix, dict) or "cached_tokens" not in prefix:
+            return
+        cached = prefix["cached_tokens"]
+        prompt_tokens = (metadata.get("usage") or {}).get("prompt_tokens")
+        prefix["hit"] = cached > 0
+        if prompt_tokens:
+            prefix["hit_rate"] = round(min(1.0, cached / prompt_tokens), 4)
+            self.prompt_tokens += prompt_tokens
+        self.requests += 1
+        self.hits += cached > 0
+        self.cached_tokens += cached
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report how often and how much of the prompts came from the prefix cache.
+
+        Returns:
+            dict: Totals, the share of requests with a hit and the share of prompt tokens that were cached.
+        """
+        return {
+            "requests": self.requests,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.requests if self.requests else None,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "token_hit_rate": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else None,
+        }
+
+
+def with_prefix_stats(stats: PrefixCacheStats, generate_batch: BatchFn) -> BatchFn:
+    """
+    Wrap a backend's `generate_batch` to record prefix cache use (see `PrefixCacheStats.record`).
+
+    Parameters:
+        stats (PrefixCacheStats): Totals to update.
+        generate_batch (BatchFn): The coroutine function to wrap; its results should already carry `usage`.
+
+    Returns:
+        BatchFn: A coroutine function with the same contract.
+    """
+
+    async def recorded(prompts: List[str]) -> List[Any]:
+        results = await generate_batch(prompts)
+        for result in results:
+            if not isinstance(result, BaseException):
+                stats.record(result.setdefault("metadata", {}))
+        return results
+
+    return recorded
+
+
+def cached_prefix_tokens(previous: Optional[List[int]], current: List[int]) -> int:
+    """
+    Count the leading tokens two token sequences share, i.e. what a KV cache could keep.
+
+    Parameters:
+        previous (Optional[List[int]]): Tokens held in the cache before the call.
+        current (List[int]): Prompt tokens of the call.
+
+    Returns:
+        int: Length of the common prefix.
+    """
+    if not previous:
+        return 0
+    shared = 0
+    for old, new in zip(previous, current):
+        if old != new:
+            break
+        shared += 1
+    return shared
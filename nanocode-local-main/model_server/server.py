@@ -1,31 +1,118 @@
-import os
-from typing import Any, Dict
+import time
 
-from fastapi import FastAPI, HTTPException
+# Measured by the module itself so /stats/startup can report it; keep this first.
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
+
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from openai import AsyncOpenAI
+
+from model_server.backend import create_backend
+from model_server.backend.base import ChatPrompt
+from model_server.batching import BatchScheduler
+from model_server.config import get_settings
+from model_server.metrics import (
+    IN_FLIGHT,
+    PROVIDER_ERRORS,
+    REGISTRY,
+    REQUEST_DURATION,
+    RESPONSES,
+    instrument_batch,
+    record_usage,
+)
+from model_server.prefix_cache import PrefixCacheStats, with_prefix_stats
+from model_server.tokenizer import add_usage, configured_tokenizer, with_usage
+from nanocode.metrics import CONTENT_TYPE, RequestMetricsMiddleware
+from nanocode.serialization import FastJSONResponse, dumps, model_response
+from nanocode.startup import StartupReport
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
+logger = logging.getLogger(__name__)
 
 # -----------------------------------------------------------------------------
-# Configuration
+# Lifespan: backend selection and micro-batching
 # -----------------------------------------------------------------------------
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY environment variable is not set.")
 
-OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Provider SDKs are imported by `create_backend` and their clients created in
+    # `startup`, so only the selected backend costs anything at startup.
+    report = StartupReport(IMPORT_SECONDS)
+    app.state.startup = report
+    settings = get_settings()
+    with report.phase("backend_startup"):
+        backend = create_backend(settings)
+        await backend.startup()
+    with report.phase("tokenizer"):
+        tokenizer = configured_tokenizer()
+    if settings.backend_warmup:
+        with report.phase("warmup"):
+            try:
+                await backend.warmup()
+            except Exception:
+                logger.warning("Warm-up of the %s backend failed", backend.name, exc_info=True)
+    prefix_stats = PrefixCacheStats()
+    generate_batch = backend.generate_batch
+    if settings.count_usage:
+        generate_batch = with_usage(tokenizer, generate_batch)
+    generate_batch = with_prefix_stats(prefix_stats, generate_batch)
+    # Waiting for companions only pays off when the backend runs a batch as one model call;
+    # otherwise every prompt is dispatched alone, immediately.
+    batched = backend.native_batching
+    scheduler = BatchScheduler(
+        instrument_batch(backend.name, generate_batch),
+        max_batch_size=settings.batch_max_size if batched else 1,
+        max_wait_ms=settings.batch_max_wait_ms if batched else 0.0,
+    )
+    scheduler.start()
+    app.state.backend = backend
+    app.state.scheduler = scheduler
+    app.state.tokenizer = tokenizer
+    app.state.prefix_stats = prefix_stats
+    report.ready()
+    try:
+        yield
+    finally:
+        await scheduler.stop()
+        await backend.shutdown()
 
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
 # -----------------------------------------------------------------------------
 # FastAPI app
 # -----------------------------------------------------------------------------
 
-app = FastAPI(title="Nanocode OpenAI Model Server", version="0.1.0")
+app = FastAPI(
+    title="Nanocode Model Server",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
+app.add_middleware(
+    RequestMetricsMiddleware,
+    duration=REQUEST_DURATION,
+    responses=RESPONSES,
+    in_flight=IN_FLIGHT,
+    skip_paths=("/metrics",),
+)
+
+
+class ChatMessage(BaseModel):
+    role: Literal["system", "user", "assistant"]
+    content: str
 
 
 class GenerateRequest(BaseModel):
     prompt: str = Field(..., description="Full prompt string provided by the Nanocode backend.")
+    messages: Optional[List[ChatMessage]] = Field(
+        default=None,
+        description="The prompt as chat messages, stable prefix first; sent to chat backends as given.",
+    )
 
 
 class GenerateResponse(BaseModel):
@@ -33,40 +120,151 @@ class GenerateResponse(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
-@app.post("/generate", response_model=GenerateResponse)
-async def generate(payload: GenerateRequest) -> GenerateResponse:
+def _sse(data: Dict[str, Any]) -> bytes:
+    return b"data: " + dumps(data) + b"\n\n"
+
+
+async def _check_budget(prompt: str) -> None:
+    limit = get_settings().max_prompt_tokens
+    if limit > 0:
+        tokenizer = app.state.tokenizer
+        # Only a cache miss pays for counting, and it does so off the event loop.
+        tokens = tokenizer.cached_count(prompt)
+        if tokens is None:
+            tokens = await asyncio.to_thread(tokenizer.count, prompt)
+        if tokens > limit:
+            raise HTTPException(status_code=413, detail=f"Prompt is {tokens} tokens; the limit is {limit}")
+
+
+async def _prompt(payload: GenerateRequest) -> str:
     prompt = payload.prompt.strip()
     if not prompt:
         raise HTTPException(status_code=400, detail="Prompt must not be empty.")
+    await _check_budget(prompt)
+    if payload.messages:
+        return ChatPrompt(prompt, [message.model_dump() for message in payload.messages])
+    return prompt
+
+
+@app.post("/generate", response_model=GenerateResponse)
+async def generate(payload: GenerateRequest) -> Response:
+    prompt = await _prompt(payload)
 
     try:
-        response = await client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "You are Nanocode, a highly structured and helpful assistant."},
-                {"role": "user", "content": prompt},
-            ],
-        )
-
-        choice = response.choices[0]
-        output_text = choice.message.content or ""
-
-        metadata: Dict[str, Any] = {
-            "prompt": prompt,
-            "model": OPENAI_MODEL,
-        }
-
-        if getattr(response, "usage", None) is not None:
-            metadata["usage"] = {
-                "prompt_tokens": response.usage.prompt_tokens,
-                "completion_tokens": response.usage.completion_tokens,
-                "total_tokens": response.usage.total_tokens,
-            }
-
-        return GenerateResponse(output=output_text, metadata=metadata)
+        result = await app.state.scheduler.submit(prompt)
+        # Validated once here and serialized directly, bypassing FastAPI's second pass.
+        return model_response(GenerateResponse(**result))
 
     except Exception as exc:
         raise HTTPException(
             status_code=502,
-            detail=f"Error from OpenAI backend: {exc}",
+            detail=f"Error from {app.state.backend.name} backend: {exc}",
         ) from exc
+
+
+@app.post("/generate/stream")
+async def generate_stream(payload: GenerateRequest) -> StreamingResponse:
+    """
+    Relay backend deltas to the caller as Server-Sent Events.
+
+    Each frame is a `data:` line holding a JSON object: `{"type": "delta", "delta": str}`
+    for every content chunk, then a single `{"type": "done", "metadata": {...}}` frame. A
+    backend failure after streaming has begun is reported as `{"type": "error", "detail": str}`.
+    The `done` metadata carries `usage`, counted from the relayed deltas when the backend
+    does not report it.
+    """
+    prompt = await _prompt(payload)
+
+    backend = app.state.backend
+    events = backend.stream(prompt)
+
+    # Open the backend stream before responding so connection/auth failures still
+    # surface as a 502 status instead of an in-band error frame.
+    try:
+        first = await events.__anext__()
+    except Exception as exc:
+        PROVIDER_ERRORS.labels(backend.name).inc()
+        await events.aclose()
+        raise HTTPException(
+            status_code=502,
+            detail=f"Error from {backend.name} backend: {exc}",
+        ) from exc
+
+    count_usage = get_settings().count_usage
+    parts: List[str] = []
+
+    async def with_done_usage(event: Dict[str, Any]) -> Dict[str, Any]:
+        kind = event.get("type")
+        if kind == "delta" and count_usage:
+            parts.append(event.get("delta", ""))
+        elif kind == "done":
+            metadata = event.setdefault("metadata", {})
+            if count_usage:
+                # BPE counting of the whole output is CPU-bound; keep it off the event loop.
+                await asyncio.to_thread(add_usage, app.state.tokenizer, prompt, "".join(parts), metadata)
+            app.state.prefix_stats.record(metadata)
+            record_usage(backend.name, metadata)
+        return event
+
+    async def relay() -> AsyncIterator[bytes]:
+        try:
+            yield _sse(await with_done_usage(first))
+            async for event in events:
+                yield _sse(await with_done_usage(event))
+        except Exception as exc:
+            PROVIDER_ERRORS.labels(backend.name).inc()
+            yield _sse({"type": "error", "detail": f"Error from {backend.name} backend: {exc}"})
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(relay(), media_type="text/event-stream")
+
+
+@app.get("/health")
+async def health() -> Dict[str, Any]:
+    """
+    Report that the server is up and which backend it runs; used by the API's reachability probe.
+    """
+    backend = getattr(app.state, "backend", None)
+    return {"status": "ok", "backend": backend.name if backend is not None else None}
+
+
+@app.get("/stats/batching")
+async def batching_stats() -> Dict[str, Any]:
+    """
+    Report micro-batching queue depth plus batch-size and queue-wait distributions.
+    """
+    scheduler = getattr(app.state, "scheduler", None)
+    if scheduler is None:
+        return {"status": "unavailable"}
+    return {"status": "ok", "batching": scheduler.snapshot()}
+
+
+@app.get("/stats/prefix_cache")
+async def prefix_cache_stats() -> Dict[str, Any]:
+    """
+    Report how many prompts, and how many of their tokens, the backend served from its prefix cache.
+    """
+    stats = getattr(app.state, "prefix_stats", None)
+    if stats is None:
+        return {"status": "unavailable"}
+    return {"status": "ok", "prefix_cache": stats.snapshot()}
+
+
+@app.get("/stats/startup")
+async def startup_stats() -> Dict[str, Any]:
+    """
+    Report import, backend startup and warm-up times in milliseconds.
+    """
+    report = getattr(app.state, "startup", None)
+    if report is None:
+        return {"status": "unavailable"}
+    return {"status": "ok", "startup": report.snapshot()}
+
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    """
+    Expose request, provider latency and token usage metrics in the Prometheus text format.
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -1,13 +1,82 @@
-"""Placeholder tokenizer implementation."""
+"""Token counting for the model server, backed by the shared `nanocode.tokenizer`."""
+import asyncio
+from typing import Any, Dict, List
+
+from model_server.batching import BatchFn
+from model_server.config import get_settings
+from nanocode.tokenizer import Tokenizer, get_tokenizer
+
+
+def configured_tokenizer() -> Tokenizer:
+    """
+    Provide the process-wide tokenizer for the configured vocabulary.
+
+    Returns:
+        Tokenizer: Tokenizer for `MODEL_TOKENIZER_PATH`, estimating counts when it is unset.
+    """
+    settings = get_settings()
+    return get_tokenizer(settings.tokenizer_path, settings.token_cache_size)
+
 
 def tokenize(text: str) -> list[str]:
     """
-    Split the input text into tokens separated by whitespace.
+    Split the input text into tokens with the configured tokenizer.
     
     Parameters:
         text (str): Input string to tokenize. Passing a non-string may raise a TypeError.
     
     Returns:
-        list[str]: Tokens extracted from the input string.
+        list[str]: Token strings extracted from the input string.
+    """
+    return configured_tokenizer().tokenize(text)
+
+
+def add_usage(tokenizer: Tokenizer, prompt: str, output: str, metadata: Dict[str, Any]) -> None:
     """
-    return text.split()
\ No newline at end of file
+    Fill in `metadata["usage"]` from local counts when the provider did not report it.
+
+    Counted usage is marked with `metadata["usage_source"] = "tokenizer"`.
+
+    Parameters:
+        tokenizer (Tokenizer): Tokenizer used for counting.
+        prompt (str): Prompt sent to the backend.
+        output (str): Generated text.
+        metadata (Dict[str, Any]): Result or stream `done` metadata, updated in place.
+    """
+    if metadata.get("usage"):
+        return
+    prompt_tokens, completion_tokens = tokenizer.count_tokens([prompt, output])
+    metadata["usage"] = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+    metadata["usage_source"] = "tokenizer"
+
+
+def with_usage(tokenizer: Tokenizer, generate_batch: BatchFn) -> BatchFn:
+    """
+    Wrap a backend's `generate_batch` so every result reports token usage (see `add_usage`).
+
+    Counting is CPU-bound BPE work, so it runs in a worker thread rather than on the event loop.
+
+    Parameters:
+        tokenizer (Tokenizer): Tokenizer used for counting.
+        generate_batch (BatchFn): The backend coroutine function to wrap.
+
+    Returns:
+        BatchFn: A coroutine function with the same contract.
+    """
+
+    def count_batch(prompts: List[str], results: List[Any]) -> None:
+        for prompt, result in zip(prompts, results):
+            if not isinstance(result, BaseException):
+                metadata = result.setdefault("metadata", {})
+                add_usage(tokenizer, prompt, result.get("output") or "", metadata)
+
+    async def counted(prompts: List[str]) -> List[Any]:
+        results = await generate_batch(prompts)
+        await asyncio.to_thread(count_batch, prompts, results)
+        return results
+
+    return counted
@@ -30,3 +30,42 @@ def postprocess_output(request: NanocodeRequest, raw_response: dict) -> Nanocode
     content = raw_response.get("output", "")
     metadata = raw_response.get("metadata", {}) or {}
     return NanocodeResponse(input=request.input, output=content, metadata=metadata)
+
+
+class StreamingOutput:
+    """Incremental counterpart of `postprocess_output` for streamed generations."""
+
+    def __init__(self, request: NanocodeRequest) -> None:
+        """
+        Start accumulating a streamed response for the given request.
+        
+        Parameters:
+            request (NanocodeRequest): The original request whose `input` is preserved in the final response.
+        """
+        self.request = request
+        self._parts: list[str] = []
+
+    def feed(self, delta: str) -> str:
+        """
+        Record a streamed output delta and return the text to forward to the client.
+        
+        Parameters:
+            delta (str): Next chunk of model output.
+        
+        Returns:
+            str: The postprocessed chunk; currently the delta unchanged.
+        """
+        self._parts.append(delta)
+        return delta
+
+    def finish(self, metadata: dict | None = None) -> NanocodeResponse:
+        """
+        Build the final NanocodeResponse from every delta seen so far.
+        
+        Parameters:
+            metadata (dict | None): Metadata reported by the model server's final frame.
+        
+        Returns:
+            NanocodeResponse: Equivalent to `postprocess_output` applied to the concatenated output.
+        """
+        return postprocess_output(self.request, {"output": "".join(self._parts), "metadata": metadata or {}})
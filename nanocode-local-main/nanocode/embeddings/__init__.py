@@ -1 +1 @@
-"""Embeddings package placeholder."""
+"""Vector storage and similarity search for Nanocode embeddings."""
@@ -0,0 +1,261 @@
+"""Approximate nearest-neighbour search with an inverted-file (IVF-flat) index."""
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from nanocode.embeddings.similarity import (
+    METRICS,
+    SCORE_BLOCK_ELEMENTS,
+    Candidates,
+    SearchHits,
+    as_queries,
+    collect,
+    merge,
+    normalize_rows,
+    score,
+    top_k,
+)
+from nanocode.embeddings.store import DTYPE, InMemoryStore
+
+if TYPE_CHECKING:
+    from nanocode.embeddings.segments import SegmentStore
+
+
+class IVFIndex:
+    def __init__(
+        self,
+        dim: int,
+        n_lists: int = 256,
+        nprobe: int = 8,
+        metric: str = "cosine",
+        train_iterations: int = 10,
+        max_train_points: int = 65536,
+        seed: int = 0,
+    ) -> None:
+        """
+        Initialize an empty IVF-flat index.
+
+        Vectors are partitioned into `n_lists` inverted lists around k-means centroids;
+        a query only scans the `nprobe` lists whose centroids score highest. Until
+        `train()` runs the index holds a single list and every search is exact.
+
+        Parameters:
+            dim (int): Vector dimensionality.
+            n_lists (int): Number of k-means partitions. Around `sqrt(n_vectors)` is a good start.
+            nprobe (int): Default number of lists scanned per query; higher trades latency for recall.
+            metric (str): "cosine" or "dot".
+            train_iterations (int): Lloyd iterations run by `train()`.
+            max_train_points (int): Training sample size cap; larger corpora are subsampled.
+            seed (int): Seed for centroid initialization and subsampling.
+
+        Raises:
+            ValueError: If `metric` is unknown.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown similarity metric: {metric}")
+        self.dim = dim
+        self.n_lists = max(1, n_lists)
+        self.nprobe = max(1, nprobe)
+        self.metric = metric
+        self.train_iterations = train_iterations
+        self.max_train_points = max_train_points
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[InMemoryStore] = [InMemoryStore(dim=dim)]
+        self._assignment: Dict[str, int] = {}
+
+    @classmethod
+    def build(cls, store: "InMemoryStore | SegmentStore", **options) -> "IVFIndex":
+        """
+        Train an index on the vectors of an existing store and add all of them.
+
+        Parameters:
+            store (InMemoryStore | SegmentStore): Source of vectors; it must not be empty.
+            **options: Keyword arguments forwarded to `IVFIndex(...)`.
+
+        Returns:
+            IVFIndex: A trained index holding every live key of `store`.
+        """
+        keys: List[str] = []
+        blocks = []
+        for part in store.partitions():
+            matrix, _, live = part.view()
+            keys.extend(part.keys())
+            blocks.append(matrix[live])
+        vectors = np.concatenate(blocks)
+        index = cls(dim=store.dim, **options)
+        index.train(vectors)
+        index.add_many(keys, vectors)
+        return index
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def __len__(self) -> int:
+        return len(self._assignment)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._assignment
+
+    def train(self, vectors: Optional[Sequence[Sequence[float]]] = None) -> None:
+        """
+        Learn the list centroids with k-means and redistribute any vectors already added.
+
+        Parameters:
+            vectors (Optional[Sequence[Sequence[float]]]): Training sample. Defaults to the vectors currently held by the index.
+
+        Raises:
+            ValueError: If there is nothing to train on.
+        """
+        sample = None if vectors is None else np.asarray(vectors, dtype=DTYPE).reshape(-1, self.dim)
+        if (sample is None and not self._assignment) or (sample is not None and sample.shape[0] == 0):
+            raise ValueError("Cannot train an IVF index without vectors")
+        held_keys, held = self._drain()
+        self.centroids = self._kmeans(held if sample is None else sample)
+        self._lists = [InMemoryStore(dim=self.dim) for _ in range(len(self.centroids))]
+        self.add_many(held_keys, held)
+
+    def add(self, key: str, vector: Sequence[float]) -> None:
+        """Add or replace a single vector; see `add_many`."""
+        self.add_many([key], [vector])
+
+    def add_many(self, keys: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """
+        Insert vectors into their nearest lists without retraining.
+
+        Parameters:
+            keys (Sequence[str]): Identifiers, one per vector. Existing keys are moved to their new list.
+            vectors (Sequence[Sequence[float]]): Vectors as nested sequences or a 2-D array.
+        """
+        block = np.asarray(vectors, dtype=DTYPE).reshape(-1, self.dim)
+        if len(keys) != block.shape[0]:
+            raise ValueError(f"Got {len(keys)} keys for {block.shape[0]} vectors")
+        for key in keys:
+            self.delete(key)
+        if not self.trained:
+            self._lists[0].add_many(keys, block)
+            self._assignment.update(dict.fromkeys(keys, 0))
+            return
+
+        assign = self._nearest(self._prepare(block), self.centroids)
+        for list_id in np.unique(assign):
+            members = np.flatnonzero(assign == list_id)
+            member_keys = [keys[i] for i in members]
+            self._lists[list_id].add_many(member_keys, block[members])
+            self._assignment.update(dict.fromkeys(member_keys, int(list_id)))
+
+    def delete(self, key: str) -> bool:
+        """Remove a key; returns `True` if it was present."""
+        list_id = self._assignment.pop(key, None)
+        if list_id is None:
+            return False
+        return self._lists[list_id].delete(key)
+
+    def search(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        k: int,
+        nprobe: Optional[int] = None,
+    ) -> SearchHits:
+        """
+        Approximate top-`k` search over the `nprobe` closest lists of each query.
+
+        Queries that probe the same list are scored against it together, so each list
+        is read once per call however many queries touch it.
+
+        Parameters:
+            query_vectors (Sequence[Sequence[float]]): One or more query vectors.
+            k (int): Number of neighbours to return per query.
+            nprobe (Optional[int]): Lists scanned per query; defaults to `self.nprobe`.
+
+        Returns:
+            list: One list per query of `(key, score)` pairs, best first.
+        """
+        queries = as_queries(query_vectors, self.metric)
+        n_queries = queries.shape[0]
+        if not self._assignment or k <= 0:
+            return [[] for _ in range(n_queries)]
+        if queries.shape[1] != self.dim:
+            raise ValueError(f"Expected queries of dimension {self.dim}, got {queries.shape[1]}")
+
+        if self.trained:
+            probes, _ = top_k(queries @ self.centroids.T, nprobe or self.nprobe)
+        else:
+            probes = np.zeros((n_queries, 1), dtype=np.intp)
+
+        candidates: Candidates = [[] for _ in range(n_queries)]
+        for list_id in np.unique(probes):
+            inverted = self._lists[list_id]
+            if not len(inverted):
+                continue
+            members = np.flatnonzero((probes == list_id).any(axis=1))
+            matrix, inv_norms, live = inverted.view()
+            mask = live if inverted.has_tombstones else None
+            scores = score(queries[members], matrix, inv_norms, mask, self.metric)
+            collect(candidates, members, inverted, scores, k)
+        return merge(candidates, k)
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        Report index shape and list balance.
+
+        Returns:
+            dict: Vector count, list count, default nprobe, training state and the min/mean/max list size.
+        """
+        sizes = [len(inverted) for inverted in self._lists]
+        return {
+            "vectors": len(self),
+            "lists": len(sizes),
+            "nprobe": self.nprobe,
+            "trained": self.trained,
+            "list_size": {
+                "min": min(sizes),
+                "mean": round(sum(sizes) / len(sizes), 2),
+                "max": max(sizes),
+            },
+        }
+
+    def _drain(self) -> Tuple[List[str], np.ndarray]:
+        keys: List[str] = []
+        blocks = []
+        for inverted in self._lists:
+            matrix, _, live = inverted.view()
+            keys.extend(inverted.keys())
+            blocks.append(matrix[live])
+        self._assignment.clear()
+        return keys, np.concatenate(blocks) if blocks else np.zeros((0, self.dim), dtype=DTYPE)
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        return normalize_rows(vectors) if self.metric == "cosine" else vectors
+
+    def _nearest(self, data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        assign = np.empty(data.shape[0], dtype=np.intp)
+        block = max(1, SCORE_BLOCK_ELEMENTS // len(centroids))
+        for start in range(0, data.shape[0], block):
+            assign[start : start + block] = np.argmax(data[start : start + block] @ centroids.T, axis=1)
+        return assign
+
+    def _kmeans(self, data: np.ndarray) -> np.ndarray:
+        rng = np.random.default_rng(self.seed)
+        if data.shape[0] > self.max_train_points:
+            data = data[rng.choice(data.shape[0], self.max_train_points, replace=False)]
+        data = self._prepare(data)
+        n_lists = min(self.n_lists, data.shape[0])
+        centroids = data[rng.choice(data.shape[0], n_lists, replace=False)].copy()
+
+        for _ in range(self.train_iterations):
+            assign = self._nearest(data, centroids)
+            counts = np.bincount(assign, minlength=n_lists)
+            present = np.flatnonzero(counts)
+            # Sum each cluster's members in one pass over the points sorted by cluster.
+            order = np.argsort(assign, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(counts[present])[:-1]))
+            sums = np.add.reduceat(data[order], starts, axis=0)
+            centroids[present] = sums / counts[present, None]
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                centroids[empty] = data[rng.choice(data.shape[0], len(empty), replace=False)]
+            if self.metric == "cosine":
+                centroids = normalize_rows(centroids)
+        return centroids
@@ -1,25 +1,128 @@
-"""Retrieval placeholder for embeddings."""
+"""Exact and approximate similarity search over an embeddings store."""
+from typing import Optional, Sequence, Union
+
+from nanocode.embeddings.index import IVFIndex
+from nanocode.embeddings.segments import SegmentStore
+from nanocode.embeddings.similarity import (
+    SCORE_BLOCK_ELEMENTS,
+    Candidates,
+    SearchHits,
+    as_queries,
+    collect,
+    merge,
+    score,
+)
 from nanocode.embeddings.store import InMemoryStore
 
 
 class Retriever:
-    def __init__(self, store: InMemoryStore) -> None:
+    def __init__(
+        self,
+        store: Union[InMemoryStore, SegmentStore],
+        index: Optional[IVFIndex] = None,
+    ) -> None:
         """
         Initialize the Retriever with the provided in-memory embeddings store.
-        
+
         Parameters:
-            store (InMemoryStore): The in-memory store used to retrieve embeddings.
+            store (InMemoryStore | SegmentStore): The store used to retrieve embeddings and answer exact searches.
+            index (Optional[IVFIndex]): Approximate index over the same vectors, used by `search(..., approximate=True)`. The caller keeps it in sync with the store.
         """
         self.store = store
+        self.index = index
 
     def retrieve(self, key: str) -> list[float] | None:
         """
         Retrieve an embedding vector stored under the given key.
-        
+
         Parameters:
             key (str): Identifier for the stored embedding.
-        
+
         Returns:
             The embedding vector as a list of floats, or `None` if no embedding exists for the given key.
         """
-        return self.store.get(key)
\ No newline at end of file
+        return self.store.get(key)
+
+    def search(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        k: int,
+        metric: str = "cosine",
+        approximate: bool = False,
+        nprobe: Optional[int] = None,
+    ) -> SearchHits:
+        """
+        Find the `k` most similar stored vectors for each query.
+
+        Exact search scores all queries against the whole store with one matrix
+        multiplication (in blocks of queries to bound memory) and selects the top `k`
+        per query with `argpartition`. Approximate search delegates to the IVF index and
+        only scans the `nprobe` closest inverted lists.
+
+        Parameters:
+            query_vectors (Sequence[Sequence[float]]): One or more query vectors, as nested sequences or a 2-D array.
+            k (int): Number of neighbours to return per query.
+            metric (str): "cosine" for cosine similarity or "dot" for the raw inner product. Approximate search always uses the index's metric.
+            approximate (bool): Use the IVF index instead of a brute-force scan.
+            nprobe (Optional[int]): Inverted lists probed per query for approximate search; defaults to the index setting.
+
+        Returns:
+            list: One list per query of `(key, score)` pairs, best first. Lists are shorter than `k` when the store holds fewer vectors.
+
+        Raises:
+            ValueError: If `metric` is unknown, the queries do not match the store's dimensionality, or approximate search is requested without an index.
+        """
+        if approximate:
+            if self.index is None:
+                raise ValueError("Approximate search requires an IVFIndex")
+            return self.index.search(query_vectors, k, nprobe=nprobe)
+
+        queries = as_queries(query_vectors, metric)
+        if len(self.store) == 0 or k <= 0 or queries.shape[0] == 0:
+            return [[] for _ in range(queries.shape[0])]
+        if queries.shape[1] != self.store.dim:
+            raise ValueError(f"Expected queries of dimension {self.store.dim}, got {queries.shape[1]}")
+
+        k = min(k, len(self.store))
+        candidates: Candidates = [[] for _ in range(queries.shape[0])]
+        for part in self.store.partitions():
+            if not len(part):
+                continue
+            matrix, inv_norms, live = part.view()
+            mask = live if part.has_tombstones else None
+            block = max(1, SCORE_BLOCK_ELEMENTS // matrix.shape[0])
+            for start in range(0, queries.shape[0], block):
+                scores = score(queries[start : start + block], matrix, inv_norms, mask, metric)
+                collect(candidates, range(start, start + scores.shape[0]), part, scores, k)
+        return merge(candidates, k)
+
+
+def evaluate_recall(
+    retriever: Retriever,
+    query_vectors: Sequence[Sequence[float]],
+    k: int,
+    nprobe: Optional[int] = None,
+) -> float:
+    """
+    Measure how many exact neighbours approximate search finds.
+
+    Parameters:
+        retriever (Retriever): Retriever with both a store and an index over the same vectors.
+        query_vectors (Sequence[Sequence[float]]): Evaluation queries.
+        k (int): Neighbours compared per query.
+        nprobe (Optional[int]): Lists scanned per query; defaults to the index setting.
+
+    Returns:
+        float: Recall@k averaged over the queries, between 0 and 1.
+    """
+    metric = retriever.index.metric if retriever.index is not None else "cosine"
+    exact = retriever.search(query_vectors, k, metric=metric)
+    approximate = retriever.search(query_vectors, k, approximate=True, nprobe=nprobe)
+    expected = sum(len(hits) for hits in exact)
+    if not expected:
+        return 1.0
+    found = sum(
+        len({key for key, _ in truth} & {key for key, _ in guess})
+        for truth, guess in zip(exact, approximate)
+    )
+    return found / expected
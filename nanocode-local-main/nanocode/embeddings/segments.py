@@ -0,0 +1,417 @@
+"""Persistent, append-only vector segments shared between processes via `numpy.memmap`."""
+import json
+import os
+import threading
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from nanocode.embeddings.store import DTYPE, InMemoryStore
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+
+class Segment:
+    def __init__(self, directory: str, name: str, seq: int, rows: int, dim: int) -> None:
+        """
+        Open an immutable on-disk segment without reading its contents.
+
+        A segment is three files sharing `name`: `<name>.f32` holds the vectors as a raw
+        row-major float32 matrix, `<name>.norms` their float32 inverse norms and
+        `<name>.keys.json` the row keys. Vectors and norms are memory-mapped, so opening is
+        O(1) and every process mapping the same file shares its pages through the OS page
+        cache. Keys are only parsed on first use.
+
+        Parameters:
+            directory (str): Store directory holding the segment files.
+            name (str): Base file name of the segment.
+            seq (int): Ordering sequence; for duplicate keys the highest sequence wins.
+            rows (int): Number of rows in the segment.
+            dim (int): Vector dimensionality.
+        """
+        self.directory = directory
+        self.name = name
+        self.seq = seq
+        self.rows = rows
+        base = os.path.join(directory, name)
+        if rows:
+            self.matrix = np.memmap(base + ".f32", dtype=DTYPE, mode="r", shape=(rows, dim))
+            self.inv_norms = np.memmap(base + ".norms", dtype=DTYPE, mode="r", shape=(rows,))
+        else:
+            self.matrix = np.zeros((0, dim), dtype=DTYPE)
+            self.inv_norms = np.zeros(0, dtype=DTYPE)
+        self.live = np.ones(rows, dtype=bool)
+        self.row_of: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return self.rows - self._dead
+
+    @property
+    def has_tombstones(self) -> bool:
+        return self._dead > 0
+
+    def load_keys(self) -> List[str]:
+        with open(os.path.join(self.directory, self.name + ".keys.json"), encoding="utf-8") as handle:
+            self._keys = json.load(handle)
+        self.row_of = {key: row for row, key in enumerate(self._keys)}
+        return self._keys
+
+    def kill(self, row: int) -> None:
+        if self.live[row]:
+            self.live[row] = False
+            self._dead += 1
+
+    def key_at(self, row: int) -> Optional[str]:
+        return self._keys[row] if self.live[row] else None
+
+    def keys(self) -> List[str]:
+        return [key for key, live in zip(self._keys, self.live) if live]
+
+    def view(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.matrix, self.inv_norms, self.live
+
+    def files(self) -> List[str]:
+        base = os.path.join(self.directory, self.name)
+        return [base + ".f32", base + ".norms", base + ".keys.json"]
+
+
+def write_segment(directory: str, name: str, keys: Sequence[str], matrix: np.ndarray) -> None:
+    """
+    Write segment files atomically (each file is written to a temporary name and renamed).
+
+    Parameters:
+        directory (str): Store directory.
+        name (str): Base file name of the segment.
+        keys (Sequence[str]): Row keys, one per matrix row.
+        matrix (np.ndarray): Vectors to persist.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=DTYPE)
+    norms = np.linalg.norm(matrix, axis=1)
+    inv_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    base = os.path.join(directory, name)
+    for suffix, write in (
+        (".f32", matrix.tofile),
+        (".norms", inv_norms.tofile),
+        (".keys.json", lambda path: _write_json(path, list(keys))),
+    ):
+        tmp = base + suffix + ".tmp"
+        write(tmp)
+        os.replace(tmp, base + suffix)
+
+
+def _write_json(path: str, data) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, separators=(",", ":"))
+        handle.flush()
+        os.fsync(handle.fileno())
+
+
+class SegmentStore:
+    def __init__(
+        self,
+        path: str,
+        dim: Optional[int] = None,
+        memtable_rows: int = 65536,
+        max_segments: int = 8,
+        readonly: bool = False,
+    ) -> None:
+        """
+        Open (or create) a persistent vector store directory.
+
+        New vectors land in an in-memory memtable that `flush()` writes out as a new
+        immutable segment; nothing already on disk is rewritten. Deletes and overwrites
+        are recorded as tombstones. Once more than `max_segments` segments exist, a
+        background thread merges them into one and drops dead rows.
+
+        A single process should write to a directory; any number of processes may open it
+        with `readonly=True` and call `refresh()` to pick up flushed segments.
+
+        Parameters:
+            path (str): Store directory; created if missing.
+            dim (Optional[int]): Vector dimensionality. Read from the manifest for existing stores, otherwise fixed by the first vector added.
+            memtable_rows (int): Memtable size that triggers an automatic flush.
+            max_segments (int): Segment count above which background compaction starts.
+            readonly (bool): Open for reading only; writes raise `PermissionError`.
+        """
+        self.path = path
+        self.memtable_rows = max(1, memtable_rows)
+        self.max_segments = max(1, max_segments)
+        self.readonly = readonly
+        self._lock = threading.RLock()
+        self._compactor: Optional[threading.Thread] = None
+        self._segments: List[Segment] = []
+        self._tombstones: Dict[str, int] = {}
+        self._locations: Dict[str, Tuple[Segment, int]] = {}
+        self._keys_loaded = False
+        self._manifest_mtime = 0
+        self._next_seq = 1
+        self.dim = dim
+
+        if not readonly:
+            os.makedirs(path, exist_ok=True)
+        if os.path.exists(self._manifest_path):
+            self._load_manifest()
+        self.memtable = InMemoryStore(dim=self.dim)
+
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, MANIFEST)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_keys()
+            return len(self._locations) + len(self.memtable)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            self._ensure_keys()
+            return key in self.memtable or key in self._locations
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    def add(self, key: str, vector: Sequence[float]) -> None:
+        """Store or replace a single vector; see `add_many`."""
+        self.add_many([key], [vector])
+
+    def add_many(self, keys: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """
+        Buffer vectors in the memtable, flushing it to a new segment when it is full.
+
+        Parameters:
+            keys (Sequence[str]): Identifiers, one per vector. Existing keys are shadowed by the new value.
+            vectors (Sequence[Sequence[float]]): Vectors as nested sequences or a 2-D array.
+        """
+        self._check_writable()
+        with self._lock:
+            self._ensure_keys()
+            self.memtable.add_many(keys, vectors)
+            self.dim = self.memtable.dim
+            for key in keys:
+                location = self._locations.pop(key, None)
+                if location is not None:
+                    location[0].kill(location[1])
+                    self._tombstones[key] = self._next_seq
+            if len(self.memtable) >= self.memtable_rows:
+                self.flush()
+
+    def get(self, key: str) -> List[float] | None:
+        """
+        Retrieve the newest vector stored under the given key.
+
+        Parameters:
+            key (str): The storage key identifying the vector.
+
+        Returns:
+            List[float] | None: The vector, or `None` if the key is not present.
+        """
+        with self._lock:
+            self._ensure_keys()
+            if key in self.memtable:
+                return self.memtable.get(key)
+            location = self._locations.get(key)
+            if location is None:
+                return None
+            return location[0].matrix[location[1]].tolist()
+
+    def delete(self, key: str) -> bool:
+        """
+        Remove a key from the memtable and tombstone it in every existing segment.
+
+        The tombstone is persisted by the next `flush()`.
+
+        Returns:
+            bool: `True` if the key was present.
+        """
+        self._check_writable()
+        with self._lock:
+            self._ensure_keys()
+            found = self.memtable.delete(key)
+            location = self._locations.pop(key, None)
+            if location is not None:
+                location[0].kill(location[1])
+                self._tombstones[key] = self._next_seq
+            return found or location is not None
+
+    def keys(self) -> List[str]:
+        """Return every live key."""
+        with self._lock:
+            self._ensure_keys()
+            return list(self._locations) + self.memtable.keys()
+
+    def partitions(self) -> List[object]:
+        """
+        Return the searchable parts of the store: every segment plus the memtable.
+
+        Each part exposes `view()`, `key_at(row)`, `keys()`, `has_tombstones` and `len()`
+        like `InMemoryStore`; superseded rows are already marked dead.
+        """
+        with self._lock:
+            self._ensure_keys()
+            return [*self._segments, self.memtable]
+
+    def flush(self) -> None:
+        """Write the memtable as a new segment and persist the manifest and tombstones."""
+        self._check_writable()
+        with self._lock:
+            if len(self.memtable):
+                matrix, _, live = self.memtable.view()
+                keys = self.memtable.keys()
+                seq = self._next_seq
+                name = f"seg-{seq:08d}-{uuid.uuid4().hex[:8]}"
+                write_segment(self.path, name, keys, matrix[live])
+                segment = Segment(self.path, name, seq, len(keys), self.dim)
+                segment.load_keys()
+                for row, key in enumerate(keys):
+                    self._locations[key] = (segment, row)
+                self._segments.append(segment)
+                self._next_seq += 1
+                self.memtable = InMemoryStore(dim=self.dim)
+            self._write_manifest()
+            if len(self._segments) > self.max_segments:
+                self.compact_in_background()
+
+    def compact(self) -> None:
+        """
+        Merge every current segment into one, dropping dead rows.
+
+        The merged file is written without holding the store lock, so reads and writes
+        continue meanwhile; rows deleted or superseded during the merge stay dead.
+        """
+        self._check_writable()
+        with self._lock:
+            self._ensure_keys()
+            snapshot = list(self._segments)
+            if not snapshot or (len(snapshot) == 1 and not snapshot[0].has_tombstones):
+                return
+            parts = [(segment, np.flatnonzero(segment.live)) for segment in snapshot]
+            seq = snapshot[-1].seq
+
+        keys = [segment._keys[row] for segment, rows in parts for row in rows.tolist()]
+        matrix = np.concatenate([segment.matrix[rows] for segment, rows in parts])
+        name = f"seg-{seq:08d}-{uuid.uuid4().hex[:8]}"
+        write_segment(self.path, name, keys, matrix)
+
+        with self._lock:
+            merged = Segment(self.path, name, seq, len(keys), self.dim)
+            merged.load_keys()
+            members = set(map(id, snapshot))
+            for row, key in enumerate(keys):
+                location = self._locations.get(key)
+                if location is None or id(location[0]) not in members:
+                    merged.kill(row)
+                else:
+                    self._locations[key] = (merged, row)
+            self._segments = [merged] + [s for s in self._segments if id(s) not in members]
+            self._tombstones = {
+                key: bound
+                for key, bound in self._tombstones.items()
+                if any(segment.seq < bound and key in segment.row_of for segment in self._segments)
+            }
+            self._write_manifest()
+
+        for segment in snapshot:
+            for path in segment.files():
+                try:
+                    os.remove(path)
+                except OSError:
+                    # Another process may still map the file (Windows refuses to unlink it).
+                    pass
+
+    def compact_in_background(self) -> Optional[threading.Thread]:
+        """
+        Start `compact()` on a daemon thread unless one is already running.
+
+        Returns:
+            Optional[threading.Thread]: The running compaction thread.
+        """
+        with self._lock:
+            if self._compactor is None or not self._compactor.is_alive():
+                self._compactor = threading.Thread(target=self.compact, name="segment-compaction", daemon=True)
+                self._compactor.start()
+            return self._compactor
+
+    def refresh(self) -> bool:
+        """
+        Reload the manifest if another process has changed it.
+
+        Returns:
+            bool: `True` if a newer manifest was loaded.
+        """
+        with self._lock:
+            try:
+                mtime = os.stat(self._manifest_path).st_mtime_ns
+            except FileNotFoundError:
+                return False
+            if mtime == self._manifest_mtime:
+                return False
+            self._load_manifest()
+            return True
+
+    def close(self) -> None:
+        """Flush pending writes and wait for a running compaction to finish."""
+        if not self.readonly:
+            self.flush()
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def _check_writable(self) -> None:
+        if self.readonly:
+            raise PermissionError(f"Segment store {self.path} is open read-only")
+
+    def _load_manifest(self) -> None:
+        with open(self._manifest_path, encoding="utf-8") as handle:
+            manifest = json.load(handle)
+        if manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported segment store version: {manifest.get('version')}")
+        self.dim = manifest["dim"]
+        self._next_seq = manifest["next_seq"]
+        self._tombstones = dict(manifest.get("tombstones", {}))
+        existing = {segment.name: segment for segment in self._segments}
+        self._segments = [
+            existing.get(entry["name"]) or Segment(self.path, entry["name"], entry["seq"], entry["rows"], self.dim)
+            for entry in manifest["segments"]
+        ]
+        self._manifest_mtime = os.stat(self._manifest_path).st_mtime_ns
+        self._keys_loaded = False
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "version": FORMAT_VERSION,
+            "dim": self.dim,
+            "next_seq": self._next_seq,
+            "segments": [{"name": s.name, "seq": s.seq, "rows": s.rows} for s in self._segments],
+            "tombstones": self._tombstones,
+        }
+        tmp = self._manifest_path + ".tmp"
+        _write_json(tmp, manifest)
+        os.replace(tmp, self._manifest_path)
+        self._manifest_mtime = os.stat(self._manifest_path).st_mtime_ns
+
+    def _ensure_keys(self) -> None:
+        # Keys are parsed on first use so that opening a large store stays O(1).
+        if self._keys_loaded:
+            return
+        self._locations = {}
+        for segment in sorted(self._segments, key=lambda s: s.seq):
+            segment.live[:] = True
+            segment._dead = 0
+            for row, key in enumerate(segment.load_keys()):
+                if self._tombstones.get(key, 0) > segment.seq:
+                    segment.kill(row)
+                    continue
+                previous = self._locations.get(key)
+                if previous is not None:
+                    previous[0].kill(previous[1])
+                self._locations[key] = (segment, row)
+        for key in self.memtable.keys():
+            location = self._locations.pop(key, None)
+            if location is not None:
+                location[0].kill(location[1])
+        self._keys_loaded = True
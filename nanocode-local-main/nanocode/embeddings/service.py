@@ -1,15 +1,404 @@
-"""Embedding service client placeholder."""
+"""Local text embedding with content-hash caching and request coalescing."""
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Protocol, Sequence, Tuple
+
+import numpy as np
+
+from nanocode.embeddings.store import DTYPE
+
+DEFAULT_DIM = 256
+
+_TOKEN = re.compile(r"\w+")
+
+
+class Embedder(Protocol):
+    """Turns a batch of texts into a `(len(texts), dim)` float32 matrix."""
+
+    dim: int
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        ...
+
+
+class HashingEmbedder:
+    def __init__(self, dim: int = DEFAULT_DIM, char_ngram: int = 3) -> None:
+        """
+        Initialize a dependency-free embedder based on signed feature hashing.
+
+        Each text is split into lower-cased word unigrams, word bigrams and character
+        n-grams of every word; each feature is hashed with CRC-32 into one of `dim`
+        buckets with a hash-derived sign, and the resulting count vector is L2-normalized.
+        Texts that share vocabulary therefore get high cosine similarity, and the output
+        is identical across processes and runs.
+
+        Parameters:
+            dim (int): Output dimensionality.
+            char_ngram (int): Character n-gram length; 0 disables character features.
+        """
+        self.dim = dim
+        self.char_ngram = char_ngram
+
+    def features(self, text: str) -> List[str]:
+        words = _TOKEN.findall(text.lower())
+        features = list(words)
+        features.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+        n = self.char_ngram
+        if n:
+            for word in words:
+                padded = f"<{word}>"
+                features.extend(padded[i : i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed a batch of texts.
+
+        Parameters:
+            texts (Sequence[str]): Input texts.
+
+        Returns:
+            np.ndarray: A `(len(texts), dim)` float32 matrix of unit-length rows (all-zero for texts without word characters).
+        """
+        cells: List[int] = []
+        signs: List[float] = []
+        for row, text in enumerate(texts):
+            offset = row * self.dim
+            for feature in self.features(text):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                cells.append(offset + digest % self.dim)
+                signs.append(1.0 if digest & 0x80000000 else -1.0)
+        counts = np.bincount(
+            np.asarray(cells, dtype=np.intp),
+            weights=np.asarray(signs),
+            minlength=len(texts) * self.dim,
+        )
+        matrix = counts.reshape(len(texts), self.dim).astype(DTYPE)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def content_key(text: str) -> str:
+    """Return the SHA-256 hex digest used to cache the embedding of `text`."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class EmbeddingStats:
+    cache_hits: int = 0
+    cache_misses: int = 0
+    evictions: int = 0
+    batches: int = 0
+    texts_embedded: int = 0
+    embed_seconds: float = 0.0
+
+
+class EmbeddingCache:
+    def __init__(self, max_entries: int, stats: EmbeddingStats) -> None:
+        """
+        Initialize an LRU cache of embeddings keyed on the SHA-256 of the text.
+
+        Parameters:
+            max_entries (int): Maximum number of cached vectors; 0 disables caching.
+            stats (EmbeddingStats): Counters updated on hits, misses and evictions.
+        """
+        self.max_entries = max_entries
+        self.stats = stats
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.stats.cache_misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.cache_hits += 1
+            return vector
+
+    def set(self, key: str, vector: np.ndarray) -> np.ndarray:
+        # Store a private read-only copy so callers can share it without defensive copies.
+        vector = np.array(vector, dtype=DTYPE)
+        vector.setflags(write=False)
+        if self.max_entries <= 0:
+            return vector
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+        return vector
+
+
+class EmbeddingService:
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        cache_size: int = 10000,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+        max_queue: int = 1024,
+        workers: int = 1,
+    ) -> None:
+        """
+        Initialize the embedding service.
+
+        Cached texts are answered immediately. Concurrent async callers' cache misses go
+        through a bounded queue; a collector task groups them into batches of up to
+        `max_batch_size` texts (waiting at most `max_wait_ms` for companions) and runs
+        each batch on a thread pool so embedding never blocks the event loop.
+
+        Parameters:
+            embedder (Optional[Embedder]): Embedding backend; defaults to `HashingEmbedder()`.
+            cache_size (int): Maximum number of cached embeddings.
+            max_batch_size (int): Upper bound on texts embedded together.
+            max_wait_ms (float): Longest time the first queued text waits for companions.
+            max_queue (int): Queue capacity; callers wait for space when it is full.
+            workers (int): Threads running embedding batches.
+        """
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        self.stats = EmbeddingStats()
+        self.cache = EmbeddingCache(cache_size, self.stats)
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_queue = max(1, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="embed")
+        self._queue: Optional["asyncio.Queue[Tuple[str, asyncio.Future]]"] = None
+        self._worker: Optional["asyncio.Task[None]"] = None
+        self._inflight: set = set()
+
+    def embed_batch_sync(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed texts on the calling thread, using and filling the cache.
+
+        Parameters:
+            texts (Sequence[str]): Input texts.
+
+        Returns:
+            np.ndarray: A `(len(texts), dim)` float32 matrix.
+        """
+        keys = [content_key(text) for text in texts]
+        result = np.empty((len(texts), self.dim), dtype=DTYPE)
+        missing: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            vector = self.cache.get(key)
+            if vector is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                result[i] = vector
+        if missing:
+            unique = [texts[rows[0]] for rows in missing.values()]
+            for rows, vector in zip(missing.values(), self._run_embedder(unique)):
+                result[rows] = vector
+                self.cache.set(keys[rows[0]], vector)
+        return result
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Embed one text, coalescing with concurrent callers.
+
+        Parameters:
+            text (str): Input text.
+
+        Returns:
+            np.ndarray: A read-only `(dim,)` float32 vector.
+        """
+        vector = self.cache.get(content_key(text))
+        if vector is not None:
+            return vector
+        return await self._submit(text)
+
+    async def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed texts without blocking the event loop; misses share batches with other callers.
+
+        Parameters:
+            texts (Sequence[str]): Input texts.
+
+        Returns:
+            np.ndarray: A `(len(texts), dim)` float32 matrix.
+        """
+        vectors = await asyncio.gather(*(self.embed(text) for text in texts))
+        if not vectors:
+            return np.zeros((0, self.dim), dtype=DTYPE)
+        return np.vstack(vectors)
+
+    async def stop(self) -> None:
+        """Stop the collector task, fail queued requests and shut down the thread pool."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Embedding service stopped"))
+        self._queue = None
+        self._executor.shutdown(wait=False)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report cache effectiveness, batching and throughput.
+
+        Returns:
+            dict: Cache counters and hit ratio, cache size, queue depth, mean batch size and embedded texts per second of embedder time.
+        """
+        stats = asdict(self.stats)
+        lookups = self.stats.cache_hits + self.stats.cache_misses
+        return {
+            **stats,
+            "cache_hit_ratio": round(self.stats.cache_hits / lookups, 4) if lookups else 0.0,
+            "cache_entries": len(self.cache),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "mean_batch_size": round(self.stats.texts_embedded / self.stats.batches, 2) if self.stats.batches else 0.0,
+            "texts_per_second": (
+                round(self.stats.texts_embedded / self.stats.embed_seconds, 1) if self.stats.embed_seconds else 0.0
+            ),
+        }
+
+    def _run_embedder(self, texts: List[str]) -> np.ndarray:
+        started = time.perf_counter()
+        vectors = self.embedder.embed_batch(texts)
+        self.stats.embed_seconds += time.perf_counter() - started
+        self.stats.batches += 1
+        self.stats.texts_embedded += len(texts)
+        return vectors
+
+    async def _submit(self, text: str) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.get_loop() is not loop or self._worker.done():
+            # The collector is bound to the loop of its first caller; restart it on a new one.
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker = loop.create_task(self._run())
+        future = loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+            task = asyncio.ensure_future(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        # Identical texts queued by different callers are embedded once.
+        waiters: Dict[str, List[asyncio.Future]] = {}
+        for text, future in batch:
+            waiters.setdefault(text, []).append(future)
+        texts = list(waiters)
+        try:
+            loop = asyncio.get_running_loop()
+            vectors = await loop.run_in_executor(self._executor, self._run_embedder, texts)
+        except Exception as exc:
+            for futures in waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(exc)
+            return
+        for text, vector in zip(texts, vectors):
+            vector = self.cache.set(content_key(text), vector)
+            for future in waiters[text]:
+                if not future.done():
+                    future.set_result(vector)
+
+
+_default_service: Optional[EmbeddingService] = None
+
+
+def get_default_service() -> EmbeddingService:
+    """Return the process-wide EmbeddingService, creating it on first use."""
+    global _default_service
+    if _default_service is None:
+        _default_service = EmbeddingService()
+    return _default_service
+
 
 def embed(text: str) -> list[float]:
     """
-    Create a placeholder embedding vector for the given text.
-    
-    This implementation returns a single-element embedding equal to the length of the input string converted to a float.
-    
+    Create an embedding vector for the given text.
+
     Parameters:
         text (str): Input text to embed.
-    
+
     Returns:
-        list[float]: A one-element list containing the input text length as a float.
+        list[float]: A unit-length vector of `DEFAULT_DIM` floats from the default embedding service.
     """
-    return [float(len(text))]
\ No newline at end of file
+    return get_default_service().embed_batch_sync([text])[0].tolist()
+
+
+def embed_batch(texts: Sequence[str]) -> list[list[float]]:
+    """
+    Create embedding vectors for many texts in one embedder call.
+
+    Parameters:
+        texts (Sequence[str]): Input texts.
+
+    Returns:
+        list[list[float]]: One vector per text, in input order.
+    """
+    return get_default_service().embed_batch_sync(texts).tolist()
+
+
+def benchmark(n_texts: int = 20000, batch_size: int = 256, dim: int = DEFAULT_DIM) -> Dict[str, float]:
+    """
+    Measure embedding throughput on synthetic snippets.
+
+    Parameters:
+        n_texts (int): Number of distinct texts to embed.
+        batch_size (int): Texts per `embed_batch_sync` call.
+        dim (int): Embedding dimensionality.
+
+    Returns:
+        dict: Texts per second for a cold pass (every text embedded) and a warm pass (every text served from the cache).
+    """
+    service = EmbeddingService(HashingEmbedder(dim), cache_size=n_texts)
+    texts = [f"def handler_{i}(request): return validate(request.payload, rule_{i % 97})" for i in range(n_texts)]
+    results = {}
+    for label in ("cold", "warm"):
+        started = time.perf_counter()
+        for start in range(0, n_texts, batch_size):
+            service.embed_batch_sync(texts[start : start + batch_size])
+        results[f"{label}_texts_per_second"] = round(n_texts / (time.perf_counter() - started), 1)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(benchmark(), indent=2))
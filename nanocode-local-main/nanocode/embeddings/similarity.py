@@ -0,0 +1,137 @@
+"""Vectorized scoring helpers shared by exact and approximate search."""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from nanocode.embeddings.store import DTYPE
+
+METRICS = ("cosine", "dot")
+
+# Upper bound on the number of float32 scores materialised at once (64 MiB).
+SCORE_BLOCK_ELEMENTS = 1 << 24
+
+SearchHits = List[List[Tuple[str, float]]]
+# Per query, the (scores, keys) shortlists gathered from each scanned partition.
+Candidates = List[List[Tuple[np.ndarray, List[str]]]]
+
+
+def as_queries(query_vectors: Sequence[Sequence[float]], metric: str) -> np.ndarray:
+    """
+    Convert queries to a 2-D float32 matrix prepared for `metric`.
+
+    Parameters:
+        query_vectors (Sequence[Sequence[float]]): One query vector or a batch of them.
+        metric (str): "cosine" normalizes each query to unit length; "dot" leaves them as is.
+
+    Returns:
+        np.ndarray: A `(n_queries, dim)` float32 matrix.
+
+    Raises:
+        ValueError: If `metric` is unknown.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown similarity metric: {metric}")
+    queries = np.asarray(query_vectors, dtype=DTYPE)
+    if queries.ndim == 1:
+        queries = queries[None, :]
+    if metric == "cosine":
+        queries = normalize_rows(queries)
+    return queries
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length, leaving all-zero rows at zero."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def score(
+    queries: np.ndarray,
+    matrix: np.ndarray,
+    inv_norms: np.ndarray,
+    live: Optional[np.ndarray],
+    metric: str,
+) -> np.ndarray:
+    """
+    Score prepared queries against stored rows.
+
+    Parameters:
+        queries (np.ndarray): Output of `as_queries`.
+        matrix (np.ndarray): Stored vectors, one per row.
+        inv_norms (np.ndarray): Inverse row norms, used by the cosine metric.
+        live (Optional[np.ndarray]): Row liveness mask; dead rows score `-inf`. `None` when every row is live.
+        metric (str): "cosine" or "dot".
+
+    Returns:
+        np.ndarray: A `(n_queries, n_rows)` score matrix.
+    """
+    scores = queries @ matrix.T
+    if metric == "cosine":
+        scores *= inv_norms
+    if live is not None:
+        scores[:, ~live] = -np.inf
+    return scores
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the `k` best columns of each score row, best first.
+
+    Only the `k` candidates found by `argpartition` are sorted, so the cost is linear in
+    the number of columns rather than `n log n`.
+
+    Parameters:
+        scores (np.ndarray): A `(n_queries, n_rows)` score matrix.
+        k (int): Number of columns to keep; clipped to the number of columns.
+
+    Returns:
+        tuple: `(rows, row_scores)`, both `(n_queries, k)` arrays.
+    """
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        rows = np.argpartition(scores, -k, axis=1)[:, -k:]
+    else:
+        rows = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    row_scores = np.take_along_axis(scores, rows, axis=1)
+    order = np.argsort(-row_scores, axis=1, kind="stable")
+    return np.take_along_axis(rows, order, axis=1), np.take_along_axis(row_scores, order, axis=1)
+
+
+def collect(candidates: Candidates, query_ids: Sequence[int], part, scores: np.ndarray, k: int) -> None:
+    """
+    Add each query's top `k` rows of one partition to its candidate shortlist.
+
+    Parameters:
+        candidates (Candidates): Shortlists indexed by query position, updated in place.
+        query_ids (Sequence[int]): Query position of each row of `scores`.
+        part: The scored partition; `part.key_at(row)` maps rows to keys.
+        scores (np.ndarray): Output of `score` for those queries against `part`.
+        k (int): Shortlist length per query.
+    """
+    rows, row_scores = top_k(scores, k)
+    for query, query_rows, query_scores in zip(query_ids, rows, row_scores):
+        keep = np.isfinite(query_scores)
+        candidates[query].append((query_scores[keep], [part.key_at(row) for row in query_rows[keep]]))
+
+
+def merge(candidates: Candidates, k: int) -> SearchHits:
+    """
+    Reduce per-partition shortlists to the overall top `k` per query.
+
+    Parameters:
+        candidates (Candidates): Shortlists filled by `collect`.
+        k (int): Number of results per query.
+
+    Returns:
+        SearchHits: One list per query of `(key, score)` pairs, best first.
+    """
+    hits: SearchHits = []
+    for parts in candidates:
+        if not parts:
+            hits.append([])
+            continue
+        values = np.concatenate([part[0] for part in parts])
+        keys = [key for part in parts for key in part[1]]
+        order, _ = top_k(values[None, :], k)
+        hits.append([(keys[i], float(values[i])) for i in order[0]])
+    return hits
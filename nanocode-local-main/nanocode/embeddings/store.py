@@ -1,34 +1,191 @@
-"""Vector store abstraction placeholder."""
-from typing import Dict, List
+"""Contiguous float32 vector store with a key-to-row index."""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DTYPE = np.float32
 
 
 class InMemoryStore:
-    def __init__(self) -> None:
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 1024) -> None:
         """
-        Initialize an in-memory vector store.
-        
-        Creates an empty dictionary `self.store` that maps string keys to lists of floats for storing vectors.
+        Initialize an empty in-memory vector store.
+
+        Vectors live in one contiguous `(capacity, dim)` float32 matrix that doubles when
+        full. Deleting a key only tombstones its row; rows are reclaimed by `compact()`,
+        which runs automatically once more than half of the used rows are dead.
+
+        Parameters:
+            dim (Optional[int]): Vector dimensionality. When omitted it is fixed by the first vector added.
+            initial_capacity (int): Number of rows allocated up front.
         """
-        self.store: Dict[str, List[float]] = {}
+        self.dim = dim
+        self._capacity = max(1, initial_capacity)
+        self._matrix = np.zeros((self._capacity, dim or 0), dtype=DTYPE)
+        self._inv_norms = np.zeros(self._capacity, dtype=DTYPE)
+        self._live = np.zeros(self._capacity, dtype=bool)
+        self._keys: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._dead = 0
 
-    def add(self, key: str, vector: List[float]) -> None:
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._rows
+
+    @property
+    def size(self) -> int:
+        """Number of rows in use, including tombstoned ones."""
+        return len(self._keys)
+
+    def add(self, key: str, vector: Sequence[float]) -> None:
         """
-        Store a vector under the given key in the in-memory store, replacing any existing value.
-        
+        Store a vector under the given key, replacing any existing value in place.
+
         Parameters:
             key (str): The identifier under which to store the vector.
-            vector (List[float]): The numeric vector to store; existing vector for `key` will be overwritten.
+            vector (Sequence[float]): The numeric vector to store.
+
+        Raises:
+            ValueError: If the vector does not match the store's dimensionality.
         """
-        self.store[key] = vector
+        self.add_many([key], [vector])
+
+    def add_many(self, keys: Sequence[str], vectors: Iterable[Sequence[float]]) -> None:
+        """
+        Store many vectors with a single matrix write.
+
+        Parameters:
+            keys (Sequence[str]): Identifiers, one per vector. Later duplicates win.
+            vectors (Iterable[Sequence[float]]): Vectors as nested sequences or a 2-D array.
+
+        Raises:
+            ValueError: If the number of keys and vectors differ or a vector has the wrong dimensionality.
+        """
+        block = self._as_matrix(vectors)
+        if len(keys) != block.shape[0]:
+            raise ValueError(f"Got {len(keys)} keys for {block.shape[0]} vectors")
+        if not len(keys):
+            return
+
+        self._ensure_capacity(len(self._keys) + len(keys))
+        rows = np.empty(len(keys), dtype=np.intp)
+        for i, key in enumerate(keys):
+            row = self._rows.get(key)
+            if row is None:
+                row = len(self._keys)
+                self._keys.append(key)
+                self._rows[key] = row
+                self._live[row] = True
+            rows[i] = row
+
+        self._matrix[rows] = block
+        norms = np.linalg.norm(block, axis=1)
+        self._inv_norms[rows] = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
 
     def get(self, key: str) -> List[float] | None:
         """
         Retrieve the vector stored under the given key.
-        
+
         Parameters:
             key (str): The storage key identifying the vector.
-        
+
         Returns:
             List[float] | None: The vector associated with `key`, or `None` if the key is not present.
         """
-        return self.store.get(key)
\ No newline at end of file
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        return self._matrix[row].tolist()
+
+    def delete(self, key: str) -> bool:
+        """
+        Remove a key by tombstoning its row.
+
+        Parameters:
+            key (str): The storage key to remove.
+
+        Returns:
+            bool: `True` if the key was present.
+        """
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        self._keys[row] = None
+        self._live[row] = False
+        self._inv_norms[row] = 0.0
+        self._dead += 1
+        if self._dead * 2 > len(self._keys):
+            self.compact()
+        return True
+
+    def compact(self) -> None:
+        """Drop tombstoned rows so the live vectors are contiguous again."""
+        if not self._dead:
+            return
+        used = len(self._keys)
+        keep = np.flatnonzero(self._live[:used])
+        count = len(keep)
+        self._matrix[:count] = self._matrix[keep]
+        self._inv_norms[:count] = self._inv_norms[keep]
+        self._inv_norms[count:used] = 0.0
+        self._live[:count] = True
+        self._live[count:used] = False
+        self._keys = [self._keys[row] for row in keep]
+        self._rows = {key: row for row, key in enumerate(self._keys)}
+        self._dead = 0
+
+    def keys(self) -> List[str]:
+        """Return the live keys in row order."""
+        return [key for key in self._keys if key is not None]
+
+    def view(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Expose the used part of the storage without copying.
+
+        Returns:
+            tuple: `(matrix, inv_norms, live)` covering the first `size` rows. Tombstoned rows have `live` false and a zero inverse norm. The arrays are invalidated by the next write.
+        """
+        used = len(self._keys)
+        return self._matrix[:used], self._inv_norms[:used], self._live[:used]
+
+    def partitions(self) -> List["InMemoryStore"]:
+        """Return the searchable parts of the store; an in-memory store is a single part."""
+        return [self]
+
+    def key_at(self, row: int) -> Optional[str]:
+        """Return the key stored at `row`, or `None` for a tombstone."""
+        return self._keys[row]
+
+    @property
+    def has_tombstones(self) -> bool:
+        return self._dead > 0
+
+    def _as_matrix(self, vectors: Iterable[Sequence[float]]) -> np.ndarray:
+        block = np.asarray(vectors if isinstance(vectors, np.ndarray) else list(vectors), dtype=DTYPE)
+        if block.size == 0:
+            return block.reshape(0, self.dim or 0)
+        if block.ndim != 2:
+            raise ValueError("Expected a 2-D batch of vectors")
+        if self.dim is None:
+            self.dim = block.shape[1]
+            self._matrix = np.zeros((self._capacity, self.dim), dtype=DTYPE)
+        elif block.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {block.shape[1]}")
+        return block
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if rows <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < rows:
+            capacity *= 2
+        matrix = np.zeros((capacity, self._matrix.shape[1]), dtype=DTYPE)
+        matrix[: self._capacity] = self._matrix
+        inv_norms = np.zeros(capacity, dtype=DTYPE)
+        inv_norms[: self._capacity] = self._inv_norms
+        live = np.zeros(capacity, dtype=bool)
+        live[: self._capacity] = self._live
+        self._matrix, self._inv_norms, self._live = matrix, inv_norms, live
+        self._capacity = capacity
@@ -1,15 +1,158 @@
-"""Simple health scoring for the service."""
-import random
+"""Health scoring for the service from live upstream telemetry."""
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
 
 
-def compute_health_score() -> float:
-    # Placeholder health calculation; deterministic for tests
+class HealthTracker:
+    def __init__(
+        self,
+        window_seconds: float = 60.0,
+        max_samples: int = 1024,
+        latency_target_seconds: float = 2.0,
+        concurrency_limit: int = 64,
+    ) -> None:
+        """
+        Initialize a sliding window of recent upstream call outcomes.
+
+        Samples live in a bounded deque with running latency and error totals, so
+        recording is O(1) and expiry is amortized O(1): samples leave the window when they
+        are older than `window_seconds` or when `max_samples` newer ones have arrived.
+
+        Parameters:
+            window_seconds (float): Age after which a sample no longer counts.
+            max_samples (int): Upper bound on samples kept.
+            latency_target_seconds (float): Mean upstream latency considered fully healthy; the latency component reaches 0 at four times this value.
+            concurrency_limit (int): Upstream calls in flight at which the instance is considered saturated.
+        """
+        self.window_seconds = window_seconds
+        self.latency_target = latency_target_seconds
+        self.concurrency_limit = max(1, concurrency_limit)
+        self.in_flight = 0
+        self.reachable = True
+        self.reachability_checked_at = 0.0
+        self._samples: Deque[Tuple[float, float, bool]] = deque()
+        self._max_samples = max(1, max_samples)
+        self._latency_total = 0.0
+        self._errors = 0
+
+    def started(self) -> float:
+        """
+        Mark an upstream call as in flight.
+
+        Returns:
+            float: Start timestamp to hand back to `finished`.
+        """
+        self.in_flight += 1
+        return time.perf_counter()
+
+    def finished(
+        self,
+        started: float,
+        ok: bool,
+        reachable: bool = True,
+        latency: Optional[float] = None,
+    ) -> None:
+        """
+        Record the outcome of a call begun with `started`.
+
+        Parameters:
+            started (float): Value returned by `started()`.
+            ok (bool): Whether the call succeeded.
+            reachable (bool): `False` when the model server could not be reached at all.
+            latency (Optional[float]): Latency to record instead of the time since `started` (e.g. time to first event of a stream).
+        """
+        self.in_flight -= 1
+        self.mark_reachable(reachable)
+        self.record(time.perf_counter() - started if latency is None else latency, ok)
+
+    def mark_reachable(self, reachable: bool) -> None:
+        """Record whether the model server was last found reachable."""
+        self.reachable = reachable
+        self.reachability_checked_at = time.monotonic()
+
+    def record(self, latency: float, ok: bool, now: Optional[float] = None) -> None:
+        """Add one sample to the window."""
+        now = time.monotonic() if now is None else now
+        if len(self._samples) >= self._max_samples:
+            self._evict()
+        self._samples.append((now, latency, ok))
+        self._latency_total += latency
+        self._errors += not ok
+
+    def score(self, now: Optional[float] = None) -> float:
+        """
+        Compute the current health score.
+
+        The score is the weakest of its components, each in [0, 1]: mean latency
+        against the target, the success ratio, free concurrency, and reachability (0
+        when the model server was last found unreachable).
+
+        Returns:
+            float: Health score between 0.0 and 1.0, rounded to three decimals.
+        """
+        return round(min(self.components(now).values()), 3)
+
+    def components(self, now: Optional[float] = None) -> Dict[str, float]:
+        """Return the individual score components used by `score`."""
+        self._expire(time.monotonic() if now is None else now)
+        count = len(self._samples)
+        mean_latency = self._latency_total / count if count else 0.0
+        over = max(0.0, mean_latency - self.latency_target)
+        return {
+            "latency": _clamp(1.0 - over / (3.0 * self.latency_target)),
+            "errors": 1.0 - self._errors / count if count else 1.0,
+            "saturation": _clamp(1.0 - self.in_flight / self.concurrency_limit),
+            "reachability": 1.0 if self.reachable else 0.0,
+        }
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Report the window contents behind the score.
+
+        Returns:
+            dict: Score, components, sample count, mean latency, error ratio, in-flight count and limit.
+        """
+        components = self.components(now)
+        count = len(self._samples)
+        return {
+            "score": round(min(components.values()), 3),
+            "components": {name: round(value, 3) for name, value in components.items()},
+            "samples": count,
+            "mean_latency_seconds": round(self._latency_total / count, 4) if count else 0.0,
+            "error_ratio": round(self._errors / count, 4) if count else 0.0,
+            "in_flight": self.in_flight,
+            "concurrency_limit": self.concurrency_limit,
+        }
+
+    def _expire(self, now: float) -> None:
+        horizon = now - self.window_seconds
+        while self._samples and self._samples[0][0] < horizon:
+            self._evict()
+
+    def _evict(self) -> None:
+        _, latency, ok = self._samples.popleft()
+        self._latency_total -= latency
+        self._errors -= not ok
+        if not self._samples:
+            # Reset drift accumulated by float subtraction.
+            self._latency_total = 0.0
+
+
+def _clamp(value: float) -> float:
+    return max(0.0, min(1.0, value))
+
+
+def compute_health_score(tracker: Optional[HealthTracker] = None) -> float:
     """
-    Compute a deterministic placeholder health score for the service.
-    
-    The score is in the range [0.8, 1.0) and is rounded to three decimal places; the result is deterministic to support tests.
+    Compute the service health score from recent upstream telemetry.
+
+    Parameters:
+        tracker (Optional[HealthTracker]): Window of recent upstream calls. Without one (no traffic observed) the service is reported fully healthy.
+
     Returns:
-        float: Health score between 0.8 (inclusive) and 1.0 (exclusive), rounded to three decimals.
+        float: Health score between 0.0 and 1.0, rounded to three decimals.
     """
-    random.seed(42)
-    return round(random.uniform(0.8, 1.0), 3)
\ No newline at end of file
+    if tracker is None:
+        return 1.0
+    return tracker.score()
@@ -0,0 +1,266 @@
+"""Minimal Prometheus-style metrics: counters, gauges, histograms and text exposition.
+
+Recording is a dictionary lookup plus an integer/float increment with no locks: the
+services record from a single event loop, and under the GIL a concurrent thread can at
+worst lose an increment, which is acceptable for telemetry.
+"""
+import bisect
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Sequence, Tuple
+
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: str, **kwargs: str):
+        """
+        Return the child metric for one combination of label values.
+
+        Children are cached, so hot paths can call this once and keep the result.
+        """
+        key = tuple(str(v) for v in values) if values else tuple(str(kwargs[n]) for n in self.labelnames)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, child in sorted(self._children.items()):
+            yield from child.render(self.name, self.labelnames, values)
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def render(self, name: str, labelnames: Sequence[str], values: Sequence[str]) -> Iterator[str]:
+        yield f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> "_Timer":
+        """Context manager observing the elapsed wall-clock seconds of its block."""
+        return _Timer(self)
+
+    def render(self, name: str, labelnames: Sequence[str], values: Sequence[str]) -> Iterator[str]:
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            yield f"{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}"
+        yield f"{name}_sum{_format_labels(labelnames, values)} {_format_value(self.sum)}"
+        yield f"{name}_count{_format_labels(labelnames, values)} {self.count}"
+
+
+class _Timer:
+    __slots__ = ("target", "started")
+
+    def __init__(self, target: _HistogramValue) -> None:
+        self.target = target
+        self.started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.target.observe(time.perf_counter() - self.started)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+
+class Registry:
+    def __init__(self) -> None:
+        """Initialize an empty collection of metrics rendered together."""
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        Render every registered metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition document, newline-terminated.
+        """
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class RequestMetricsMiddleware:
+    def __init__(
+        self,
+        app: Callable[..., Awaitable[None]],
+        duration: Histogram,
+        responses: Counter,
+        in_flight: Gauge,
+        skip_paths: Sequence[str] = (),
+    ) -> None:
+        """
+        Wrap an ASGI app to record per-route latency, response status and in-flight requests.
+
+        Implemented as raw ASGI rather than `BaseHTTPMiddleware` so it adds no extra task
+        or response buffering, and streaming responses are timed until their last byte.
+
+        Parameters:
+            app: The ASGI application to wrap.
+            duration (Histogram): Observed in seconds, labelled by `route`.
+            responses (Counter): Incremented per response, labelled by `route` and `status`.
+            in_flight (Gauge): Requests currently being handled.
+            skip_paths (Sequence[str]): Paths that are not recorded (e.g. the metrics endpoint itself).
+        """
+        self.app = app
+        self.duration = duration
+        self.responses = responses
+        self.in_flight = in_flight
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope.get("path") in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight.dec()
+            # Label by route template, not raw path, to keep label cardinality bounded.
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.duration.labels(route).observe(time.perf_counter() - started)
+            self.responses.labels(route, str(status)).inc()
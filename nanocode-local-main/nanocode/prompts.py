@@ -1,6 +1,74 @@
 """Prompt templates for Nanocode generation."""
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
 from nanocode.constants import DEFAULT_SYSTEM_PROMPT
 from nanocode.schema import NanocodeRequest
+from nanocode.tokenizer import Tokenizer
+
+
+Message = Dict[str, str]
+
+
+class PromptTemplate:
+    def __init__(self, system: str = DEFAULT_SYSTEM_PROMPT, profile_cache_size: int = 1024) -> None:
+        """
+        Compile the prompt layout into chat messages that lead with a stable prefix.
+        
+        The system message holds the static instructions followed by the request's
+        constraint profile, and the user message holds only the request input. Requests
+        sharing a constraint profile therefore share the whole system message, token for
+        token, which is what provider prompt caches and local KV caches can reuse; only the
+        trailing user message differs. The system message of each profile is built once.
+        
+        Parameters:
+            system (str): Static instructions that open every prompt.
+            profile_cache_size (int): Constraint profiles whose system message is kept.
+        """
+        self.system = system
+        self._system_message = lru_cache(maxsize=profile_cache_size)(self._compile_system)
+
+    def _compile_system(self, constraints: Tuple[str, ...]) -> str:
+        if constraints:
+            return f"{self.system}\nConstraints: {', '.join(constraints)}"
+        return self.system
+
+    def messages(self, request: NanocodeRequest) -> List[Message]:
+        """
+        Build the chat messages for a request.
+        
+        Parameters:
+            request (NanocodeRequest): Request containing the user input and optional constraints.
+        
+        Returns:
+            List[Message]: The system message (instructions and constraints), then the user message with the input.
+        """
+        return [
+            {"role": "system", "content": self._system_message(tuple(request.constraints or ()))},
+            {"role": "user", "content": f"User request: {request.input}"},
+        ]
+
+    @staticmethod
+    def render(messages: List[Message]) -> str:
+        """Flatten messages into the single prompt string used for cache keys, token counts and logs."""
+        return "\n".join(message["content"] for message in messages)
+
+
+DEFAULT_TEMPLATE = PromptTemplate()
+
+
+def build_messages(request: NanocodeRequest) -> List[Message]:
+    """
+    Build the chat messages for a request with the default template.
+    
+    Parameters:
+        request (NanocodeRequest): Request containing the user input and optional constraints.
+    
+    Returns:
+        List[Message]: See `PromptTemplate.messages`.
+    """
+    return DEFAULT_TEMPLATE.messages(request)
 
 
 def build_prompt(request: NanocodeRequest) -> str:
@@ -11,9 +79,73 @@ def build_prompt(request: NanocodeRequest) -> str:
         request (NanocodeRequest): Request containing the user input and optional constraints.
     
     Returns:
-        str: The prompt starting with the default system prompt and a "User request: {input}" line. If the request includes constraints, a "Constraints: {c1, c2, ...}" line with a comma-separated list of constraints is appended.
+        str: The default system prompt, then a "Constraints: {c1, c2, ...}" line if the request has constraints, then a "User request: {input}" line. Everything before the last line is shared by requests with the same constraints.
+    """
+    return PromptTemplate.render(build_messages(request))
+
+
+class PromptTooLong(ValueError):
+    """Raised when a prompt exceeds the token budget and cannot be truncated to fit."""
+
+    def __init__(self, tokens: int, limit: int) -> None:
+        super().__init__(f"Prompt is {tokens} tokens; the limit is {limit}")
+        self.tokens = tokens
+        self.limit = limit
+
+
+@dataclass(frozen=True)
+class PromptBudget:
+    tokenizer: Tokenizer
+    max_tokens: int
+    # "reject" raises PromptTooLong; "truncate" shortens the user input to fit.
+    overflow: str = "reject"
+
+    def __post_init__(self) -> None:
+        if self.overflow not in ("reject", "truncate"):
+            raise ValueError(f"Unknown prompt overflow {self.overflow!r}; expected 'reject' or 'truncate'")
+
+
+@dataclass
+class FittedPrompt:
+    text: str
+    tokens: int
+    truncated: bool = False
+    messages: List[Message] = field(default_factory=list)
+
+
+def fit_prompt(request: NanocodeRequest, budget: PromptBudget) -> FittedPrompt:
+    """
+    Build the prompt for `request` and make sure it fits the token budget.
+    
+    With `overflow="truncate"`, the user input is cut at a token boundary until the whole
+    prompt fits; the system prompt and constraints are always kept.
+    
+    Parameters:
+        request (NanocodeRequest): Request containing the user input and optional constraints.
+        budget (PromptBudget): Tokenizer, limit and overflow policy.
+    
+    Returns:
+        FittedPrompt: The prompt text and messages, its token count and whether the input was truncated.
+    
+    Raises:
+        PromptTooLong: If the prompt is over the limit and `overflow` is "reject", or the prompt is over the limit even with an empty input.
     """
-    base = f"{DEFAULT_SYSTEM_PROMPT}\nUser request: {request.input}"
-    if request.constraints:
-        return f"{base}\nConstraints: {', '.join(request.constraints)}"
-    return base
+    tokenizer, limit = budget.tokenizer, budget.max_tokens
+    messages = build_messages(request)
+    prompt = PromptTemplate.render(messages)
+    tokens = tokenizer.count(prompt)
+    if tokens <= limit:
+        return FittedPrompt(prompt, tokens, messages=messages)
+    if budget.overflow == "truncate":
+        text = request.input
+        # Token boundaries can shift where input meets template, so re-count until it fits.
+        keep = tokenizer.count(text) - (tokens - limit)
+        while keep > 0:
+            text = tokenizer.truncate(text, keep)
+            messages = build_messages(request.model_copy(update={"input": text}))
+            prompt = PromptTemplate.render(messages)
+            fitted = tokenizer.count(prompt)
+            if fitted <= limit:
+                return FittedPrompt(prompt, fitted, truncated=True, messages=messages)
+            keep -= fitted - limit
+    raise PromptTooLong(tokens, limit)
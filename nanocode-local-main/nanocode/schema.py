@@ -1,11 +1,20 @@
 """Pydantic models for Nanocode payloads."""
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 from pydantic import BaseModel, Field
 
+# Scheduling classes for upstream calls, highest priority first.
+Priority = Literal["interactive", "default", "batch"]
+
 
 class NanocodeRequest(BaseModel):
     input: str = Field(..., description="User request for Nanocode generation")
     constraints: Optional[List[str]] = Field(default=None, description="Optional constraints")
+    priority: Optional[Priority] = Field(default=None, description="Scheduling class for the upstream call")
+    deadline_ms: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="Milliseconds from receipt after which the result is no longer wanted",
+    )
 
 
 class NanocodeResponse(BaseModel):
@@ -17,3 +26,4 @@ class NanocodeResponse(BaseModel):
 class HealthResponse(BaseModel):
     status: str
     score: float
+    details: Dict[str, Any] = Field(default_factory=dict)
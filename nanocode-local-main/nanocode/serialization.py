@@ -0,0 +1,58 @@
+"""JSON encoding shared by the API and the model server, using orjson when installed."""
+import json
+from typing import Any, Mapping, Optional, Union
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # optional: pip install "nanocode-local[fast]"
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Encode a JSON-compatible object as compact UTF-8 JSON.
+
+    Parameters:
+        obj (Any): Dicts, lists, strings, numbers, booleans and `None`.
+
+    Returns:
+        bytes: The encoded document; identical in meaning with or without orjson.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode a JSON document."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """`JSONResponse` rendered with `dumps`, i.e. orjson when it is installed."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_response(model: BaseModel, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """
+    Serialize an already validated model in one pass.
+
+    Returning this from an endpoint skips FastAPI's `response_model` handling, which
+    would dump the model to a dict, validate it again and encode it once more; keep
+    `response_model` on the route for the OpenAPI schema.
+
+    Parameters:
+        model (BaseModel): Instance built (and so validated) by the caller.
+        headers (Optional[Mapping[str, str]]): Extra response headers.
+
+    Returns:
+        Response: `application/json` response holding `model.model_dump_json()`.
+    """
+    return Response(model.model_dump_json(), media_type="application/json", headers=headers)
@@ -0,0 +1,45 @@
+"""Startup timing shared by the Nanocode API and the model server."""
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+class StartupReport:
+    def __init__(self, import_seconds: float) -> None:
+        """
+        Start timing a service's lifespan startup.
+
+        Parameters:
+            import_seconds (float): Time the service's entrypoint module took to import, measured by the module itself.
+        """
+        self.import_seconds = import_seconds
+        self.phases: Dict[str, float] = {}
+        self.ready_seconds: Optional[float] = None
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time one named startup step, e.g. creating a client or warming up."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def ready(self) -> None:
+        """Mark the end of startup; the service accepts requests from here on."""
+        self.ready_seconds = time.perf_counter() - self._started
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report the import time, each phase and the total lifespan startup in milliseconds.
+
+        Returns:
+            dict: `import_ms`, `phases_ms`, `lifespan_ms` (`None` until ready) and `ready`.
+        """
+        return {
+            "import_ms": round(self.import_seconds * 1000.0, 2),
+            "phases_ms": {name: round(seconds * 1000.0, 2) for name, seconds in self.phases.items()},
+            "lifespan_ms": round(self.ready_seconds * 1000.0, 2) if self.ready_seconds is not None else None,
+            "ready": self.ready_seconds is not None,
+        }
@@ -0,0 +1,265 @@
+"""Local byte-level BPE tokenizer with cached token counts."""
+import base64
+import hashlib
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+# GPT-2 pre-tokenization (as used with the r50k/p50k vocabularies), written for the stdlib
+# `re`: `[^\W\d_]` is a letter and `(?:[^\s\w]|_)` anything but a letter, digit or space.
+GPT2_PATTERN = r"""'(?:s|t|re|ve|m|ll|d)| ?[^\W\d_]+| ?\d+| ?(?:[^\s\w]|_)+|\s+(?!\S)|\s+"""
+
+# Without a vocabulary, every pre-tokenized piece (a word with its leading space, a number,
+# a run of punctuation) counts as one token per started run of this many bytes. Common
+# words are single tokens in real vocabularies; long and rare ones split further.
+ESTIMATE_BYTES_PER_TOKEN = 6
+
+# Pieces (words) whose BPE split is kept; most text reuses a small set of words.
+_PIECE_CACHE_SIZE = 65536
+
+
+@dataclass
+class TokenizerStats:
+    cache_hits: int = 0
+    cache_misses: int = 0
+    evictions: int = 0
+
+
+def load_ranks(path: str) -> Dict[bytes, int]:
+    """
+    Read a BPE vocabulary in the tiktoken format: one `<base64 token> <rank>` per line.
+
+    Parameters:
+        path (str): Vocabulary file, e.g. `r50k_base.tiktoken`.
+
+    Returns:
+        dict: Merge rank of every token, keyed by its bytes.
+
+    Raises:
+        ValueError: If a line is malformed or a single byte has no token, which would leave some text unencodable.
+    """
+    ranks: Dict[bytes, int] = {}
+    with open(path, "rb") as handle:
+        for number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                token, rank = line.split()
+                ranks[base64.b64decode(token)] = int(rank)
+            except ValueError as exc:
+                raise ValueError(f"{path}:{number}: expected '<base64 token> <rank>'") from exc
+    missing = [value for value in range(256) if bytes([value]) not in ranks]
+    if missing:
+        raise ValueError(f"{path}: no token for {len(missing)} single bytes; not a byte-level BPE vocabulary")
+    return ranks
+
+
+class Tokenizer:
+    def __init__(
+        self,
+        ranks: Optional[Dict[bytes, int]] = None,
+        pattern: str = GPT2_PATTERN,
+        cache_size: int = 10000,
+    ) -> None:
+        """
+        Initialize a byte-level BPE tokenizer.
+
+        Text is split into pieces with `pattern`, and each piece is encoded as UTF-8 and
+        merged pairwise by lowest rank, as tiktoken does, so a tiktoken vocabulary file
+        yields the same token ids. Without `ranks`, counts are an estimate (see
+        `ESTIMATE_BYTES_PER_TOKEN`) and `encode` is unavailable.
+
+        Token counts of whole texts are cached in an LRU keyed on a hash of the content,
+        so the prompt prefix shared by every request is counted once.
+
+        Parameters:
+            ranks (Optional[Dict[bytes, int]]): Vocabulary from `load_ranks`; `None` for estimates.
+            pattern (str): Pre-tokenization regex matching the vocabulary.
+            cache_size (int): Maximum number of cached counts; 0 disables caching.
+        """
+        self.ranks = ranks
+        self.cache_size = cache_size
+        self.stats = TokenizerStats()
+        self._pattern = re.compile(pattern)
+        self._decoder = {rank: token for token, rank in ranks.items()} if ranks else {}
+        self._counts: "OrderedDict[bytes, int]" = OrderedDict()
+        self._pieces: Dict[str, List[bytes]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def exact(self) -> bool:
+        """Whether counts come from a vocabulary rather than the byte estimate."""
+        return self.ranks is not None
+
+    def _merge(self, piece: bytes) -> List[bytes]:
+        parts = [piece[i : i + 1] for i in range(len(piece))]
+        ranks = self.ranks
+        while len(parts) > 1:
+            best, best_rank = -1, None
+            for i in range(len(parts) - 1):
+                rank = ranks.get(parts[i] + parts[i + 1])
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best, best_rank = i, rank
+            if best_rank is None:
+                break
+            parts[best : best + 2] = [parts[best] + parts[best + 1]]
+        return parts
+
+    def _split(self, piece: str) -> List[bytes]:
+        # Token byte strings of one pre-tokenized piece, cached per piece.
+        parts = self._pieces.get(piece)
+        if parts is not None:
+            return parts
+        data = piece.encode("utf-8")
+        if self.ranks is None:
+            step = ESTIMATE_BYTES_PER_TOKEN
+            parts = [data[i : i + step] for i in range(0, len(data), step)]
+        elif data in self.ranks:
+            parts = [data]
+        else:
+            parts = self._merge(data)
+        if len(self._pieces) >= _PIECE_CACHE_SIZE:
+            self._pieces.clear()
+        self._pieces[piece] = parts
+        return parts
+
+    def _tokens(self, text: str) -> List[bytes]:
+        tokens: List[bytes] = []
+        for piece in self._pattern.findall(text):
+            tokens.extend(self._split(piece))
+        return tokens
+
+    def tokenize(self, text: str) -> List[str]:
+        """
+        Split text into token strings.
+
+        Parameters:
+            text (str): Input text.
+
+        Returns:
+            List[str]: One string per token; a token ending inside a multi-byte character shows a replacement character.
+        """
+        return [token.decode("utf-8", errors="replace") for token in self._tokens(text)]
+
+    def encode(self, text: str) -> List[int]:
+        """
+        Encode text as token ids.
+
+        Raises:
+            RuntimeError: If no vocabulary is loaded.
+        """
+        if self.ranks is None:
+            raise RuntimeError("Token ids need a vocabulary; set a tokenizer path")
+        return [self.ranks[token] for token in self._tokens(text)]
+
+    def decode(self, ids: Sequence[int]) -> str:
+        """Decode token ids back to text, replacing incomplete UTF-8 sequences."""
+        return b"".join(self._decoder[i] for i in ids).decode("utf-8", errors="replace")
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def _cached(self, key: bytes) -> Optional[int]:
+        with self._lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+                self.stats.cache_hits += 1
+            return count
+
+    def cached_count(self, text: str) -> Optional[int]:
+        """
+        Return the cached token count of `text` without counting it on a miss.
+
+        Lets async callers count cache hits inline and send only misses to a worker thread.
+
+        Parameters:
+            text (str): Input text.
+
+        Returns:
+            Optional[int]: Number of tokens, or `None` if `text` has not been counted (or was evicted).
+        """
+        return self._cached(self._key(text))
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens of `text`, using the cache.
+
+        Parameters:
+            text (str): Input text.
+
+        Returns:
+            int: Number of tokens.
+        """
+        key = self._key(text)
+        count = self._cached(key)
+        if count is not None:
+            return count
+        with self._lock:
+            self.stats.cache_misses += 1
+        # Text repeats a small vocabulary of pieces; split each distinct piece once.
+        split = self._split
+        count = sum(len(split(piece)) * n for piece, n in Counter(self._pattern.findall(text)).items())
+        if self.cache_size > 0:
+            with self._lock:
+                self._counts[key] = count
+                while len(self._counts) > self.cache_size:
+                    self._counts.popitem(last=False)
+                    self.stats.evictions += 1
+        return count
+
+    def count_tokens(self, texts: Sequence[str]) -> List[int]:
+        """
+        Count the tokens of several texts; repeated texts are counted once.
+
+        Parameters:
+            texts (Sequence[str]): Input texts.
+
+        Returns:
+            List[int]: Token count per text, in order.
+        """
+        counted: Dict[str, int] = {}
+        for text in texts:
+            if text not in counted:
+                counted[text] = self.count(text)
+        return [counted[text] for text in texts]
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Cut text down to its first `max_tokens` tokens.
+
+        Parameters:
+            text (str): Input text.
+            max_tokens (int): Tokens to keep.
+
+        Returns:
+            str: The longest token prefix of `text` with at most `max_tokens` tokens, without a trailing partial character.
+        """
+        if max_tokens <= 0:
+            return ""
+        tokens = self._tokens(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return b"".join(tokens[:max_tokens]).decode("utf-8", errors="ignore")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Report whether counts are exact and how well the count cache works."""
+        return {"exact": self.exact, "cache_entries": len(self._counts), **asdict(self.stats)}
+
+
+@lru_cache
+def get_tokenizer(path: Optional[str] = None, cache_size: int = 10000) -> Tokenizer:
+    """
+    Provide a process-wide tokenizer per vocabulary file.
+
+    Parameters:
+        path (Optional[str]): tiktoken-format vocabulary; `None` for estimated counts.
+        cache_size (int): Maximum number of cached counts.
+
+    Returns:
+        Tokenizer: The shared tokenizer.
+    """
+    return Tokenizer(load_ranks(path) if path else None, cache_size=cache_size)
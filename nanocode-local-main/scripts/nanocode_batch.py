@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""Run a JSONL file of NanocodeRequests through POST /nanocode/batch.
+
+Input lines are sent in chunks; results are appended to the output file as JSONL in
+completion order, each tagged with the 0-based `index` of its input line. Completed
+indices are recorded in a checkpoint file, so an interrupted job continues where it
+stopped with `--resume`. Items that failed with a retryable status (429, 500, 502, 503,
+504) are not checkpointed and are retried by the next `--resume` run; the output then holds
+more than one line for them, and the last one wins.
+
+    python scripts/nanocode_batch.py requests.jsonl -o results.jsonl --resume
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Iterator, List, Set, Tuple
+
+import httpx
+
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+
+
+def read_checkpoint(path: Path) -> Set[int]:
+    if not path.exists():
+        return set()
+    with path.open() as handle:
+        return {int(line) for line in handle if line.strip()}
+
+
+def chunks(path: Path, done: Set[int], size: int) -> Iterator[List[Tuple[int, str]]]:
+    chunk: List[Tuple[int, str]] = []
+    with path.open() as handle:
+        for index, line in enumerate(handle):
+            if not line.strip() or index in done:
+                continue
+            chunk.append((index, line.rstrip("\n")))
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(args: argparse.Namespace) -> int:
+    checkpoint_path = Path(args.checkpoint or f"{args.output}.checkpoint")
+    if not args.resume:
+        checkpoint_path.unlink(missing_ok=True)
+    done = read_checkpoint(checkpoint_path)
+
+    headers = {"Content-Type": "application/x-ndjson"}
+    if args.tenant:
+        headers["X-Nanocode-Tenant"] = args.tenant
+    params = {"concurrency": args.concurrency} if args.concurrency else {}
+    counts = {"ok": 0, "error": 0}
+
+    with httpx.Client(base_url=args.url, timeout=httpx.Timeout(args.timeout, connect=10.0)) as client, open(
+        args.output, "a" if args.resume else "w"
+    ) as output, checkpoint_path.open("a") as checkpoint:
+        for chunk in chunks(Path(args.input), done, args.chunk_size):
+            body = "\n".join(line for _, line in chunk) + "\n"
+            with client.stream("POST", "/nanocode/batch", content=body, headers=headers, params=params) as response:
+                if response.is_error:
+                    response.read()
+                    print(f"Batch request failed: {response.status_code} {response.text}", file=sys.stderr)
+                    return 1
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    item = json.loads(line)
+                    # Map the index within this chunk back to the input file's line number.
+                    item["index"] = chunk[item["index"]][0]
+                    output.write(json.dumps(item, separators=(",", ":")) + "\n")
+                    error = item.get("error")
+                    counts["error" if error else "ok"] += 1
+                    if not error or error.get("status") not in TRANSIENT_STATUSES:
+                        checkpoint.write(f"{item['index']}\n")
+            output.flush()
+            checkpoint.flush()
+            print(f"{counts['ok']} ok, {counts['error']} errors", file=sys.stderr)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL file with one NanocodeRequest per line")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file receiving the results")
+    parser.add_argument("--url", default="http://localhost:8000", help="Nanocode API base URL")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Input lines sent per request")
+    parser.add_argument("--concurrency", type=int, default=None, help="Items processed at once by the API")
+    parser.add_argument("--tenant", default=None, help="Value for the X-Nanocode-Tenant header")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Read timeout per chunk, in seconds")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="Skip inputs completed by an earlier run")
+    return run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from app.dependencies import get_model_client
+from app.main import app
+from app.model_client import ModelClient
+from nanocode.tokenizer import Tokenizer
+
+
+@pytest.fixture
+def anyio_backend():
+    """
+    Run anyio-marked tests on asyncio only; the services rely on asyncio primitives.
+    
+    Returns:
+        str: The anyio backend name "asyncio".
+    """
+    return "asyncio"
+
+
+class CountingModelClient(ModelClient):
+    """Model client stub that numbers its calls and echoes the prompt in the metadata."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    async def generate(self, prompt: str, **kwargs):
+        self.calls += 1
+        return {"output": f"call {self.calls}", "metadata": {"prompt": prompt}}
+
+
+@pytest.fixture
+def overrides():
+    """
+    Provide `app.dependency_overrides` and restore the previous overrides after the test.
+    
+    Returns:
+        dict: The app's dependency overrides, to be modified by the test.
+    """
+    previous = dict(app.dependency_overrides)
+    yield app.dependency_overrides
+    app.dependency_overrides.clear()
+    app.dependency_overrides.update(previous)
+
+
+@pytest.fixture
+def counting_client(overrides):
+    """
+    Serve the app's model calls from a fresh `CountingModelClient`.
+    
+    Returns:
+        CountingModelClient: The client, with `calls` starting at 0.
+    """
+    client = CountingModelClient(base_url="http://stub")
+    overrides[get_model_client] = lambda: client
+    return client
+
+
+class LoopRecordingTokenizer(Tokenizer):
+    """Estimating tokenizer that records whether each uncached count ran on an event loop."""
+
+    def __init__(self):
+        super().__init__()
+        self.on_loop = []
+
+    def count(self, text: str) -> int:
+        if self._key(text) not in self._counts:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                self.on_loop.append(False)
+            else:
+                self.on_loop.append(True)
+        return super().count(text)
+
+
+@pytest.fixture
+def loop_recording_tokenizer():
+    """
+    Provide a tokenizer that records whether each uncached count ran on the event loop.
+    
+    Returns:
+        LoopRecordingTokenizer: A fresh tokenizer with an empty `on_loop` list.
+    """
+    return LoopRecordingTokenizer()
@@ -0,0 +1,273 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect
+
+from app.admission import AdmissionController, AdmissionRejected
+from app.dependencies import (
+    get_admission_controller,
+    get_health_tracker,
+    get_model_client,
+    get_response_cache,
+    get_singleflight,
+)
+from app.main import app
+from app.model_client import ModelClient
+from app.singleflight import SingleFlight
+from nanocode.health import HealthTracker
+
+
+@pytest.mark.anyio("asyncio")
+async def test_waiters_are_admitted_in_order_as_slots_free():
+    admission = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout_seconds=1.0)
+    order = []
+    release = asyncio.Event()
+
+    async def call(name):
+        async with admission.slot():
+            order.append(name)
+            await release.wait()
+
+    tasks = [asyncio.ensure_future(call(name)) for name in "abc"]
+    await asyncio.sleep(0)
+    assert admission.snapshot()["in_flight"] == 1
+    assert admission.snapshot()["queued"] == 2
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == ["a", "b", "c"]
+    assert admission.snapshot()["in_flight"] == 0
+
+
+@pytest.mark.anyio("asyncio")
+async def test_full_queue_rejects_with_429_and_timeout_with_503():
+    admission = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout_seconds=0.05)
+    await admission.acquire()
+    waiter = asyncio.ensure_future(admission.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as full:
+        await admission.acquire()
+    assert full.value.status_code == 429
+    assert full.value.retry_after >= 1
+
+    with pytest.raises(AdmissionRejected) as timed_out:
+        await waiter
+    assert timed_out.value.status_code == 503
+    assert admission.snapshot()["queued"] == 0
+
+    admission.release(0.01)
+    await admission.acquire()
+    assert admission.in_flight == 1
+
+
+@pytest.mark.anyio("asyncio")
+async def test_cancelled_waiter_leaves_the_queue():
+    admission = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout_seconds=1.0)
+    await admission.acquire()
+    waiter = asyncio.ensure_future(admission.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    admission.release(0.01)
+    assert admission.snapshot()["in_flight"] == 0
+    assert admission.snapshot()["queued"] == 0
+
+
+def test_adaptive_limit_grows_when_fast_and_backs_off_when_slow():
+    admission = AdmissionController(
+        max_concurrency=10, adaptive=True, min_concurrency=2, max_concurrency_limit=12, latency_target_seconds=1.0
+    )
+    for _ in range(40):
+        admission.in_flight += 1
+        admission.release(0.1)
+    assert admission.limit == 12
+
+    admission.in_flight += 1
+    admission.release(5.0)
+    assert admission.limit == 10
+    # A burst of slow completions within one latency period counts once.
+    admission.in_flight += 1
+    admission.release(5.0, ok=False)
+    assert admission.limit == 10
+    assert admission.snapshot()["limit_decreases"] == 1
+
+
+class UnreachedModelClient(ModelClient):
+    async def generate(self, prompt: str, **kwargs):
+        raise AssertionError("shed requests must not reach the model server")
+
+
+def test_saturated_endpoint_sheds_with_retry_after(overrides):
+    admission = AdmissionController(max_concurrency=1, max_queue=0)
+    overrides[get_admission_controller] = lambda: admission
+    overrides[get_response_cache] = lambda: None
+    overrides[get_model_client] = lambda: UnreachedModelClient(base_url="http://stub")
+    admission.in_flight = 1
+    response = TestClient(app).post("/nanocode", json={"input": "busy"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert TestClient(app).get("/admin/admission").json()["admission"]["rejected_queue_full"] == 1
+
+
+async def _queue_behind_busy_slot(admission, *callers):
+    """Occupy the only slot, queue `callers` and return the order in which they are admitted."""
+    await admission.acquire()
+    order = []
+
+    async def call(name, priority, tenant):
+        await admission.acquire(priority, tenant)
+        order.append(name)
+        admission.release(0.01)
+
+    tasks = [asyncio.ensure_future(call(*caller)) for caller in callers]
+    await asyncio.sleep(0)
+    admission.release(0.01)
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.anyio("asyncio")
+async def test_higher_priority_is_admitted_first():
+    admission = AdmissionController(max_concurrency=1, max_queue=8, queue_timeout_seconds=1.0)
+    order = await _queue_behind_busy_slot(
+        admission,
+        ("batch", "batch", "t"),
+        ("default", None, "t"),
+        ("interactive", "interactive", "t"),
+    )
+    assert order == ["interactive", "default", "batch"]
+    assert admission.snapshot()["classes"]["batch"]["admitted"] == 1
+
+
+@pytest.mark.anyio("asyncio")
+async def test_tenants_share_a_class_by_weight():
+    admission = AdmissionController(
+        max_concurrency=1, max_queue=16, queue_timeout_seconds=1.0, tenant_weights={"heavy": 2}
+    )
+    callers = [(f"heavy{i}", "batch", "heavy") for i in range(6)] + [(f"light{i}", "batch", "light") for i in range(3)]
+    order = await _queue_behind_busy_slot(admission, *callers)
+    tenants = [name.rstrip("0123456789") for name in order]
+    # While both wait, heavy gets two slots for each of light's.
+    assert tenants[:6].count("heavy") == 4
+    assert tenants[:6].count("light") == 2
+
+
+@pytest.mark.anyio("asyncio")
+async def test_full_queue_preempts_lower_priority_waiter():
+    admission = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout_seconds=1.0)
+    await admission.acquire()
+    batch = asyncio.ensure_future(admission.acquire("batch"))
+    await asyncio.sleep(0)
+    interactive = asyncio.ensure_future(admission.acquire("interactive"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as displaced:
+        await batch
+    assert displaced.value.reason == "preempted"
+    admission.release(0.01)
+    await interactive
+    assert admission.snapshot()["preempted"] == 1
+
+
+@pytest.mark.anyio("asyncio")
+async def test_expired_deadline_is_dropped_before_admission():
+    admission = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout_seconds=1.0)
+    with pytest.raises(AdmissionRejected) as expired:
+        await admission.acquire(deadline=time.monotonic() - 1)
+    assert expired.value.status_code == 504
+
+    await admission.acquire()
+    with pytest.raises(AdmissionRejected) as timed_out:
+        await admission.acquire(deadline=time.monotonic() + 0.02)
+    assert timed_out.value.reason == "deadline_exceeded"
+    assert admission.snapshot()["rejected_deadline"] == 2
+
+
+def test_request_past_its_deadline_skips_the_model_call(overrides):
+    admission = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout_seconds=5.0)
+    admission.in_flight = 1
+    overrides[get_admission_controller] = lambda: admission
+    overrides[get_response_cache] = lambda: None
+    overrides[get_model_client] = lambda: UnreachedModelClient(base_url="http://stub")
+    client = TestClient(app)
+    response = client.post("/nanocode", json={"input": "late", "deadline_ms": 20, "priority": "batch"})
+    assert response.status_code == 504
+    assert "Retry-After" in response.headers
+    assert client.post("/nanocode", json={"input": "x", "priority": "urgent"}).status_code == 422
+
+
+class StreamingModelClient(ModelClient):
+    closed = False
+
+    async def generate_stream(self, prompt: str, **kwargs):
+        try:
+            yield {"type": "delta", "delta": "never sent"}
+            yield {"type": "done", "metadata": {}}
+        finally:
+            self.closed = True
+
+
+@pytest.mark.anyio("asyncio")
+async def test_stream_abandoned_before_its_body_starts_releases_its_slot(overrides):
+    admission = AdmissionController(max_concurrency=1, max_queue=0)
+    health = HealthTracker()
+    model_client = StreamingModelClient(base_url="http://stub")
+    overrides[get_admission_controller] = lambda: admission
+    overrides[get_health_tracker] = lambda: health
+    overrides[get_model_client] = lambda: model_client
+    body = b'{"input": "hello"}'
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/nanocode/stream",
+        "raw_path": b"/nanocode/stream",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        # The client is gone by the time the response starts.
+        if message["type"] == "http.response.start":
+            raise OSError("connection reset")
+
+    with pytest.raises(ClientDisconnect):
+        await app(scope, receive, send)
+    assert admission.in_flight == 0 and health.in_flight == 0
+    assert model_client.closed
+
+
+@pytest.mark.anyio("asyncio")
+async def test_coalesced_callers_keep_their_own_deadline_and_priority(overrides, counting_client):
+    admission = AdmissionController(max_concurrency=1, max_queue=8, queue_timeout_seconds=5.0)
+    singleflight = SingleFlight()
+    overrides[get_admission_controller] = lambda: admission
+    overrides[get_singleflight] = lambda: singleflight
+    overrides[get_response_cache] = lambda: None
+    await admission.acquire()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        leader = asyncio.ensure_future(client.post("/nanocode", json={"input": "same", "deadline_ms": 50}))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(client.post("/nanocode", json={"input": "same"}))
+        urgent = asyncio.ensure_future(client.post("/nanocode", json={"input": "same", "priority": "interactive"}))
+        assert (await leader).status_code == 504
+        assert not follower.done()
+        assert singleflight.snapshot()["leaders"] == 2
+        admission.release(0.01)
+        assert (await follower).json()["output"].startswith("call ")
+        assert (await urgent).status_code == 200
+    assert singleflight.snapshot()["coalesced"] == 1
+    assert counting_client.calls == 2
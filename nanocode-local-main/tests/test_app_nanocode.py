@@ -1,3 +1,5 @@
+import json
+
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -18,6 +20,20 @@ class StubModelClient(ModelClient):
         """
         return {"output": f"stubbed {prompt}"}
 
+    async def generate_stream(self, prompt: str, **kwargs):
+        """
+        Yield a deterministic stubbed event stream for the given prompt.
+        
+        Parameters:
+            prompt (str): Input prompt (unused).
+        
+        Yields:
+            dict: Two delta events followed by a done event.
+        """
+        yield {"type": "delta", "delta": "stubbed "}
+        yield {"type": "delta", "delta": "stream"}
+        yield {"type": "done", "metadata": {"model": "stub"}}
+
 
 def override_client():
     """
@@ -39,3 +55,16 @@ def test_nanocode_generate_endpoint():
     assert response.status_code == 200
     data = response.json()
     assert data["output"].startswith("stubbed")
+
+
+def test_nanocode_stream_endpoint_emits_deltas_then_final_frame():
+    response = client.post("/nanocode/stream", json={"input": "hello"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [frame for frame in response.text.split("\n\n") if frame]
+    assert frames[0].startswith("event: delta")
+    assert frames[-1].startswith("event: done")
+    final = json.loads(frames[-1].split("data: ", 1)[1])
+    assert final["output"] == "stubbed stream"
+    assert final["metadata"]["model"] == "stub"
+    assert "hello" in final["metadata"]["prompt"]
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_model_client, get_response_cache, get_trace_store
+from app.main import app
+from app.model_client import ModelClient
+from app.traces import TraceStore
+
+
+class EchoModelClient(ModelClient):
+    async def generate(self, prompt: str, **kwargs):
+        if "fail" in prompt:
+            raise RuntimeError("client bug")
+        if "number" in prompt:
+            return {"output": 42, "metadata": {}}
+        return {"output": prompt.splitlines()[-1], "metadata": {}}
+
+
+@pytest.fixture
+def batch_client(overrides):
+    overrides[get_model_client] = lambda: EchoModelClient(base_url="http://stub")
+    overrides[get_response_cache] = lambda: None
+    return TestClient(app)
+
+
+def _post(client, lines, **params):
+    response = client.post(
+        "/nanocode/batch",
+        content="\n".join(lines) + "\n",
+        params=params,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_batch_reports_results_and_errors_inline(batch_client):
+    lines = [
+        json.dumps({"input": "first"}),
+        "",
+        json.dumps({"input": "   "}),
+        "not json",
+        json.dumps({"input": "last", "priority": "interactive"}),
+    ]
+    items = {item["index"]: item for item in _post(batch_client, lines, concurrency=2)}
+    assert sorted(items) == [0, 2, 3, 4]
+    assert items[0]["result"]["input"] == "first"
+    assert items[4]["result"]["input"] == "last"
+    assert items[2]["error"]["status"] == 422
+    assert items[3]["error"]["status"] == 422
+
+
+def test_batch_item_failing_unexpectedly_does_not_end_the_batch(batch_client):
+    lines = [json.dumps({"input": "please fail"})] + [json.dumps({"input": f"item {i}"}) for i in range(5)]
+    items = {item["index"]: item for item in _post(batch_client, lines, concurrency=2)}
+    assert sorted(items) == list(range(6))
+    assert items[0]["error"] == {"status": 500, "detail": "Internal error"}
+    assert all("result" in items[i] for i in range(1, 6))
+
+
+def test_batch_reports_an_invalid_upstream_response_as_a_server_error(batch_client, overrides, tmp_path):
+    store = TraceStore(str(tmp_path), flush_interval=60.0)
+    overrides[get_trace_store] = lambda: store
+    try:
+        lines = [json.dumps({"input": "a number please"}), json.dumps({"input": "text"})]
+        items = {item["index"]: item for item in _post(batch_client, lines, concurrency=1)}
+        store.flush()
+        page, _ = store.query()
+    finally:
+        store.close()
+    assert items[0]["error"] == {"status": 500, "detail": "Internal error"}
+    assert items[1]["result"]["output"] == "User request: text"
+    assert [trace["status"] for trace in page] == [200, 500]
+
+
+def test_batch_runs_every_item(batch_client):
+    lines = [json.dumps({"input": f"item {i}"}) for i in range(50)]
+    items = _post(batch_client, lines, concurrency=4)
+    assert sorted(item["index"] for item in items) == list(range(50))
+    assert all("result" in item for item in items)
+
+
+def test_batch_rejects_oversized_body(batch_client, monkeypatch):
+    from app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "batch_max_items", 2)
+    lines = [json.dumps({"input": f"item {i}"}) for i in range(3)]
+    response = batch_client.post("/nanocode/batch", content="\n".join(lines))
+    assert response.status_code == 413
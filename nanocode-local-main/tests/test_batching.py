@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from model_server.backend import BACKENDS, mock_backend
+from model_server.backend.base import Backend
+from model_server.batching import BatchScheduler
+from model_server.config import get_settings
+from model_server.server import app, lifespan
+
+
+@pytest.mark.anyio("asyncio")
+async def test_scheduler_groups_concurrent_prompts_into_batches():
+    seen = []
+
+    async def generate_batch(prompts):
+        seen.append(list(prompts))
+        return mock_backend.generate_batch(prompts)
+
+    scheduler = BatchScheduler(generate_batch, max_batch_size=4, max_wait_ms=20)
+    scheduler.start()
+    try:
+        results = await asyncio.gather(*(scheduler.submit(f"p{i}") for i in range(6)))
+    finally:
+        await scheduler.stop()
+
+    assert [r["output"] for r in results] == [f"Echo: p{i}" for i in range(6)]
+    assert [len(batch) for batch in seen] == [4, 2]
+    stats = scheduler.snapshot()
+    assert stats["batch_size"]["count"] == 2
+    assert stats["queue_wait_ms"]["count"] == 6
+
+
+@pytest.mark.anyio("asyncio")
+async def test_scheduler_fails_only_the_prompt_whose_result_is_an_error():
+    async def generate_batch(prompts):
+        return [ValueError(p) if p == "bad" else {"output": p} for p in prompts]
+
+    scheduler = BatchScheduler(generate_batch, max_batch_size=4, max_wait_ms=5)
+    scheduler.start()
+    try:
+        good, bad = await asyncio.gather(
+            scheduler.submit("good"), scheduler.submit("bad"), return_exceptions=True
+        )
+    finally:
+        await scheduler.stop()
+
+    assert good == {"output": "good"}
+    assert isinstance(bad, ValueError)
+
+
+class FanOutBackend(Backend):
+    """A provider without a multi-prompt call: a batch just runs its prompts concurrently."""
+
+    name = "fan_out"
+
+    def __init__(self, settings):
+        self.batches = []
+
+    async def generate_batch(self, prompts):
+        self.batches.append(list(prompts))
+
+        async def generate(prompt):
+            await asyncio.sleep(0.3 if prompt == "slow" else 0.01)
+            return {"output": prompt, "metadata": {}}
+
+        return await asyncio.gather(*(generate(prompt) for prompt in prompts))
+
+
+@pytest.mark.anyio("asyncio")
+async def test_backend_without_native_batching_gets_prompts_one_at_a_time(monkeypatch):
+    monkeypatch.setitem(BACKENDS, "fan_out", "tests.test_batching:FanOutBackend")
+    monkeypatch.setenv("MODEL_BACKEND", "fan_out")
+    monkeypatch.setenv("MODEL_BATCH_MAX_WAIT_MS", "50")
+    get_settings.cache_clear()
+    finished = {}
+
+    async def send(client, prompt):
+        started = time.perf_counter()
+        response = await client.post("/generate", json={"prompt": prompt})
+        finished[prompt] = time.perf_counter() - started
+        return response
+
+    try:
+        async with lifespan(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                responses = await asyncio.gather(send(client, "slow"), send(client, "fast"))
+                stats = (await client.get("/stats/batching")).json()["batching"]
+            backend = app.state.backend
+    finally:
+        get_settings.cache_clear()
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert sorted(backend.batches) == [["fast"], ["slow"]]
+    # Neither the 50 ms batching window nor the slow prompt holds the fast one back.
+    assert finished["fast"] < 0.1
+    assert stats["max_batch_size"] == 1 and stats["max_wait_ms"] == 0.0
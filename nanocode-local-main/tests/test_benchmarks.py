@@ -0,0 +1,59 @@
+import pytest
+
+from benchmarks.load import in_process_stack, open_loop, percentile, run_load
+from benchmarks.report import compare, flatten
+
+
+def test_percentile_uses_nearest_rank():
+    ordered = [float(i) for i in range(1, 101)]
+    assert percentile(ordered, 50) == 50.0
+    assert percentile(ordered, 99) == 99.0
+    assert percentile([], 99) == 0.0
+
+
+@pytest.mark.anyio("asyncio")
+async def test_open_loop_counts_errors_and_ignores_warmup():
+    async def send(index: int) -> int:
+        if index % 4 == 3:
+            raise RuntimeError("boom")
+        return 200
+
+    report = await open_loop(send, rps=200.0, duration=0.1, warmup=0.05)
+    assert report["requests"] == 20
+    assert report["errors"] == 5
+    assert report["error_rate"] == 0.25
+    assert report["statuses"] == {"200": 15, "RuntimeError": 5}
+
+
+@pytest.mark.anyio("asyncio")
+async def test_load_against_in_process_stack():
+    report = await run_load(rps=100.0, duration=0.3, warmup=0.1, latency_ms=5.0, jitter_ms=0.0)
+    assert report["errors"] == 0
+    assert report["ok"] == 30
+    # Every call waits for the mock backend's artificial latency.
+    assert report["latency_ms"]["p50"] >= 5.0
+
+
+@pytest.mark.anyio("asyncio")
+async def test_shared_profile_hits_the_backend_prefix_cache_end_to_end():
+    async with in_process_stack(env={"RESPONSE_CACHE_ENABLED": "false"}) as client:
+        payload = {"constraints": ["python"]}
+        first = (await client.post("/nanocode", json={"input": "parse dates", **payload})).json()
+        second = (await client.post("/nanocode", json={"input": "sort a list", **payload})).json()
+    assert first["metadata"]["prefix_cache"]["hit"] is False
+    assert second["metadata"]["prefix_cache"]["hit"] is True
+    assert second["metadata"]["prefix_cache"]["cached_tokens"] > 0
+
+
+def test_compare_flags_regressions_in_the_right_direction():
+    baseline = {
+        "micro": {"build_prompt": {"ns_per_op": 100.0, "ops_per_second": 1e7}},
+        "load": {"throughput_rps": 100.0, "error_rate": 0.0, "latency_ms": {"p99": 50.0}, "statuses": {"200": 10}},
+    }
+    current = {
+        "micro": {"build_prompt": {"ns_per_op": 80.0, "ops_per_second": 1.25e7}},
+        "load": {"throughput_rps": 85.0, "error_rate": 0.2, "latency_ms": {"p99": 60.0}, "statuses": {"200": 8}},
+    }
+    assert "load.statuses.200" not in flatten(current)
+    regressions = {item["metric"] for item in compare(baseline, current, threshold=0.1)}
+    assert regressions == {"load.throughput_rps", "load.error_rate", "load.latency_ms.p99"}
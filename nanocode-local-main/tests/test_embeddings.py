@@ -0,0 +1,159 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from nanocode.embeddings.index import IVFIndex
+from nanocode.embeddings.retrieval import Retriever, evaluate_recall
+from nanocode.embeddings.segments import SegmentStore
+from nanocode.embeddings.service import EmbeddingService, HashingEmbedder, embed
+from nanocode.embeddings.store import InMemoryStore
+
+
+def test_store_grows_overwrites_and_compacts():
+    store = InMemoryStore(initial_capacity=2)
+    store.add_many([f"k{i}" for i in range(5)], np.eye(5))
+    store.add("k1", [0, 0, 0, 0, 2])
+    assert store.get("k1") == [0.0, 0.0, 0.0, 0.0, 2.0]
+    assert len(store) == 5
+
+    assert store.delete("k0") and store.delete("k2")
+    assert store.size == 5 and store.get("k0") is None
+    store.delete("k3")
+    assert store.size == 2
+    assert store.keys() == ["k1", "k4"]
+    assert store.get("k4") == [0.0, 0.0, 0.0, 0.0, 1.0]
+
+    with pytest.raises(ValueError):
+        store.add("bad", [1.0, 2.0])
+
+
+def test_search_matches_brute_force_and_skips_tombstones():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(500, 16)).astype(np.float32)
+    store = InMemoryStore(dim=16)
+    store.add_many([str(i) for i in range(500)], vectors)
+    store.delete("7")
+    retriever = Retriever(store)
+
+    queries = np.vstack([vectors[7], vectors[42], vectors[99]])
+    hits = retriever.search(queries, k=5)
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ unit.T
+    expected[:, 7] = -np.inf
+    for row, result in zip(expected, hits):
+        assert [key for key, _ in result] == [str(i) for i in np.argsort(-row)[:5]]
+    assert hits[1][0][0] == "42" and hits[1][0][1] == pytest.approx(1.0, abs=1e-5)
+    assert all(key != "7" for result in hits for key, _ in result)
+
+
+def test_search_dot_metric_and_small_store():
+    store = InMemoryStore()
+    store.add("a", [1.0, 0.0])
+    store.add("b", [3.0, 3.0])
+    retriever = Retriever(store)
+    assert retriever.search([1.0, 0.0], k=10, metric="dot") == [[("b", 3.0), ("a", 1.0)]]
+    assert retriever.search([[1.0, 0.0]], k=1)[0][0][0] == "a"
+    assert Retriever(InMemoryStore()).search([[1.0]], k=3) == [[]]
+
+
+def test_ivf_index_recall_improves_with_nprobe_and_accepts_inserts():
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(20, 32)) * 4
+    vectors = (centers[rng.integers(0, 20, size=4000)] + rng.normal(size=(4000, 32))).astype(np.float32)
+    store = InMemoryStore(dim=32)
+    store.add_many([str(i) for i in range(4000)], vectors)
+    index = IVFIndex.build(store, n_lists=32, nprobe=1)
+    retriever = Retriever(store, index)
+    queries = vectors[:50] + rng.normal(scale=0.1, size=(50, 32)).astype(np.float32)
+
+    low = evaluate_recall(retriever, queries, k=10, nprobe=1)
+    high = evaluate_recall(retriever, queries, k=10, nprobe=32)
+    assert high == pytest.approx(1.0)
+    assert low <= high and low > 0.5
+
+    extra = vectors[0] * 10
+    store.add("new", extra)
+    index.add("new", extra)
+    assert retriever.search([extra], k=1, approximate=True)[0][0][0] == "new"
+    assert index.delete("new") and "new" not in index
+    assert index.snapshot()["vectors"] == 4000
+
+
+def test_untrained_ivf_index_searches_exactly():
+    index = IVFIndex(dim=2, n_lists=4)
+    index.add_many(["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    assert index.search([[0.9, 0.1]], k=1) == [[("a", pytest.approx(0.9939, abs=1e-4))]]
+    index.train()
+    assert index.trained and len(index) == 2
+    assert index.search([[0.1, 0.9]], k=1, nprobe=4)[0][0][0] == "b"
+
+
+def test_segment_store_persists_and_shares_segments_read_only(tmp_path):
+    writer = SegmentStore(str(tmp_path), memtable_rows=3)
+    writer.add_many(["a", "b", "c"], [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]])
+    writer.add("d", [-1.0, 0.0])
+    writer.add("a", [0.5, 0.0])
+    writer.delete("b")
+    writer.flush()
+    assert writer.segment_count == 2
+
+    reader = SegmentStore(str(tmp_path), readonly=True)
+    assert isinstance(reader.partitions()[0].matrix, np.memmap)
+    assert sorted(reader.keys()) == ["a", "c", "d"]
+    assert reader.get("a") == [0.5, 0.0] and reader.get("b") is None
+    hits = Retriever(reader).search([[1.0, 0.1]], k=2)
+    assert [key for key, _ in hits[0]] == ["a", "c"]
+    with pytest.raises(PermissionError):
+        reader.add("e", [0.0, 0.0])
+
+    writer.add("e", [0.0, -1.0])
+    writer.flush()
+    assert reader.refresh() and "e" in reader
+
+
+def test_segment_store_compaction_drops_dead_rows(tmp_path):
+    store = SegmentStore(str(tmp_path), memtable_rows=2, max_segments=100)
+    for i in range(6):
+        store.add(str(i), [float(i), 1.0])
+    store.delete("0")
+    store.add("1", [9.0, 9.0])
+    store.flush()
+    store.compact()
+    assert store.segment_count == 1
+    assert len(store.partitions()[0]) == 5
+    assert len(list(tmp_path.glob("*.f32"))) == 1
+
+    reopened = SegmentStore(str(tmp_path))
+    assert sorted(reopened.keys()) == ["1", "2", "3", "4", "5"]
+    assert reopened.get("1") == [9.0, 9.0]
+
+
+def test_hashing_embeddings_are_stable_and_cached():
+    service = EmbeddingService(HashingEmbedder(dim=64), cache_size=2)
+    first = service.embed_batch_sync(["parse the config file", "parse config files", "bake a cake"])
+    assert first.shape == (3, 64)
+    assert np.allclose(np.linalg.norm(first, axis=1), 1.0, atol=1e-5)
+    assert first[0] @ first[1] > first[0] @ first[2]
+
+    again = service.embed_batch_sync(["bake a cake", "parse config files"])
+    assert np.array_equal(again, first[[2, 1]])
+    assert service.stats.cache_hits == 2 and service.stats.texts_embedded == 3
+    assert service.stats.evictions == 1
+    assert np.allclose(embed("parse the config file"), HashingEmbedder().embed_batch(["parse the config file"])[0])
+
+
+@pytest.mark.anyio("asyncio")
+async def test_concurrent_embed_calls_are_coalesced():
+    service = EmbeddingService(HashingEmbedder(dim=32), max_batch_size=16, max_wait_ms=20)
+    try:
+        vectors = await asyncio.gather(*(service.embed(f"snippet {i % 4}") for i in range(12)))
+        batch = await service.embed_batch(["snippet 0", "snippet 9"])
+    finally:
+        await service.stop()
+    assert service.stats.batches == 2
+    assert service.stats.texts_embedded == 5
+    assert np.array_equal(vectors[0], vectors[4])
+    assert np.array_equal(batch[0], vectors[0])
+    assert service.snapshot()["mean_batch_size"] == 2.5
@@ -0,0 +1,70 @@
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_endpoint_pool
+from app.endpoint_pool import EndpointPool
+from app.main import app
+from app.model_client import ModelClient
+from app.resilience import Resilience, RetryPolicy
+
+
+def test_least_outstanding_prefers_idle_then_faster_endpoints():
+    pool = EndpointPool(["http://a", "http://b/", "http://b"])
+    assert [endpoint.url for endpoint in pool.endpoints] == ["http://a", "http://b"]
+
+    pool.started("http://a")
+    assert pool.pick() == "http://b"
+    pool.finished("http://a", 0.5)
+    pool.started("http://b")
+    pool.finished("http://b", 0.1)
+    assert pool.pick() == "http://b"
+    assert pool.pick(exclude=["http://b"]) == "http://a"
+
+
+def test_p2c_avoids_the_loaded_endpoint_of_a_pair():
+    pool = EndpointPool(["http://a", "http://b"], strategy="p2c")
+    for _ in range(3):
+        pool.started("http://a")
+    assert all(pool.pick() == "http://b" for _ in range(20))
+
+    with pytest.raises(ValueError):
+        EndpointPool(["http://a"], strategy="random")
+
+
+def test_open_circuit_ejects_endpoint_until_reset():
+    resilience = Resilience(breaker_failure_threshold=1, breaker_reset_seconds=60.0)
+    pool = EndpointPool(["http://a", "http://b"], resilience=resilience)
+    resilience.breaker("http://a").record_failure()
+    assert all(pool.pick() == "http://b" for _ in range(5))
+    assert pool.snapshot()["endpoints"][0]["circuit"] == "open"
+
+    resilience.breaker("http://b").record_failure()
+    assert pool.pick() in ("http://a", "http://b")
+
+
+@pytest.mark.anyio("asyncio")
+async def test_model_client_retries_on_another_endpoint():
+    seen = []
+
+    async def handler(request):
+        seen.append(request.url.host)
+        if request.url.host == "down":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"output": request.url.host})
+
+    resilience = Resilience(retry=RetryPolicy(base_delay=0.0))
+    pool = EndpointPool(["http://down", "http://up"], resilience=resilience)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as mock_client:
+        client = ModelClient(base_url="http://unused", client=mock_client, resilience=resilience, pool=pool)
+        assert (await client.generate("hi"))["output"] == "up"
+    assert seen == ["down", "up"]
+    assert [endpoint.outstanding for endpoint in pool.endpoints] == [0, 0]
+    assert pool.snapshot()["endpoints"][0]["failures"] == 1
+
+
+def test_admin_reports_endpoints(overrides):
+    overrides[get_endpoint_pool] = lambda: EndpointPool(["http://a", "http://b"])
+    body = TestClient(app).get("/admin/endpoints").json()
+    assert body["status"] == "ok"
+    assert [endpoint["url"] for endpoint in body["endpoints"]["endpoints"]] == ["http://a", "http://b"]
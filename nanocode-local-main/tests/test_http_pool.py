@@ -0,0 +1,59 @@
+import subprocess
+import sys
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.http_pool import create_http_client, get_pool_stats, warm_up
+from app.main import app
+
+
+def test_create_http_client_applies_settings():
+    settings = Settings(model_client_timeout=12.0, model_client_connect_timeout=2.0)
+    client = create_http_client(settings)
+    assert client.timeout.read == 12.0
+    assert client.timeout.connect == 2.0
+    stats = get_pool_stats(client)
+    assert stats["active"] == 0 and stats["idle"] == 0 and stats["waiting"] == 0
+
+
+def test_lifespan_owns_shared_client_and_reports_pool():
+    with TestClient(app) as client:
+        shared = app.state.http_client
+        response = client.get("/admin/pool")
+        assert response.status_code == 200
+        assert response.json()["pool"]["total"] == 0
+    assert shared.is_closed
+
+
+@pytest.mark.anyio("asyncio")
+async def test_warm_up_probes_each_endpoint_and_tolerates_failures():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(str(request.url))
+        if request.url.host == "down":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"status": "ok"})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        opened = await warm_up(client, ["http://up:9000/", "http://down:9000"], connections=2)
+    assert opened == {"http://up:9000/": 2, "http://down:9000": 0}
+    assert seen.count("http://up:9000/health") == 2
+
+
+def test_lifespan_reports_startup_timings():
+    with TestClient(app) as client:
+        startup = client.get("/admin/startup").json()["startup"]
+    assert startup["ready"] is True
+    assert startup["import_ms"] > 0
+    assert set(startup["phases_ms"]) >= {"http_client"}
+
+
+def test_importing_the_app_skips_optional_heavy_modules():
+    # numpy is only needed by the semantic cache, provider SDKs only by the model server.
+    code = "import sys, app.main; print(sorted({'numpy', 'openai'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,55 @@
+import json
+import logging
+import queue
+
+from app.logging_config import DroppingQueueHandler, JsonFormatter, configure_logging, shutdown_logging
+
+
+def _record(msg: str, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("app.test", logging.WARNING, __file__, 1, msg, (), None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_extra_fields():
+    line = JsonFormatter().format(_record("Upstream model error", status_code=502, request_url="http://ms/generate"))
+    entry = json.loads(line)
+    assert entry["message"] == "Upstream model error"
+    assert entry["level"] == "WARNING"
+    assert entry["status_code"] == 502
+    assert entry["request_url"] == "http://ms/generate"
+    assert "args" not in entry and "lineno" not in entry
+
+
+def test_full_queue_drops_and_counts_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    handler.setFormatter(JsonFormatter())
+    for i in range(3):
+        handler.handle(_record(f"record {i}"))
+    assert handler.dropped == 2
+    # The queued record was serialized before it was enqueued.
+    assert json.loads(handler.queue.get_nowait().msg)["message"] == "record 0"
+
+
+def test_async_mode_writes_json_from_background_thread(capsys):
+    configure_logging("INFO", "json", async_queue_size=100)
+    try:
+        logging.getLogger("app.test").info("Nanocode request received", extra={"has_constraints": True})
+    finally:
+        shutdown_logging()
+    lines = [json.loads(line) for line in capsys.readouterr().err.splitlines() if line.startswith("{")]
+    assert {"message": "Nanocode request received", "has_constraints": True}.items() <= lines[-1].items()
+    configure_logging("INFO")
+
+
+def test_disabled_debug_records_are_never_formatted():
+    class Expensive:
+        def __str__(self) -> str:
+            raise AssertionError("formatted a disabled record")
+
+    configure_logging("INFO", "json", async_queue_size=10)
+    try:
+        logging.getLogger("app.test").debug("state %s", Expensive())
+    finally:
+        shutdown_logging()
+        configure_logging("INFO")
@@ -0,0 +1,41 @@
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_model_client, get_response_cache
+from app.main import app
+from app.model_client import ModelClient
+from nanocode.metrics import Registry
+
+
+class StubModelClient(ModelClient):
+    async def generate(self, prompt: str, **kwargs):
+        return {"output": "ok", "metadata": {}}
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    latency = registry.histogram("demo_seconds", "Demo latency.", ("stage",), buckets=(0.1, 1.0))
+    hits = registry.counter("demo_total", "Demo counter.")
+    latency.labels("a").observe(0.05)
+    latency.labels("a").observe(5.0)
+    hits.inc(3)
+
+    text = registry.render()
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 2' in text
+    assert 'demo_seconds_count{stage="a"} 2' in text
+    assert "demo_total 3.0" in text
+
+
+def test_admin_metrics_reports_stages_and_status_codes(overrides):
+    overrides[get_model_client] = lambda: StubModelClient(base_url="http://stub")
+    overrides[get_response_cache] = lambda: None
+    client = TestClient(app)
+    assert client.post("/nanocode", json={"input": "hi"}).status_code == 200
+    text = client.get("/admin/metrics").text
+
+    for stage in ("validate", "preprocess", "upstream", "postprocess"):
+        assert f'nanocode_stage_duration_seconds_count{{stage="{stage}"}}' in text
+    assert 'nanocode_responses_total{route="/nanocode",status="200"}' in text
+    assert 'nanocode_request_duration_seconds_count{route="/nanocode"}' in text
+    assert "nanocode_requests_in_flight 0.0" in text
@@ -1,7 +1,11 @@
+import asyncio
+import time
+
 import pytest
 import httpx
 
 from app.model_client import ModelClient
+from app.resilience import CircuitOpenError, HedgePolicy, Resilience, RetryPolicy
 
 
 @pytest.mark.anyio("asyncio")
@@ -23,3 +27,102 @@ async def test_model_client_generate():
         client = ModelClient(base_url="http://test", client=mock_client)
         result = await client.generate("hi")
     assert result["output"] == "ok"
+
+
+@pytest.mark.anyio("asyncio")
+async def test_model_client_generate_stream_decodes_events():
+    body = (
+        'data: {"type": "delta", "delta": "he"}\n\n'
+        'data: {"type": "delta", "delta": "llo"}\n\n'
+        'data: {"type": "done", "metadata": {"model": "m"}}\n\n'
+    )
+
+    async def handler(request):
+        assert request.url.path == "/generate/stream"
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport) as mock_client:
+        client = ModelClient(base_url="http://test", client=mock_client)
+        events = [event async for event in client.generate_stream("hi")]
+    assert [e["type"] for e in events] == ["delta", "delta", "done"]
+    assert "".join(e.get("delta", "") for e in events) == "hello"
+
+
+def _client(handler, **policies):
+    mock_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    resilience = Resilience(**{"retry": RetryPolicy(base_delay=0.0), **policies})
+    return ModelClient(base_url="http://test", client=mock_client, resilience=resilience), resilience
+
+
+@pytest.mark.anyio("asyncio")
+async def test_retries_retryable_status_until_success():
+    statuses = [503, 502, 200]
+
+    async def handler(request):
+        status = statuses.pop(0)
+        return httpx.Response(status, json={"output": "ok"} if status == 200 else {})
+
+    client, _ = _client(handler)
+    assert (await client.generate("hi"))["output"] == "ok"
+    assert statuses == []
+
+
+@pytest.mark.anyio("asyncio")
+async def test_does_not_retry_client_errors():
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        return httpx.Response(400, json={})
+
+    client, resilience = _client(handler)
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.generate("hi")
+    assert calls == 1
+    assert resilience.snapshot()["circuits"]["http://test"]["state"] == "closed"
+
+
+@pytest.mark.anyio("asyncio")
+async def test_circuit_opens_after_failures_and_recovers():
+    healthy = False
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        if not healthy:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"output": "ok"})
+
+    client, resilience = _client(handler, breaker_failure_threshold=2, breaker_reset_seconds=0.05)
+    # The retry that would be the third attempt finds the circuit open.
+    with pytest.raises(CircuitOpenError):
+        await client.generate("hi")
+    assert calls == 2
+    with pytest.raises(CircuitOpenError):
+        await client.generate("hi")
+    assert calls == 2
+
+    healthy = True
+    await asyncio.sleep(0.06)
+    assert (await client.generate("hi"))["output"] == "ok"
+    assert resilience.breaker("http://test").snapshot()["state"] == "closed"
+
+
+@pytest.mark.anyio("asyncio")
+async def test_slow_attempt_is_hedged():
+    delays = [1.0, 0.0]
+
+    async def handler(request):
+        await asyncio.sleep(delays.pop(0) if delays else 0.0)
+        return httpx.Response(200, json={"output": "ok"})
+
+    hedge = HedgePolicy(min_delay=0.01, min_samples=1, max_ratio=1.0)
+    client, resilience = _client(handler, hedge=hedge)
+    resilience.latencies("http://test").observe(0.001)
+    started = time.perf_counter()
+    assert (await client.generate("hi"))["output"] == "ok"
+    assert time.perf_counter() - started < 0.5
+    assert resilience.snapshot()["hedges"] == 1
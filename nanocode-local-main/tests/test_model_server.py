@@ -0,0 +1,165 @@
+import pickle
+
+import pytest
+from fastapi.testclient import TestClient
+
+from model_server.backend import create_backend
+from model_server.backend.base import SYSTEM_PROMPT, ChatPrompt, build_messages
+from model_server.backend import llama_cpp_backend
+from model_server.backend.llama_cpp_backend import generate_batch as llama_generate_batch
+from model_server.config import ModelServerSettings, get_settings
+from model_server.server import app
+from model_server.tokenizer import with_usage
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    monkeypatch.setenv("MODEL_BACKEND", "mock")
+    get_settings.cache_clear()
+    with TestClient(app) as client:
+        yield client
+    get_settings.cache_clear()
+
+
+def test_generate_runs_offline_with_mock_backend(mock_server):
+    response = mock_server.post("/generate", json={"prompt": "hello"})
+    assert response.status_code == 200
+    assert response.json() == {
+        "output": "Echo: hello",
+        "metadata": {
+            "backend": "mock",
+            "usage": {"prompt_tokens": 1, "completion_tokens": 3, "total_tokens": 4},
+            "usage_source": "tokenizer",
+            "prefix_cache": {"cached_tokens": 0, "hit": False, "hit_rate": 0.0},
+        },
+    }
+
+
+def test_mock_output_is_padded_to_configured_size(monkeypatch):
+    monkeypatch.setenv("MODEL_BACKEND", "mock")
+    monkeypatch.setenv("MODEL_MOCK_OUTPUT_BYTES", "4096")
+    get_settings.cache_clear()
+    try:
+        with TestClient(app) as client:
+            output = client.post("/generate", json={"prompt": "hello"}).json()["output"]
+    finally:
+        get_settings.cache_clear()
+    assert len(output) == 4096
+    assert output.startswith("Echo: hello")
+
+
+def test_stream_falls_back_to_single_delta(mock_server):
+    response = mock_server.post("/generate/stream", json={"prompt": "hello"})
+    assert response.status_code == 200
+    assert '"delta":"Echo: hello"' in response.text
+    assert '"type":"done"' in response.text
+
+
+def test_stream_done_frame_reports_counted_usage(mock_server):
+    response = mock_server.post("/generate/stream", json={"prompt": "hello"})
+    assert '"usage":{"prompt_tokens":1,"completion_tokens":3,"total_tokens":4}' in response.text
+
+
+@pytest.mark.anyio("asyncio")
+async def test_batch_usage_is_counted_off_the_event_loop(loop_recording_tokenizer):
+    async def generate_batch(prompts):
+        return [{"output": f"Echo: {prompt}"} for prompt in prompts[:-1]] + [RuntimeError("failed")]
+
+    tokenizer = loop_recording_tokenizer
+    results = await with_usage(tokenizer, generate_batch)(["hello", "hi", "lost"])
+    assert results[0]["metadata"]["usage"]["total_tokens"] == 4
+    assert isinstance(results[2], RuntimeError)
+    assert tokenizer.on_loop and not any(tokenizer.on_loop)
+
+
+def test_prompt_over_token_limit_is_rejected(monkeypatch, loop_recording_tokenizer):
+    monkeypatch.setenv("MODEL_BACKEND", "mock")
+    monkeypatch.setenv("MODEL_MAX_PROMPT_TOKENS", "3")
+    get_settings.cache_clear()
+    try:
+        with TestClient(app) as client:
+            app.state.tokenizer = loop_recording_tokenizer
+            assert client.post("/generate", json={"prompt": "one two three"}).status_code == 200
+            response = client.post("/generate", json={"prompt": "one two three four"})
+            repeated = client.post("/generate", json={"prompt": "one two three four"})
+    finally:
+        get_settings.cache_clear()
+    assert response.status_code == repeated.status_code == 413
+    assert response.json()["detail"] == "Prompt is 4 tokens; the limit is 3"
+    # Each prompt is counted once, in a worker thread; the repeat is a cache hit.
+    assert loop_recording_tokenizer.on_loop == [False, False]
+
+
+def test_shared_message_prefix_is_reported_as_cached(mock_server):
+    system = {"role": "system", "content": "You are a helpful assistant.\nConstraints: python"}
+
+    def send(text):
+        messages = [system, {"role": "user", "content": f"User request: {text}"}]
+        prompt = "\n".join(message["content"] for message in messages)
+        return mock_server.post("/generate", json={"prompt": prompt, "messages": messages}).json()["metadata"]
+
+    assert send("parse dates")["prefix_cache"]["hit"] is False
+    prefix = send("sort a list")["prefix_cache"]
+    assert prefix["hit"] is True
+    assert prefix["cached_tokens"] > 0 and 0 < prefix["hit_rate"] < 1
+    stats = mock_server.get("/stats/prefix_cache").json()["prefix_cache"]
+    assert stats["requests"] == 2 and stats["hits"] == 1
+    assert stats["cached_tokens"] == prefix["cached_tokens"]
+
+
+def test_chat_prompt_messages_replace_the_default_system_message():
+    messages = [{"role": "system", "content": "static"}, {"role": "user", "content": "dynamic"}]
+    prompt = pickle.loads(pickle.dumps(ChatPrompt("static\ndynamic", messages)))
+    assert prompt == "static\ndynamic"
+    assert build_messages(prompt) == messages
+    assert build_messages("plain")[0]["content"] == SYSTEM_PROMPT
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown model backend"):
+        create_backend(ModelServerSettings(backend="nope"))
+    with pytest.raises(ValueError, match="not supported yet"):
+        create_backend(ModelServerSettings(backend="vllm"))
+
+
+def test_llama_worker_reports_missing_model_per_prompt():
+    [result] = llama_generate_batch(["hi"])
+    assert isinstance(result, RuntimeError)
+
+
+def test_metrics_endpoint_reports_provider_latency(mock_server):
+    mock_server.post("/generate", json={"prompt": "hello"})
+    text = mock_server.get("/metrics").text
+    assert 'model_server_provider_duration_seconds_count{backend="mock"}' in text
+    assert 'model_server_responses_total{route="/generate",status="200"}' in text
+
+
+def test_startup_report_covers_backend_startup_and_warmup(mock_server):
+    startup = mock_server.get("/stats/startup").json()["startup"]
+    assert startup["ready"] is True
+    assert set(startup["phases_ms"]) == {"backend_startup", "tokenizer", "warmup"}
+
+
+class FakeLlama:
+    """Stands in for `llama_cpp.Llama`: the context holds the previous prompt's tokens."""
+
+    def __init__(self):
+        self.input_ids, self.n_tokens = [], 0
+
+    def create_chat_completion(self, messages, **kwargs):
+        tokens = [ord(char) for char in messages[-1]["content"]]
+        self.input_ids, self.n_tokens = tokens + [0], len(tokens) + 1
+        usage = {"prompt_tokens": len(tokens), "completion_tokens": 1, "total_tokens": len(tokens) + 1}
+        return {"choices": [{"message": {"content": "ok"}}], "usage": usage}
+
+
+@pytest.mark.parametrize("prompt_cache, reported", [(False, True), (True, False)])
+def test_llama_prefix_cache_is_reported_only_for_the_live_context(monkeypatch, prompt_cache, reported):
+    monkeypatch.setattr(llama_cpp_backend, "_MODEL", FakeLlama())
+    generation = {"max_tokens": 8, "temperature": 0.0, "model": "fake.gguf", "prompt_cache": prompt_cache}
+    monkeypatch.setattr(llama_cpp_backend, "_GENERATION", generation)
+    llama_cpp_backend.generate("shared prefix one")
+    metadata = llama_cpp_backend.generate("shared prefix two")["metadata"]
+    assert ("prefix_cache" in metadata) is reported
+    if reported:
+        assert metadata["prefix_cache"]["cached_tokens"] == len("shared prefix ")
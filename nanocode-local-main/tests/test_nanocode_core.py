@@ -1,4 +1,5 @@
 from nanocode.core import postprocess_output, preprocess_prompt
+from nanocode.prompts import build_messages, build_prompt
 from nanocode.schema import NanocodeRequest
 
 
@@ -12,3 +13,15 @@ def test_postprocess_output_maps_output():
     req = NanocodeRequest(input="do something")
     result = postprocess_output(req, {"output": "done"})
     assert result.output == "done"
+
+
+def test_prompt_messages_lead_with_the_constraint_profile():
+    first = build_messages(NanocodeRequest(input="parse dates", constraints=["python", "typed"]))
+    second = build_messages(NanocodeRequest(input="sort a list", constraints=["python", "typed"]))
+    assert first[0] == second[0]
+    assert first[0]["role"] == "system" and first[0]["content"].endswith("Constraints: python, typed")
+    assert first[1] == {"role": "user", "content": "User request: parse dates"}
+    # The flattened prompt keeps the same order, so it shares the prefix too.
+    assert build_prompt(NanocodeRequest(input="sort a list", constraints=["python", "typed"])).startswith(
+        first[0]["content"] + "\n"
+    )
@@ -1,6 +1,137 @@
-from nanocode.health import compute_health_score
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.dependencies import get_health_tracker, get_model_client, get_model_identity
+from app.endpoint_pool import EndpointPool
+from app.health import _probe_model_server
+from app.main import app
+from app.model_client import ModelClient
+from nanocode.health import HealthTracker, compute_health_score
 
 
 def test_health_score_range():
     score = compute_health_score()
     assert 0.0 <= score <= 1.0
+
+
+def test_tracker_scores_latency_and_errors():
+    tracker = HealthTracker(window_seconds=10, latency_target_seconds=1.0)
+    assert tracker.score(now=0.0) == 1.0
+
+    tracker.record(0.5, ok=True, now=0.0)
+    tracker.record(0.5, ok=False, now=0.0)
+    assert tracker.components(now=1.0)["errors"] == 0.5
+    assert tracker.score(now=1.0) == 0.5
+
+    tracker.record(7.0, ok=True, now=2.0)
+    assert tracker.components(now=2.0)["latency"] == pytest.approx(4.0 / 9.0)
+
+
+def test_tracker_window_expires_old_samples():
+    tracker = HealthTracker(window_seconds=10, max_samples=3)
+    tracker.record(0.1, ok=False, now=0.0)
+    assert tracker.score(now=5.0) == 0.0
+    assert tracker.score(now=11.0) == 1.0
+    assert tracker.snapshot(now=11.0)["samples"] == 0
+
+    for _ in range(3):
+        tracker.record(0.1, ok=False, now=20.0)
+    tracker.record(0.1, ok=True, now=20.0)
+    assert tracker.snapshot(now=20.0)["samples"] == 3
+
+
+def test_tracker_saturation_and_reachability():
+    tracker = HealthTracker(concurrency_limit=4)
+    started = [tracker.started() for _ in range(3)]
+    assert tracker.components()["saturation"] == 0.25
+    for value in started:
+        tracker.finished(value, ok=True)
+    assert tracker.in_flight == 0
+
+    tracker.finished(tracker.started(), ok=False, reachable=False)
+    assert tracker.score() == 0.0
+
+
+@pytest.fixture
+def health_tracker(overrides):
+    tracker = HealthTracker(concurrency_limit=2)
+    overrides[get_health_tracker] = lambda: tracker
+    return tracker
+
+
+def test_health_endpoint_reports_degraded_upstream(health_tracker):
+    client = TestClient(app)
+    assert client.get("/health").json()["status"] == "ok"
+
+    health_tracker.record(0.1, ok=True)
+    health_tracker.record(0.1, ok=False)
+    body = client.get("/health").json()
+    assert body["status"] == "degraded"
+    assert body["score"] == 0.5
+    assert body["details"]["samples"] == 2
+
+
+def test_ready_sheds_when_saturated(health_tracker):
+    client = TestClient(app)
+    assert client.get("/health/ready").status_code == 200
+
+    health_tracker.started()
+    health_tracker.started()
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "overloaded"
+
+
+class FailingModelClient(ModelClient):
+    def __init__(self, error: Exception, **kwargs):
+        super().__init__(**kwargs)
+        self.error = error
+
+    async def generate(self, prompt: str, **kwargs):
+        raise self.error
+
+    async def generate_stream(self, prompt: str, **kwargs):
+        raise self.error
+        yield
+
+
+@pytest.mark.parametrize(
+    "error, reachable",
+    [(httpx.ReadTimeout, True), (httpx.PoolTimeout, True), (httpx.ConnectError, False)],
+)
+@pytest.mark.parametrize("path", ["/nanocode", "/nanocode/stream"])
+def test_only_connect_failures_mark_the_model_server_unreachable(overrides, health_tracker, path, error, reachable):
+    failure = error("upstream failed", request=httpx.Request("POST", "http://stub/generate"))
+    overrides[get_model_client] = lambda: FailingModelClient(failure, base_url="http://stub")
+    assert TestClient(app).post(path, json={"input": "hello"}).status_code == 503
+    assert health_tracker.reachable is reachable
+    assert health_tracker.snapshot()["samples"] == 1
+
+
+@pytest.mark.anyio("asyncio")
+async def test_probe_checks_every_replica_and_needs_one_up():
+    up = set()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host not in up:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"status": "ok"})
+
+    settings = Settings(health_probe_interval_seconds=0.0)
+    pool = EndpointPool(["http://a:8001", "http://b:8001"])
+    tracker = HealthTracker()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        await _probe_model_server(tracker, client, settings, pool)
+        assert tracker.reachable is False
+        up.add("b")
+        await _probe_model_server(tracker, client, settings, pool)
+        assert tracker.reachable is True
+
+
+def test_model_identity_covers_the_replica_set():
+    single = get_model_identity(Settings())
+    replicas = get_model_identity(Settings(model_server_urls=["http://b:8001", "http://a:8001/"]))
+    assert replicas == get_model_identity(Settings(model_server_urls=["http://a:8001", "http://b:8001"]))
+    assert replicas != single and "http://a:8001" in replicas
@@ -0,0 +1,61 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_response_cache
+from app.main import app
+from app.response_cache import create_response_cache, make_cache_key
+
+
+@pytest.fixture
+def cached_app(overrides, counting_client):
+    cache = create_response_cache("memory", ttl_seconds=60, max_entries=8, max_bytes=1 << 20)
+    overrides[get_response_cache] = lambda: cache
+    return TestClient(app)
+
+
+@pytest.mark.anyio("asyncio")
+async def test_memory_cache_evicts_least_recently_used():
+    cache = create_response_cache("memory", ttl_seconds=60, max_entries=2, max_bytes=1 << 20)
+    await cache.set("a", {"output": "a"})
+    await cache.set("b", {"output": "b"})
+    assert await cache.get("a") == {"output": "a"}
+    await cache.set("c", {"output": "c"})
+    assert await cache.get("b") is None
+    stats = await cache.snapshot()
+    assert stats["evictions"] == 1 and stats["entries"] == 2
+
+
+@pytest.mark.anyio("asyncio")
+async def test_cache_expires_entries_after_ttl():
+    cache = create_response_cache("memory", ttl_seconds=0, max_entries=2, max_bytes=1 << 20)
+    await cache.set("a", {"output": "a"})
+    assert await cache.get("a") is None
+    assert cache.stats.expirations == 1
+
+
+@pytest.mark.anyio("asyncio")
+async def test_sqlite_cache_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    key = make_cache_key("prompt", "model")
+    first = create_response_cache("sqlite", ttl_seconds=60, max_entries=4, max_bytes=1 << 20, sqlite_path=path)
+    await first.set(key, {"output": "persisted"})
+    first.backend.close()
+
+    second = create_response_cache("sqlite", ttl_seconds=60, max_entries=4, max_bytes=1 << 20, sqlite_path=path)
+    assert await second.get(key) == {"output": "persisted"}
+
+
+def test_router_serves_repeat_requests_from_cache(cached_app, counting_client):
+    first = cached_app.post("/nanocode", json={"input": "same"})
+    second = cached_app.post("/nanocode", json={"input": "same"})
+    assert first.headers["X-Nanocode-Cache"] == "miss"
+    assert second.headers["X-Nanocode-Cache"] == "hit"
+    assert second.json()["output"] == first.json()["output"]
+    assert counting_client.calls == 1
+
+    bypass = cached_app.post("/nanocode", json={"input": "same"}, headers={"Cache-Control": "no-cache"})
+    assert bypass.headers["X-Nanocode-Cache"] == "bypass"
+    assert counting_client.calls == 2
+
+    assert cached_app.get("/admin/cache").json()["cache"]["hits"] == 1
+    assert cached_app.post("/admin/cache/purge").json()["purged"] == 1
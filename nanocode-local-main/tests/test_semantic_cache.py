@@ -0,0 +1,61 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_response_cache, get_semantic_cache
+from app.main import app
+from app.semantic_cache import SemanticCache, make_partition_key
+from nanocode.embeddings.service import EmbeddingService, HashingEmbedder
+
+
+def make_cache(threshold=0.8, max_entries=8):
+    return SemanticCache(
+        EmbeddingService(HashingEmbedder(dim=128)),
+        threshold=threshold,
+        max_entries=max_entries,
+        ttl_seconds=60,
+    )
+
+
+@pytest.fixture
+def semantic_app(overrides, counting_client):
+    cache = make_cache()
+    overrides[get_response_cache] = lambda: None
+    overrides[get_semantic_cache] = lambda: cache
+    return TestClient(app), cache
+
+
+@pytest.mark.anyio("asyncio")
+async def test_lookup_requires_threshold_and_matching_partition():
+    cache = make_cache(threshold=0.9)
+    partition = make_partition_key("model", ["short"])
+    stored = await cache.embed("write a function that sorts a list of numbers")
+    cache.store(stored, partition, {"output": "sorted"}, upstream_ms=120.0)
+
+    close = await cache.embed("Write a function that sorts a list of numbers!")
+    assert cache.lookup(close, partition)[0] == {"output": "sorted"}
+    assert cache.lookup(close, make_partition_key("model", ["long"])) is None
+    assert cache.lookup(await cache.embed("explain tcp congestion control"), partition) is None
+
+    stats = cache.snapshot()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    assert stats["saved_ms"] == 120.0
+    assert sum(stats["similarity"].values()) == 2
+
+
+def test_router_serves_paraphrases_from_semantic_cache(semantic_app, counting_client):
+    client, cache = semantic_app
+    first = client.post("/nanocode", json={"input": "how do I reverse a linked list in python"})
+    second = client.post("/nanocode", json={"input": "How do I reverse a linked list in Python?"})
+    other = client.post(
+        "/nanocode",
+        json={"input": "How do I reverse a linked list in Python?", "constraints": ["no recursion"]},
+    )
+
+    assert second.headers["X-Nanocode-Cache"] == "semantic"
+    assert float(second.headers["X-Nanocode-Similarity"]) >= 0.8
+    assert second.json()["output"] == first.json()["output"]
+    assert second.json()["input"] == "How do I reverse a linked list in Python?"
+    assert second.json()["metadata"]["prompt"].endswith("User request: How do I reverse a linked list in Python?")
+    assert "X-Nanocode-Cache" not in other.headers
+    assert counting_client.calls == 2
+    assert client.get("/admin/semantic-cache").json()["semantic_cache"]["hits"] == 1
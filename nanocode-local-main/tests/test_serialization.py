@@ -0,0 +1,51 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import nanocode.serialization as serialization
+from app.dependencies import get_model_client, get_response_cache
+from app.main import app
+from app.model_client import ModelClient
+from nanocode.schema import NanocodeResponse
+from nanocode.serialization import FastJSONResponse, dumps, loads, model_response
+
+
+class EchoModelClient(ModelClient):
+    async def generate(self, prompt: str, **kwargs):
+        return {"output": "héllo \"world\"", "metadata": {"backend": "stub"}}
+
+
+def test_dumps_is_compact_utf8_with_and_without_orjson(monkeypatch):
+    payload = {"output": "héllo", "items": [1, 2.5, None, True]}
+    fast = dumps(payload)
+    monkeypatch.setattr(serialization, "orjson", None)
+    stdlib = dumps(payload)
+    assert fast == stdlib == '{"output":"héllo","items":[1,2.5,null,true]}'.encode("utf-8")
+    assert loads(stdlib) == loads(stdlib.decode("utf-8")) == payload
+
+
+def test_fast_json_response_renders_bytes():
+    response = FastJSONResponse({"status": "ok"})
+    assert response.body == b'{"status":"ok"}'
+    assert response.headers["content-type"] == "application/json"
+
+
+def test_model_response_keeps_headers_and_schema():
+    model = NanocodeResponse(input="hi", output="done", metadata={"backend": "stub"})
+    response = model_response(model, {"X-Nanocode-Cache": "miss"})
+    assert response.headers["X-Nanocode-Cache"] == "miss"
+    assert NanocodeResponse.model_validate_json(response.body) == model
+
+
+def test_nanocode_endpoint_serializes_once(overrides):
+    overrides[get_model_client] = lambda: EchoModelClient(base_url="http://stub")
+    # A response cached by another test would replace the stub's output.
+    overrides[get_response_cache] = lambda: None
+    response = TestClient(app).post("/nanocode", json={"input": "hello"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert json.loads(response.content) == {
+        "input": "hello",
+        "output": "héllo \"world\"",
+        "metadata": {"backend": "stub", "prompt": response.json()["metadata"]["prompt"]},
+    }
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+@pytest.mark.anyio("asyncio")
+async def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"output": "shared"}
+
+    waiters = [asyncio.ensure_future(flight.do("k", work)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+    assert calls == 1
+    assert all(result == {"output": "shared"} for result in results)
+    assert flight.snapshot()["coalesced"] == 4
+    assert flight.snapshot()["in_flight"] == 0
+
+
+@pytest.mark.anyio("asyncio")
+async def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return "done"
+
+    first = asyncio.ensure_future(flight.do("k", work))
+    second = asyncio.ensure_future(flight.do("k", work))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await second == "done"
+    assert first.cancelled()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_errors_propagate_to_every_caller():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        flight.do("k", work), flight.do("k", work), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,109 @@
+import base64
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.config import Settings
+from app.dependencies import get_prompt_budget
+from app.main import app
+from nanocode.prompts import PromptBudget, PromptTooLong, build_messages, build_prompt, fit_prompt
+from nanocode.schema import NanocodeRequest
+from nanocode.tokenizer import Tokenizer, load_ranks
+
+MERGES = [b"he", b"ll", b"hell", b"hello", b" w", b" wor", b"or"]
+
+
+def _write_vocab(path, tokens):
+    lines = [f"{base64.b64encode(token).decode()} {rank}" for rank, token in enumerate(tokens)]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def bpe(tmp_path):
+    vocab = _write_vocab(tmp_path / "tiny.tiktoken", [bytes([b]) for b in range(256)] + MERGES)
+    return Tokenizer(load_ranks(vocab))
+
+
+def test_bpe_merges_by_rank_and_round_trips(bpe):
+    assert bpe.tokenize("hello world") == ["hello", " wor", "l", "d"]
+    ids = bpe.encode("hello world")
+    assert ids[0] == 256 + MERGES.index(b"hello")
+    assert bpe.decode(ids) == "hello world"
+    # "é" is two bytes without a merge; "ll" still merges.
+    assert bpe.count("héllo") == len(bpe.encode("héllo")) == 5
+
+
+def test_vocabulary_must_cover_every_byte(tmp_path):
+    with pytest.raises(ValueError, match="single bytes"):
+        load_ranks(_write_vocab(tmp_path / "partial.tiktoken", [b"a", b"b"]))
+
+
+def test_counts_are_cached_by_content(bpe):
+    assert bpe.count_tokens(["hello", "hello world", "hello"]) == [1, 4, 1]
+    assert bpe.count("hello world") == 4
+    assert bpe.stats.cache_misses == 2
+    assert bpe.stats.cache_hits == 1
+
+
+def test_cached_count_only_reports_counted_texts(bpe):
+    assert bpe.cached_count("hello world") is None
+    count = bpe.count("hello world")
+    assert bpe.cached_count("hello world") == count
+    assert bpe.stats.cache_hits == 1 and bpe.stats.cache_misses == 1
+
+
+def test_estimate_without_vocabulary():
+    tokenizer = Tokenizer()
+    assert not tokenizer.exact
+    # One token per started six bytes of each piece.
+    assert tokenizer.tokenize("Hello, internationalization") == ["Hello", ",", " inter", "nation", "alizat", "ion"]
+    assert tokenizer.count("Hello, internationalization") == 6
+    with pytest.raises(RuntimeError):
+        tokenizer.encode("hello")
+
+
+def test_truncate_keeps_a_token_prefix(bpe):
+    assert bpe.truncate("hello world", 2) == "hello wor"
+    assert bpe.truncate("hello world", 10) == "hello world"
+    assert bpe.truncate("hello world", 0) == ""
+
+
+def test_fit_prompt_rejects_or_truncates_input():
+    tokenizer = Tokenizer()
+    request = NanocodeRequest(input="word " * 200, constraints=["short"])
+    full = tokenizer.count(build_prompt(request))
+
+    with pytest.raises(PromptTooLong) as excinfo:
+        fit_prompt(request, PromptBudget(tokenizer, max_tokens=50))
+    assert excinfo.value.tokens == full
+
+    fitted = fit_prompt(request, PromptBudget(tokenizer, max_tokens=50, overflow="truncate"))
+    assert fitted.truncated and fitted.tokens <= 50
+    # Only the input is cut; the system message with the constraints is intact.
+    assert fitted.messages[0] == build_messages(request)[0]
+    assert fitted.text.startswith(fitted.messages[0]["content"] + "\nUser request: word")
+
+    untouched = fit_prompt(request, PromptBudget(tokenizer, max_tokens=full))
+    assert not untouched.truncated and untouched.tokens == full
+
+
+def test_prompt_overflow_setting_is_validated():
+    assert Settings(prompt_overflow="truncate").prompt_overflow == "truncate"
+    with pytest.raises(ValidationError):
+        Settings(prompt_overflow="drop")
+
+
+def test_prompt_over_budget_is_rejected_before_the_upstream_call(overrides, counting_client, loop_recording_tokenizer):
+    overrides[get_prompt_budget] = lambda: PromptBudget(loop_recording_tokenizer, max_tokens=30)
+    client = TestClient(app)
+    rejected = client.post("/nanocode", json={"input": "too long " * 50})
+    accepted = client.post("/nanocode", json={"input": "short"})
+    assert rejected.status_code == 413
+    assert rejected.json()["detail"].endswith("the limit is 30")
+    assert accepted.status_code == 200
+    assert counting_client.calls == 1
+    # Both prompts are counted in a worker thread; the repeat is a cache hit.
+    assert client.post("/nanocode", json={"input": "short"}).status_code == 200
+    assert loop_recording_tokenizer.on_loop == [False, False]
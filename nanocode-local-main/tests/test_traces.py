@@ -0,0 +1,189 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_model_client, get_response_cache, get_trace_store
+from app.main import app
+from app.model_client import ModelClient
+from app.traces import Trace, TraceStore
+from benchmarks.load import in_process_stack
+
+
+class StubModelClient(ModelClient):
+    async def generate(self, prompt: str, **kwargs):
+        return {"output": "stubbed", "metadata": {"model": "stub", "backend": "stub"}}
+
+
+class BrokenModelClient(ModelClient):
+    async def generate(self, prompt: str, **kwargs):
+        raise RuntimeError("client bug")
+
+    async def generate_stream(self, prompt: str, **kwargs):
+        if "later" in prompt:
+            yield {"type": "delta", "delta": "partial"}
+        raise RuntimeError("client bug")
+
+
+def make_store(directory, **kwargs) -> TraceStore:
+    # A long interval leaves flushing to the test.
+    return TraceStore(str(directory), flush_interval=60.0, **kwargs)
+
+
+def record(store: TraceStore, status: int = 200, route: str = "/nanocode", ts: float = None) -> str:
+    trace = Trace(route, ["no-network"])
+    with trace.stage("upstream"):
+        pass
+    entry = trace.finish(status, None if status == 200 else "failed")
+    if ts is not None:
+        entry["ts"] = ts
+    return store.record(entry)
+
+
+def test_trace_records_stages_constraints_and_outcome():
+    trace = Trace("/nanocode", ["no-network", "short"], priority="batch")
+    with trace.stage("validate"):
+        pass
+    trace.set(cache="miss", model=None)
+    entry = trace.finish(200)
+    assert entry["outcome"] == "ok" and entry["priority"] == "batch" and entry["cache"] == "miss"
+    assert entry["constraints"] == {"no-network": "applied", "short": "applied"}
+    assert set(entry["stages"]) == {"validate"} and "model" not in entry
+    rejected = Trace("/nanocode", ["short"]).finish(413, "too long")
+    assert rejected["outcome"] == "rejected" and rejected["constraints"] == {"short": "waived"}
+    # Shed before generation: nothing was evaluated, so nothing failed.
+    assert Trace("/nanocode", ["short"]).finish(503, "overloaded")["constraints"] == {"short": "waived"}
+    generated = Trace("/nanocode", ["short"])
+    generated.attempted = True
+    assert generated.finish(502, "upstream")["constraints"] == {"short": "failed"}
+    abandoned = Trace("/nanocode/stream", ["short"])
+    abandoned.attempted = True
+    cancelled = abandoned.finish(499)
+    assert cancelled["outcome"] == "cancelled" and cancelled["constraints"] == {"short": "waived"}
+
+
+def test_full_buffer_drops_oldest_without_blocking(tmp_path):
+    store = make_store(tmp_path, buffer_size=3)
+    try:
+        ids = [record(store) for _ in range(5)]
+        assert store.stats.dropped == 2
+        store.flush()
+        page, cursor = store.query(limit=10)
+        assert [trace["id"] for trace in page] == ids[:1:-1] and cursor is None
+    finally:
+        store.close()
+
+
+def test_query_pages_newest_first_across_blocks_segments_and_buffer(tmp_path):
+    store = make_store(tmp_path, flush_batch=4, segment_bytes=300)
+    try:
+        ids = [record(store, status=200 if i % 3 else 502) for i in range(20)]
+        store.flush()
+        ids += [record(store) for _ in range(3)]
+        assert len([name for name in os.listdir(tmp_path) if name.endswith(".jsonl.gz")]) > 1
+        seen, cursor = [], None
+        while True:
+            page, cursor = store.query(limit=6, before=cursor)
+            seen += [trace["id"] for trace in page]
+            if cursor is None:
+                break
+        assert seen == ids[::-1]
+        errors, _ = store.query(limit=100, outcome="error")
+        assert len(errors) == 7 and all(trace["status"] == 502 for trace in errors)
+        assert store.get(ids[5])["id"] == ids[5] and store.get(ids[-1])["id"] == ids[-1]
+        assert store.get("0" * 22) is None
+    finally:
+        store.close()
+
+
+def test_query_filters_by_time_and_retention_deletes_old_segments(tmp_path):
+    store = make_store(tmp_path, flush_batch=2, segment_bytes=200, max_segments=3)
+    try:
+        for i in range(12):
+            record(store, ts=1000.0 + i)
+            store.flush()
+        page, _ = store.query(limit=100, since=1009.0, until=1010.5)
+        assert [trace["ts"] for trace in page] == [1010.0, 1009.0]
+        stats = store.snapshot()
+        assert stats["segments"] == 3 and stats["stored"] < 12 and stats["flushed"] == 12
+    finally:
+        store.close()
+
+
+def test_store_reopens_and_keeps_appending(tmp_path):
+    store = make_store(tmp_path)
+    first = record(store)
+    store.close()
+    store = make_store(tmp_path)
+    try:
+        second = record(store)
+        store.flush()
+        page, _ = store.query()
+        assert [trace["id"] for trace in page] == [second, first]
+    finally:
+        store.close()
+
+
+def test_admin_traces_endpoints_page_through_requests(tmp_path, overrides):
+    store = make_store(tmp_path)
+    overrides[get_model_client] = lambda: StubModelClient(base_url="http://stub")
+    overrides[get_response_cache] = lambda: None
+    overrides[get_trace_store] = lambda: store
+    try:
+        client = TestClient(app)
+        response = client.post("/nanocode", json={"input": "hello", "constraints": ["short"]})
+        trace_id = response.headers["X-Nanocode-Trace"]
+        assert client.post("/nanocode", json={"input": "", "constraints": ["short"]}).status_code == 422
+        listing = client.get("/admin/traces", params={"limit": 1}).json()
+        assert listing["traces"][0]["outcome"] == "rejected" and listing["next"]
+        assert listing["traces"][0]["constraints"] == {"short": "waived"}
+        older = client.get("/admin/traces", params={"before": listing["next"]}).json()
+        trace = older["traces"][0]
+        assert trace["id"] == trace_id and older["next"] is None
+        assert trace["constraints"] == {"short": "applied"} and trace["model"] == "stub"
+        assert {"validate", "preprocess", "upstream", "postprocess"} <= set(trace["stages"])
+        assert client.get(f"/admin/traces/{trace_id}").json()["trace"]["id"] == trace_id
+        assert client.get("/admin/traces/unknown").status_code == 404
+        assert client.get("/admin/traces/stats").json()["traces"]["recorded"] == 2
+    finally:
+        store.close()
+
+
+def test_unexpected_errors_are_traced_as_500_on_every_route(tmp_path, overrides):
+    store = make_store(tmp_path)
+    overrides[get_model_client] = lambda: BrokenModelClient(base_url="http://stub")
+    overrides[get_response_cache] = lambda: None
+    overrides[get_trace_store] = lambda: store
+    try:
+        client = TestClient(app, raise_server_exceptions=False)
+        assert client.post("/nanocode", json={"input": "hello", "constraints": ["short"]}).status_code == 500
+        assert client.post("/nanocode/stream", json={"input": "hello"}).status_code == 500
+        client.post("/nanocode/stream", json={"input": "fail later"})
+        batch = client.post(
+            "/nanocode/batch",
+            content=b'{"input": "hello"}\n',
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert '"status":500' in batch.text
+        store.flush()
+        page, _ = store.query()
+        routes = ["/nanocode/batch", "/nanocode/stream", "/nanocode/stream", "/nanocode"]
+        assert [(trace["route"], trace["status"]) for trace in page] == [(route, 500) for route in routes]
+        assert page[-1]["constraints"] == {"short": "failed"}
+    finally:
+        store.close()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_lifespan_writes_stream_traces_on_shutdown(tmp_path):
+    env = {"TRACE_ENABLED": "true", "TRACE_DIR": str(tmp_path), "TRACE_FLUSH_INTERVAL_SECONDS": "60"}
+    async with in_process_stack(env=env) as client:
+        response = await client.post("/nanocode/stream", json={"input": "Generate report"})
+        assert "event: done" in response.text
+    store = make_store(tmp_path)
+    try:
+        page, _ = store.query()
+        assert [(trace["route"], trace["outcome"]) for trace in page] == [("/nanocode/stream", "ok")]
+        assert {"upstream", "stream"} <= set(page[0]["stages"])
+    finally:
+        store.close()